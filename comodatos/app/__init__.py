@@ -4,6 +4,8 @@ from app.config import config
 from app.extensions import db, migrate, jwt, cors, mail, limiter, swagger, ma  # <-- Agregar ma
 from app.middleware.rate_limit import setup_rate_limiter
 from app.middleware.logging import setup_logging
+from app.middleware.compression import setup_compression
+import click
 import logging
 import os
 
@@ -12,6 +14,10 @@ def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # Serialización JSON con orjson
+    from app.utils.json_provider import OrjsonProvider
+    app.json = OrjsonProvider(app)
+    
     # Inicializar extensiones
     db.init_app(app)
     ma.init_app(app)  # <-- Inicializar Marshmallow
@@ -25,6 +31,9 @@ def create_app(config_name='default'):
     # Configurar logging
     setup_logging(app)
     
+    # Compresión de respuestas
+    setup_compression(app)
+    
     # Registrar blueprints
     from app.auth.routes import auth_bp
     from app.api import api_bp
@@ -141,4 +150,158 @@ def register_commands(app):
         db.session.commit()
         print('✅ Base de datos inicializada exitosamente')
         print('   Usuario admin: admin@sistema.com')
-        print('   Contraseña: Admin123!')
\ No newline at end of file
+        print('   Contraseña: Admin123!')
+    
+    @app.cli.command('reindex-busqueda')
+    def reindex_busqueda():
+        """Reconstruye el índice de búsqueda rápida"""
+        from app.utils.search_index import SearchIndex
+        
+        SearchIndex.reindex_all()
+        print('✅ Índice de búsqueda reconstruido')
+    
+    @app.cli.command('benchmark-serializacion')
+    @click.option('--filas', default=1000, help='Objetos por listado')
+    def benchmark_serializacion(filas):
+        """Compara Schema.dump(many=True) con FastDump y el proveedor JSON en listados sintéticos"""
+        from datetime import date, timedelta
+        from app.models import Alumno, Comodato, Instrumento
+        from app.schemas import alumnos_schema, comodatos_schema, instrumentos_schema
+        from app.utils.fast_dump import FastDump
+        
+        # Todas las columnas con valor, como en los objetos cargados de la BD
+        hoy = date.today()
+        casos = [
+            (alumnos_schema, [
+                Alumno(id_alumno=i, id_repr=i % 50 + 1, nombre=f'Nombre {i}', apellido=f'Apellido {i}',
+                       cedula=f'V{10000000 + i}', fecha_nacimiento=date(2010, i % 12 + 1, i % 28 + 1),
+                       programa='orquestal', estado='activo', nombre_norm=None, apellido_norm=None)
+                for i in range(filas)
+            ]),
+            (instrumentos_schema, [
+                Instrumento(id_instr=i, descripcion='VIOLIN', marca='Stentor', modelo='Student I',
+                            id_medida=1, color='Natural', serial_fabrica=f'S{i}',
+                            serial_inventario=f'{i:016d}', id_estado_instr=1, fecha_adquisicion=None,
+                            observaciones=None, descripcion_norm=None, marca_norm=None,
+                            modelo_norm=None, serial_fabrica_norm=None)
+                for i in range(filas)
+            ]),
+            (comodatos_schema, [
+                Comodato(id_comodato=i, id_alumno=i, id_instr=i, id_repr=i % 50 + 1,
+                         fecha_inicio=hoy - timedelta(days=i % 400),
+                         fecha_fin=hoy + timedelta(days=180 - i % 400),
+                         fecha_recepcion=None, observaciones=None,
+                         estado='activo' if i % 3 else 'finalizado', correlativo=i,
+                         codigo_comodato=f'GEN/{i:04d}/{hoy.year}')
+                for i in range(filas)
+            ]),
+        ]
+        
+        for schema, objetos in casos:
+            if schema.dump(objetos, many=True) != FastDump.dump(schema, objetos):
+                raise click.ClickException(f'{type(schema).__name__}: la salida no coincide')
+            lento, rapido = FastDump.benchmark(schema, objetos)
+            print(f'{type(schema).__name__}: {filas} filas  '
+                  f'Schema.dump {lento * 1000:.1f} ms  FastDump {rapido * 1000:.1f} ms  '
+                  f'x{lento / rapido:.1f}')
+        
+        # Codificación JSON del listado de comodatos: proveedor por defecto vs orjson
+        import timeit
+        from flask.json.provider import DefaultJSONProvider
+        
+        datos = {'comodatos': FastDump.dump(comodatos_schema, casos[-1][1])}
+        tiempos = [
+            min(timeit.repeat(lambda: proveedor.response(datos), number=1, repeat=5))
+            for proveedor in (DefaultJSONProvider(app), app.json)
+        ]
+        print(f'JSON {filas} comodatos: {type(app.json).__name__} x{tiempos[0] / tiempos[1]:.1f}  '
+              f'(por defecto {tiempos[0] * 1000:.1f} ms, {tiempos[1] * 1000:.1f} ms)')
+    
+    @app.cli.command('benchmark-estadisticas')
+    @click.option('--repeticiones', default=20, help='Ejecuciones de cada implementación')
+    def benchmark_estadisticas(repeticiones):
+        """Compara las estadísticas del dashboard con la implementación anterior (un COUNT por contador)"""
+        import timeit
+        from datetime import date, timedelta
+        from sqlalchemy import func
+        from app.models import Usuario, Representante, Alumno, Instrumento, EstadoInstrumento, Comodato
+        from app.utils.estadisticas import EstadisticasDashboard
+
+        def por_contador():
+            hoy = date.today()
+            fecha_limite = hoy + timedelta(days=30)
+            activos = Comodato.query.filter_by(estado='activo')
+            return {
+                'usuarios': {
+                    'total': Usuario.query.count(),
+                    'activos': Usuario.query.filter_by(is_active=True).count()
+                },
+                'representantes': {'total': Representante.query.count()},
+                'alumnos': {
+                    'total': Alumno.query.count(),
+                    'activos': Alumno.query.filter_by(estado='activo').count(),
+                    'por_programa': dict(db.session.query(
+                        Alumno.programa, func.count(Alumno.id_alumno)
+                    ).group_by(Alumno.programa).all())
+                },
+                'instrumentos': {
+                    'total': Instrumento.query.count(),
+                    'por_estado': dict(db.session.query(
+                        EstadoInstrumento.nombre, func.count(Instrumento.id_instr)
+                    ).join(Instrumento).group_by(EstadoInstrumento.nombre).all())
+                },
+                'comodatos': {
+                    'total': Comodato.query.count(),
+                    'activos': activos.count(),
+                    'finalizados': Comodato.query.filter_by(estado='finalizado').count(),
+                    'vencidos': activos.filter(Comodato.fecha_fin < hoy).count(),
+                    'proximos_a_vencer': activos.filter(
+                        Comodato.fecha_fin >= hoy, Comodato.fecha_fin <= fecha_limite
+                    ).count()
+                }
+            }
+
+        if por_contador() != EstadisticasDashboard.calcular():
+            raise click.ClickException('Las estadísticas no coinciden')
+
+        tiempos = [
+            min(timeit.repeat(implementacion, number=1, repeat=repeticiones))
+            for implementacion in (por_contador, EstadisticasDashboard.calcular)
+        ]
+        print(f'Estadísticas del dashboard: un COUNT por contador {tiempos[0] * 1000:.1f} ms  '
+              f'EstadisticasDashboard {tiempos[1] * 1000:.1f} ms  x{tiempos[0] / tiempos[1]:.1f}')
+
+    @app.cli.command('normalizar-columnas')
+    def normalizar_columnas():
+        """Rellena las columnas *_norm de los registros existentes"""
+        from app.models import COLUMNAS_NORMALIZADAS
+        from app.utils.text import normalize_text
+        from sqlalchemy import bindparam, update
+        
+        for modelo, campos in COLUMNAS_NORMALIZADAS.items():
+            tabla = modelo.__table__
+            pk = tabla.primary_key.columns.values()[0]
+            sentencia = update(tabla).where(pk == bindparam('_pk')).values(
+                {f'{campo}_norm': bindparam(f'_{campo}') for campo in campos}
+            )
+            
+            ultimo, total = 0, 0
+            while True:
+                filas = db.session.execute(
+                    db.select(pk, *[tabla.c[campo] for campo in campos])
+                    .where(pk > ultimo).order_by(pk).limit(1000)
+                ).all()
+                if not filas:
+                    break
+                
+                db.session.execute(sentencia, [
+                    {'_pk': fila[0], **{
+                        f'_{campo}': normalize_text(valor)
+                        for campo, valor in zip(campos, fila[1:])
+                    }}
+                    for fila in filas
+                ])
+                db.session.commit()
+                ultimo, total = filas[-1][0], total + len(filas)
+            
+            print(f'✅ {tabla.name}: {total} registros normalizados')
\ No newline at end of file
@@ -8,4 +8,5 @@ from . import representantes
 from . import alumnos
 from . import instrumentos
 from . import comodatos
-from . import utils
\ No newline at end of file
+from . import utils
+from . import importaciones
\ No newline at end of file
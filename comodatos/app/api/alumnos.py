@@ -1,15 +1,25 @@
 from flask import request, jsonify
 from datetime import datetime
 from app.extensions import db
-from app.models import Alumno, Representante, Usuario
+from app.models import Alumno, Representante, Comodato
 from app.schemas import alumno_schema, alumnos_schema
-from app.auth.utils import require_roles
+from app.auth.utils import require_roles, get_principal
 from app.api import api_bp
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from flask_jwt_extended import jwt_required
 from app.utils.validators import Validators
+from app.utils.text import normalize_text, prefix_pattern
+from app.utils.query_options import QueryOptions
+from app.utils.pagination import Paginator
+from app.utils.exporters import CSVExporter
+from app.utils.bulk_create import BulkCreate
+from app.utils.fast_dump import FastDump
+from app.utils.table_versions import conditional_get
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
 
 @api_bp.route('/alumnos', methods=['GET'])
 @jwt_required()
+@conditional_get('alumno')
 def get_alumnos():
     """
     Obtener todos los alumnos
@@ -27,6 +37,10 @@ def get_alumnos():
         in: query
         type: integer
         default: 20
+      - name: cursor
+        in: query
+        type: string
+        description: Paginación por cursor (enviar vacío para la primera página); omite el total
       - name: estado
         in: query
         type: string
@@ -41,30 +55,24 @@ def get_alumnos():
       - name: search
         in: query
         type: string
-        description: Buscar por nombre, apellido o cédula
+        description: Buscar por inicio de nombre, apellido o cédula (sin distinguir acentos)
     responses:
       200:
         description: Lista de alumnos
     """
-    current_user_id = get_jwt_identity()
-    claims = get_jwt()
+    principal = get_principal()
     
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor')
     estado = request.args.get('estado')
     programa = request.args.get('programa')
     id_repr = request.args.get('id_repr', type=int)
     search = request.args.get('search')
     
+    # Los representantes solo ven sus alumnos (RowScope)
     query = Alumno.query
     
-    # Filtros por rol
-    if claims.get('rol') == 'representante':
-        # Representantes solo ven sus alumnos
-        usuario = Usuario.query.get(current_user_id)
-        if usuario and usuario.representante:
-            query = query.filter_by(id_repr=usuario.representante.id_repr)
-    
     # Aplicar filtros
     if estado:
         query = query.filter_by(estado=estado)
@@ -72,26 +80,36 @@ def get_alumnos():
     if programa:
         query = query.filter_by(programa=programa)
     
-    if id_repr and claims.get('rol') == 'admin':
+    if id_repr and principal.es_admin:
         query = query.filter_by(id_repr=id_repr)
     
     if search:
-        search_term = f"%{search}%"
+        # Búsqueda por prefijo sobre columnas normalizadas e indexadas
+        patron = prefix_pattern(normalize_text(search.strip()))
         query = query.filter(
             db.or_(
-                Alumno.nombre.ilike(search_term),
-                Alumno.apellido.ilike(search_term),
-                Alumno.cedula.ilike(search_term)
+                Alumno.nombre_norm.like(patron, escape='\\'),
+                Alumno.apellido_norm.like(patron, escape='\\'),
+                *[Alumno.cedula.like(prefix_pattern(p), escape='\\')
+                  for p in Validators.cedula_prefixes(search)]
             )
         )
     
     # Ordenar por nombre
-    query = query.order_by(Alumno.nombre, Alumno.apellido)
+    orden = (Alumno.nombre, Alumno.apellido, Alumno.id_alumno)
+    
+    if cursor is not None:
+        pagina = Paginator.keyset(query, orden, cursor, per_page)
+        return jsonify({
+            'alumnos': FastDump.dump(alumnos_schema, pagina.items),
+            **pagina.meta()
+        }), 200
     
+    query = query.order_by(*orden)
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'alumnos': alumnos_schema.dump(pagination.items),
+        'alumnos': FastDump.dump(alumnos_schema, pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': page
@@ -147,7 +165,7 @@ def create_alumno():
         data = request.get_json()
         
         # Verificar que la cédula no exista
-        if Alumno.query.filter_by(cedula=data['cedula']).first():
+        if Alumno.query.filter_by(cedula=data['cedula']).execution_options(row_scope=False).first():
             return jsonify({'error': 'La cédula ya está registrada'}), 400
         
         # Validar cédula
@@ -155,11 +173,10 @@ def create_alumno():
             return jsonify({'error': 'Formato de cédula inválido'}), 400
         
         # Si es representante, asignar automáticamente su ID
-        claims = get_jwt()
-        if claims.get('rol') == 'representante':
-            usuario = Usuario.query.get(get_jwt_identity())
-            if usuario and usuario.representante:
-                data['id_repr'] = usuario.representante.id_repr
+        principal = get_principal()
+        if principal.es_representante:
+            if principal.id_repr:
+                data['id_repr'] = principal.id_repr
             else:
                 return jsonify({'error': 'Representante no encontrado'}), 404
         
@@ -185,6 +202,60 @@ def create_alumno():
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+@api_bp.route('/alumnos/bulk', methods=['POST'])
+@jwt_required()
+@require_roles('admin', 'representante')
+def create_alumnos_bulk():
+    """
+    Crear alumnos en bloque
+    ---
+    tags:
+      - Alumnos
+    security:
+      - BearerAuth: []
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          required:
+            - items
+          properties:
+            items:
+              type: array
+              description: Alumnos con los mismos campos que POST /alumnos
+              items:
+                type: object
+    responses:
+      201:
+        description: Todos los alumnos creados
+      207:
+        description: Creación parcial; ver el error de cada elemento
+      400:
+        description: Ningún alumno creado
+      404:
+        description: Representante no encontrado
+    """
+    items, error = BulkCreate.validar_payload(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    # Si es representante, todos los alumnos quedan a su nombre
+    principal = get_principal()
+    id_repr = None
+    if principal.es_representante:
+        if not principal.id_repr:
+            return jsonify({'error': 'Representante no encontrado'}), 404
+        id_repr = principal.id_repr
+    
+    try:
+        cuerpo, codigo = BulkCreate.respuesta(BulkCreate.alumnos(items, id_repr))
+        return jsonify(cuerpo), codigo
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
 @api_bp.route('/alumnos/<int:id>', methods=['GET'])
 @jwt_required()
 def get_alumno(id):
@@ -207,14 +278,6 @@ def get_alumno(id):
         description: Alumno no encontrado
     """
     alumno = Alumno.query.get_or_404(id)
-    
-    # Verificar permisos
-    claims = get_jwt()
-    if claims.get('rol') == 'representante':
-        usuario = Usuario.query.get(get_jwt_identity())
-        if alumno.id_repr != usuario.representante.id_repr:
-            return jsonify({'error': 'No autorizado'}), 403
-    
     return jsonify(alumno_schema.dump(alumno)), 200
 
 @api_bp.route('/alumnos/<int:id>', methods=['PUT'])
@@ -260,20 +323,12 @@ def update_alumno(id):
         description: Error en los datos
     """
     alumno = Alumno.query.get_or_404(id)
-    
-    # Verificar permisos
-    claims = get_jwt()
-    if claims.get('rol') == 'representante':
-        usuario = Usuario.query.get(get_jwt_identity())
-        if alumno.id_repr != usuario.representante.id_repr:
-            return jsonify({'error': 'No autorizado'}), 403
-    
     try:
         data = request.get_json()
         
         # No permitir cambiar cédula si ya existe otra con la misma
         if 'cedula' in data and data['cedula'] != alumno.cedula:
-            if Alumno.query.filter_by(cedula=data['cedula']).first():
+            if Alumno.query.filter_by(cedula=data['cedula']).execution_options(row_scope=False).first():
                 return jsonify({'error': 'La cédula ya está registrada'}), 400
             
             if not Validators.validate_cedula(data['cedula']):
@@ -322,7 +377,6 @@ def delete_alumno(id):
     alumno = Alumno.query.get_or_404(id)
     
     # Verificar si tiene comodatos activos
-    from app.models import Comodato
     comodatos_activos = Comodato.query.filter_by(
         id_alumno=id,
         estado='activo'
@@ -371,14 +425,6 @@ def get_alumno_comodatos(id):
         description: Lista de comodatos del alumno
     """
     alumno = Alumno.query.get_or_404(id)
-    
-    # Verificar permisos
-    claims = get_jwt()
-    if claims.get('rol') == 'representante':
-        usuario = Usuario.query.get(get_jwt_identity())
-        if alumno.id_repr != usuario.representante.id_repr:
-            return jsonify({'error': 'No autorizado'}), 403
-    
     estado = request.args.get('estado')
     
     query = alumno.comodatos
@@ -388,10 +434,10 @@ def get_alumno_comodatos(id):
     
     query = query.order_by(Comodato.fecha_inicio.desc())
     
-    comodatos = query.all()
+    comodatos = QueryOptions.comodatos(query).all()
     
     from app.schemas import comodatos_schema
-    return jsonify(comodatos_schema.dump(comodatos)), 200
+    return jsonify(FastDump.dump(comodatos_schema, comodatos)), 200
 
 @api_bp.route('/alumnos/exportar', methods=['GET'])
 @jwt_required()
@@ -420,50 +466,68 @@ def exportar_alumnos():
     from io import BytesIO
     from flask import send_file
     
-    alumnos = Alumno.query.all()
-    data = []
+    # Conteo de comodatos con subconsultas correlacionadas por id_alumno:
+    # cada lote del CSV solo cuenta los comodatos de sus propias filas
+    comodato_del_alumno = Comodato.id_alumno == Alumno.id_alumno
     
-    for alumno in alumnos:
-        data.append({
-            'ID': alumno.id_alumno,
-            'Nombre': alumno.nombre,
-            'Apellido': alumno.apellido,
-            'Cédula': alumno.cedula,
-            'Fecha Nacimiento': alumno.fecha_nacimiento,
-            'Edad': alumno.edad,
-            'Programa': alumno.programa,
-            'Estado': alumno.estado,
-            'Representante': alumno.representante.nombre_completo if alumno.representante else '',
-            'Cédula Representante': alumno.representante.cedula if alumno.representante else '',
-            'Teléfono Representante': alumno.representante.telefono if alumno.representante else '',
-            'Comodatos Activos': len([c for c in alumno.comodatos if c.estado == 'activo']),
-            'Comodatos Totales': len(alumno.comodatos.all())
-        })
-    
-    df = pd.DataFrame(data)
+    query = db.session.query(
+        Alumno,
+        select(func.count(Comodato.id_comodato)).where(
+            comodato_del_alumno, Comodato.estado == 'activo'
+        ).scalar_subquery().label('comodatos_activos'),
+        select(func.count(Comodato.id_comodato)).where(
+            comodato_del_alumno
+        ).scalar_subquery().label('comodatos_totales')
+    ).options(joinedload(Alumno.representante))
     
     formato = request.args.get('formato', 'excel')
     
     if formato == 'csv':
-        output = df.to_csv(index=False, encoding='utf-8-sig')
-        mimetype = 'text/csv'
-        filename = f'alumnos_{date.today()}.csv'
-        return send_file(
-            BytesIO(output.encode('utf-8-sig')),
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename
+        return CSVExporter.stream(
+            query,
+            (Alumno.id_alumno,),
+            COLUMNAS_EXPORTACION,
+            _fila_exportacion,
+            f'alumnos_{date.today()}.csv'
         )
-    else:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Alumnos')
-        output.seek(0)
-        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        filename = f'alumnos_{date.today()}.xlsx'
-        return send_file(
-            output,
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename
-        )
\ No newline at end of file
+    
+    data = [_fila_exportacion(row) for row in query.all()]
+    df = pd.DataFrame(data, columns=COLUMNAS_EXPORTACION)
+    
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Alumnos')
+    output.seek(0)
+    mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    filename = f'alumnos_{date.today()}.xlsx'
+    return send_file(
+        output,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=filename
+    )
+
+COLUMNAS_EXPORTACION = [
+    'ID', 'Nombre', 'Apellido', 'Cédula', 'Fecha Nacimiento', 'Edad',
+    'Programa', 'Estado', 'Representante', 'Cédula Representante',
+    'Teléfono Representante', 'Comodatos Activos', 'Comodatos Totales'
+]
+
+def _fila_exportacion(row):
+    """Fila de exportación a partir de (Alumno, comodatos_activos, comodatos_totales)"""
+    alumno = row.Alumno
+    return {
+        'ID': alumno.id_alumno,
+        'Nombre': alumno.nombre,
+        'Apellido': alumno.apellido,
+        'Cédula': alumno.cedula,
+        'Fecha Nacimiento': alumno.fecha_nacimiento,
+        'Edad': alumno.edad,
+        'Programa': alumno.programa,
+        'Estado': alumno.estado,
+        'Representante': alumno.representante.nombre_completo if alumno.representante else '',
+        'Cédula Representante': alumno.representante.cedula if alumno.representante else '',
+        'Teléfono Representante': alumno.representante.telefono if alumno.representante else '',
+        'Comodatos Activos': row.comodatos_activos,
+        'Comodatos Totales': row.comodatos_totales
+    }
\ No newline at end of file
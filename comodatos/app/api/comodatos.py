@@ -1,18 +1,24 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from datetime import datetime, date
 from app.extensions import db
 from app.models import Comodato, Instrumento, Alumno, Representante, EstadoInstrumento
 from app.schemas import comodato_schema, comodatos_schema
-from app.auth.utils import require_roles
+from app.auth.utils import require_roles, get_principal
 from app.api import api_bp
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, get_jwt
+from flask_jwt_extended import jwt_required
 from app.utils.generators import ComodatoManager
+from app.utils.query_options import QueryOptions
+from app.utils.pagination import Paginator
+from app.utils.exporters import CSVExporter
 from app.utils.validators import Validators
+from app.utils.fast_dump import FastDump
+from app.utils.table_versions import conditional_get
 import pandas as pd
 from io import BytesIO
 
 @api_bp.route('/comodatos', methods=['GET'])
 @jwt_required()
+@conditional_get('comodato')
 def get_comodatos():
     """
     Obtener todos los comodatos
@@ -30,6 +36,10 @@ def get_comodatos():
         in: query
         type: integer
         default: 20
+      - name: cursor
+        in: query
+        type: string
+        description: Paginación por cursor (enviar vacío para la primera página); omite el total
       - name: estado
         in: query
         type: string
@@ -55,11 +65,9 @@ def get_comodatos():
       200:
         description: Lista de comodatos
     """
-    current_user_id = get_jwt_identity()
-    claims = get_jwt()
-    
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor')
     estado = request.args.get('estado')
     fecha_inicio_desde = request.args.get('fecha_inicio_desde')
     fecha_inicio_hasta = request.args.get('fecha_inicio_hasta')
@@ -67,16 +75,9 @@ def get_comodatos():
     id_alumno = request.args.get('id_alumno', type=int)
     id_instr = request.args.get('id_instr', type=int)
     
+    # Los representantes solo ven sus comodatos (RowScope)
     query = Comodato.query
     
-    # Filtros por rol
-    if claims.get('rol') == 'representante':
-        # Representantes solo ven sus comodatos
-        from app.models import Usuario
-        usuario = Usuario.query.get(current_user_id)
-        if usuario and usuario.representante:
-            query = query.filter_by(id_repr=usuario.representante.id_repr)
-    
     # Aplicar filtros
     if estado:
         query = query.filter_by(estado=estado)
@@ -100,12 +101,21 @@ def get_comodatos():
         query = query.filter_by(id_instr=id_instr)
     
     # Ordenar por fecha de inicio descendente
-    query = query.order_by(Comodato.fecha_inicio.desc())
+    orden = (Comodato.fecha_inicio.desc(), Comodato.id_comodato)
+    query = QueryOptions.comodatos(query)
+    
+    if cursor is not None:
+        pagina = Paginator.keyset(query, orden, cursor, per_page)
+        return jsonify({
+            'comodatos': FastDump.dump(comodatos_schema, pagina.items),
+            **pagina.meta()
+        }), 200
     
+    query = query.order_by(*orden)
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'comodatos': comodatos_schema.dump(pagination.items),
+        'comodatos': FastDump.dump(comodatos_schema, pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': page
@@ -157,28 +167,26 @@ def create_comodato():
         data = request.get_json()
         
         # Validar fechas
+        data['fecha_inicio'] = datetime.strptime(data['fecha_inicio'], '%Y-%m-%d').date()
+        data['fecha_fin'] = datetime.strptime(data['fecha_fin'], '%Y-%m-%d').date()
         is_valid, message = Validators.validate_fechas_comodato(
-            datetime.strptime(data['fecha_inicio'], '%Y-%m-%d').date(),
-            datetime.strptime(data['fecha_fin'], '%Y-%m-%d').date()
+            data['fecha_inicio'], data['fecha_fin']
         )
         
         if not is_valid:
             return jsonify({'error': message}), 400
         
         # Verificar permisos para representantes
-        claims = get_jwt()
-        if claims.get('rol') == 'representante':
-            # Verificar que el alumno pertenezca al representante
-            from app.models import Usuario
-            usuario = Usuario.query.get(get_jwt_identity())
-            alumno = Alumno.query.get(data['id_alumno'])
-            
-            if not alumno or alumno.id_repr != usuario.representante.id_repr:
+        principal = get_principal()
+        if principal.es_representante:
+            # Verificar que el alumno pertenezca al representante (RowScope
+            # no carga alumnos ajenos)
+            if not Alumno.query.get(data['id_alumno']):
                 return jsonify({
                     'error': 'No tienes permiso para crear comodatos para este alumno'
                 }), 403
             
-            data['id_repr'] = usuario.representante.id_repr
+            data['id_repr'] = principal.id_repr
         
         # Crear comodato
         comodato = ComodatoManager.create_comodato(data)
@@ -213,15 +221,6 @@ def get_comodato(id):
         description: Comodato no encontrado
     """
     comodato = Comodato.query.get_or_404(id)
-    
-    # Verificar permisos
-    claims = get_jwt()
-    if claims.get('rol') == 'representante':
-        from app.models import Usuario
-        usuario = Usuario.query.get(get_jwt_identity())
-        if comodato.id_repr != usuario.representante.id_repr:
-            return jsonify({'error': 'No autorizado'}), 403
-    
     return jsonify(comodato_schema.dump(comodato)), 200
 
 @api_bp.route('/comodatos/<int:id>', methods=['PUT'])
@@ -323,15 +322,6 @@ def finalizar_comodato(id):
         description: Error al finalizar
     """
     comodato = Comodato.query.get_or_404(id)
-    
-    # Verificar permisos
-    claims = get_jwt()
-    if claims.get('rol') == 'representante':
-        from app.models import Usuario
-        usuario = Usuario.query.get(get_jwt_identity())
-        if comodato.id_repr != usuario.representante.id_repr:
-            return jsonify({'error': 'No autorizado'}), 403
-    
     try:
         data = request.get_json()
         fecha_recepcion = None
@@ -351,9 +341,155 @@ def finalizar_comodato(id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+@api_bp.route('/comodatos/finalizar', methods=['POST'])
+@jwt_required()
+@require_roles('admin')
+def finalizar_comodatos():
+    """
+    Finalizar varios comodatos
+    ---
+    tags:
+      - Comodatos
+    security:
+      - BearerAuth: []
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          required:
+            - ids
+          properties:
+            ids:
+              type: array
+              items:
+                type: integer
+            fecha_recepcion:
+              type: string
+              format: date
+            observaciones:
+              type: string
+    responses:
+      200:
+        description: Resultado por comodato
+      400:
+        description: Error en los datos
+    """
+    data = request.get_json(silent=True) or {}
+    ids, error = _ids_payload(data)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        fecha_recepcion = None
+        if data.get('fecha_recepcion'):
+            fecha_recepcion = datetime.strptime(data['fecha_recepcion'], '%Y-%m-%d').date()
+        
+        errores = Comodato.finalizar_en_bloque(ids, fecha_recepcion, data.get('observaciones'))
+        db.session.commit()
+        
+        resultados = [
+            {'id_comodato': i, 'error': errores[i]} if i in errores
+            else {'id_comodato': i, 'estado': 'finalizado'}
+            for i in ids
+        ]
+        return jsonify({
+            'resultados': resultados,
+            'finalizados': len(ids) - len(errores),
+            'fallidos': len(errores)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+@api_bp.route('/comodatos/renovar', methods=['POST'])
+@jwt_required()
+@require_roles('admin')
+def renovar_comodatos():
+    """
+    Renovar varios comodatos
+    ---
+    tags:
+      - Comodatos
+    security:
+      - BearerAuth: []
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          required:
+            - ids
+            - fecha_inicio
+            - fecha_fin
+          properties:
+            ids:
+              type: array
+              items:
+                type: integer
+            fecha_inicio:
+              type: string
+              format: date
+            fecha_fin:
+              type: string
+              format: date
+            observaciones:
+              type: string
+    responses:
+      200:
+        description: Resultado por comodato con el contrato sucesor
+      400:
+        description: Error en los datos
+    """
+    data = request.get_json(silent=True) or {}
+    ids, error = _ids_payload(data)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        fecha_inicio = datetime.strptime(data['fecha_inicio'], '%Y-%m-%d').date()
+        fecha_fin = datetime.strptime(data['fecha_fin'], '%Y-%m-%d').date()
+        is_valid, message = Validators.validate_fechas_comodato(fecha_inicio, fecha_fin)
+        if not is_valid:
+            return jsonify({'error': message}), 400
+        
+        renovados, errores = ComodatoManager.renovar_comodatos(
+            ids, fecha_inicio, fecha_fin, data.get('observaciones')
+        )
+        db.session.commit()
+        
+        resultados = [
+            {'id_comodato': i, 'error': errores[i]} if i in errores
+            else {'id_comodato': i, 'id_comodato_nuevo': renovados[i][0],
+                  'codigo_comodato': renovados[i][1]}
+            for i in ids
+        ]
+        return jsonify({
+            'resultados': resultados,
+            'renovados': len(renovados),
+            'fallidos': len(errores)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+def _ids_payload(data):
+    """Lista de ids sin repetir del payload, o mensaje de error"""
+    ids = data.get('ids')
+    if (not isinstance(ids, list) or not ids
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+        return None, 'Se requiere una lista "ids" de enteros'
+    maximo = current_app.config.get('BULK_MAX_ITEMS', 1000)
+    if len(ids) > maximo:
+        return None, f'Máximo {maximo} comodatos por petición'
+    return list(dict.fromkeys(ids)), None
+
 @api_bp.route('/comodatos/reportes/vencidos', methods=['GET'])
 @jwt_required()
 @require_roles('admin')
+@conditional_get('comodato')
 def get_comodatos_vencidos():
     """
     Obtener reporte de comodatos vencidos
@@ -367,12 +503,14 @@ def get_comodatos_vencidos():
       200:
         description: Reporte de comodatos vencidos
     """
-    comodatos_vencidos = Comodato.query.filter(
+    query = Comodato.query.filter(
         Comodato.estado == 'activo',
         Comodato.fecha_fin < date.today()
-    ).order_by(Comodato.fecha_fin).all()
+    ).order_by(Comodato.fecha_fin)
     
-    return jsonify(comodatos_schema.dump(comodatos_vencidos)), 200
+    comodatos_vencidos = QueryOptions.comodatos(query).all()
+    
+    return jsonify(FastDump.dump(comodatos_schema, comodatos_vencidos)), 200
 
 @api_bp.route('/comodatos/reportes/exportar', methods=['GET'])
 @jwt_required()
@@ -401,43 +539,27 @@ def exportar_comodatos():
               type: string
               format: binary
     """
-    comodatos = Comodato.query.all()
-    data = []
-    
-    for comodato in comodatos:
-        data.append({
-            'Código Comodato': comodato.codigo_comodato,
-            'Correlativo': comodato.correlativo,
-            'Alumno': f"{comodato.alumno.nombre} {comodato.alumno.apellido}" if comodato.alumno else '',
-            'Cédula Alumno': comodato.alumno.cedula if comodato.alumno else '',
-            'Representante': f"{comodato.representante.nombre} {comodato.representante.apellido}" if comodato.representante else '',
-            'Instrumento': comodato.instrumento.descripcion if comodato.instrumento else '',
-            'Marca': comodato.instrumento.marca if comodato.instrumento else '',
-            'Modelo': comodato.instrumento.modelo if comodato.instrumento else '',
-            'Serial Inventario': comodato.instrumento.serial_inventario if comodato.instrumento else '',
-            'Fecha Inicio': comodato.fecha_inicio,
-            'Fecha Fin': comodato.fecha_fin,
-            'Fecha Recepción': comodato.fecha_recepcion,
-            'Estado': comodato.estado,
-            'Días Restantes': comodato.dias_restantes,
-            'Observaciones': comodato.observaciones
-        })
-    
-    df = pd.DataFrame(data)
-    
     formato = request.args.get('formato', 'excel')
+    query = QueryOptions.comodatos(Comodato.query, 'completo')
     
     if formato == 'csv':
-        output = df.to_csv(index=False, encoding='utf-8-sig')
-        mimetype = 'text/csv'
-        filename = f'comodatos_{date.today()}.csv'
-    else:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Comodatos')
-        output.seek(0)
-        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        filename = f'comodatos_{date.today()}.xlsx'
+        return CSVExporter.stream(
+            query,
+            (Comodato.id_comodato,),
+            COLUMNAS_EXPORTACION,
+            _fila_exportacion,
+            f'comodatos_{date.today()}.csv'
+        )
+    
+    data = [_fila_exportacion(comodato) for comodato in query.all()]
+    df = pd.DataFrame(data, columns=COLUMNAS_EXPORTACION)
+    
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Comodatos')
+    output.seek(0)
+    mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    filename = f'comodatos_{date.today()}.xlsx'
     
     from flask import send_file
     return send_file(
@@ -445,4 +567,31 @@ def exportar_comodatos():
         mimetype=mimetype,
         as_attachment=True,
         download_name=filename
-    )
\ No newline at end of file
+    )
+
+COLUMNAS_EXPORTACION = [
+    'Código Comodato', 'Correlativo', 'Alumno', 'Cédula Alumno',
+    'Representante', 'Instrumento', 'Marca', 'Modelo', 'Serial Inventario',
+    'Fecha Inicio', 'Fecha Fin', 'Fecha Recepción', 'Estado',
+    'Días Restantes', 'Observaciones'
+]
+
+def _fila_exportacion(comodato):
+    """Fila de exportación de un comodato (perfil de carga 'completo')"""
+    return {
+        'Código Comodato': comodato.codigo_comodato,
+        'Correlativo': comodato.correlativo,
+        'Alumno': f"{comodato.alumno.nombre} {comodato.alumno.apellido}" if comodato.alumno else '',
+        'Cédula Alumno': comodato.alumno.cedula if comodato.alumno else '',
+        'Representante': f"{comodato.representante.nombre} {comodato.representante.apellido}" if comodato.representante else '',
+        'Instrumento': comodato.instrumento.descripcion if comodato.instrumento else '',
+        'Marca': comodato.instrumento.marca if comodato.instrumento else '',
+        'Modelo': comodato.instrumento.modelo if comodato.instrumento else '',
+        'Serial Inventario': comodato.instrumento.serial_inventario if comodato.instrumento else '',
+        'Fecha Inicio': comodato.fecha_inicio,
+        'Fecha Fin': comodato.fecha_fin,
+        'Fecha Recepción': comodato.fecha_recepcion,
+        'Estado': comodato.estado,
+        'Días Restantes': comodato.dias_restantes,
+        'Observaciones': comodato.observaciones
+    }
\ No newline at end of file
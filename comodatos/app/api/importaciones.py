@@ -0,0 +1,78 @@
+from flask import request, jsonify, current_app
+from app.models import Importacion
+from app.auth.utils import require_roles, get_principal
+from app.api import api_bp
+from flask_jwt_extended import jwt_required
+from app.utils.import_jobs import ImportJobs
+
+@api_bp.route('/importaciones', methods=['POST'])
+@jwt_required()
+@require_roles('admin')
+def crear_importacion():
+    """
+    Subir un archivo de importación (se procesa en segundo plano)
+    ---
+    tags:
+      - Importaciones
+    security:
+      - BearerAuth: []
+    consumes:
+      - multipart/form-data
+    parameters:
+      - name: archivo
+        in: formData
+        type: file
+        required: true
+        description: Hoja "Relacion de comodato" en .xlsx o .csv
+    responses:
+      202:
+        description: Importación encolada
+      400:
+        description: Archivo faltante o con formato no soportado
+      413:
+        description: El archivo supera IMPORT_MAX_BYTES
+    """
+    archivo = request.files.get('archivo')
+    if not archivo or not archivo.filename:
+        return jsonify({'error': 'Debe enviar el archivo en el campo "archivo"'}), 400
+    
+    extension = archivo.filename.rsplit('.', 1)[-1].lower()
+    if extension not in ImportJobs.FORMATOS:
+        return jsonify({'error': 'Formato no soportado (use .xlsx o .csv)'}), 400
+    
+    contenido = ImportJobs.leer_archivo(archivo)
+    if contenido is None:
+        maximo = current_app.config.get('IMPORT_MAX_BYTES') // (1024 * 1024)
+        return jsonify({'error': f'El archivo supera el tamaño máximo ({maximo} MB)'}), 413
+    
+    importacion = ImportJobs.crear(archivo, contenido, get_principal().id_usuario)
+    
+    return jsonify(importacion.to_dict()), 202
+
+@api_bp.route('/importaciones/<int:id>', methods=['GET'])
+@jwt_required()
+@require_roles('admin')
+def get_importacion(id):
+    """
+    Consultar el estado y progreso de una importación
+    ---
+    tags:
+      - Importaciones
+    security:
+      - BearerAuth: []
+    parameters:
+      - name: id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Estado, filas procesadas y fallidas, filas por segundo y resumen final
+      404:
+        description: Importación no encontrada
+    """
+    # Tras un reinicio, la primera consulta retoma los trabajos interrumpidos
+    ImportJobs.iniciar()
+    
+    importacion = Importacion.query.get_or_404(id)
+    return jsonify(importacion.to_dict()), 200
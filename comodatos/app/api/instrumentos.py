@@ -1,19 +1,29 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from datetime import datetime, date
 from app.extensions import db
-from app.models import Instrumento, Medida, EstadoInstrumento, Accesorio, HistorialEstadoInstr
+from app.models import Instrumento, Medida, EstadoInstrumento, Accesorio, HistorialEstadoInstr, Comodato
 from app.schemas import instrumento_schema, instrumentos_schema, accesorio_schema, accesorios_schema, historial_estado_schema, historiales_estado_schema
 from app.auth.utils import require_roles
 from app.api import api_bp
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.utils.validators import Validators
+from app.utils.text import normalize_text, prefix_pattern
 from app.utils.generators import CodeGenerator
+from app.utils.query_options import QueryOptions
+from app.utils.pagination import Paginator
+from app.utils.exporters import CSVExporter
+from app.utils.reference_data import ReferenceData
+from app.utils.bulk_create import BulkCreate
+from app.utils.fast_dump import FastDump
+from app.utils.table_versions import conditional_get
 import pandas as pd
 from io import BytesIO
 from flask import send_file
+from sqlalchemy import func, select
 
 @api_bp.route('/instrumentos', methods=['GET'])
 @jwt_required()
+@conditional_get('instrumento', 'estado_instrumento')
 def get_instrumentos():
     """
     Obtener todos los instrumentos
@@ -31,6 +41,10 @@ def get_instrumentos():
         in: query
         type: integer
         default: 20
+      - name: cursor
+        in: query
+        type: string
+        description: Paginación por cursor (enviar vacío para la primera página); omite el total
       - name: estado
         in: query
         type: string
@@ -47,13 +61,14 @@ def get_instrumentos():
       - name: search
         in: query
         type: string
-        description: Buscar por descripción, marca, modelo o serial
+        description: Buscar por el inicio de descripción, marca, modelo o serial (sin distinguir acentos)
     responses:
       200:
         description: Lista de instrumentos
     """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor')
     estado = request.args.get('estado')
     descripcion = request.args.get('descripcion')
     marca = request.args.get('marca')
@@ -69,33 +84,46 @@ def get_instrumentos():
         )
     
     if descripcion:
-        query = query.filter(Instrumento.descripcion.ilike(f"%{descripcion}%"))
+        query = query.filter(Instrumento.descripcion_norm.like(
+            prefix_pattern(normalize_text(descripcion)), escape='\\'
+        ))
     
     if marca:
-        query = query.filter(Instrumento.marca.ilike(f"%{marca}%"))
+        query = query.filter(Instrumento.marca_norm.like(
+            prefix_pattern(normalize_text(marca)), escape='\\'
+        ))
     
     if id_medida:
         query = query.filter_by(id_medida=id_medida)
     
     if search:
-        search_term = f"%{search}%"
+        # Todas las ramas son búsquedas por prefijo sobre columnas indexadas
+        patron = prefix_pattern(normalize_text(search.strip()))
         query = query.filter(
             db.or_(
-                Instrumento.descripcion.ilike(search_term),
-                Instrumento.marca.ilike(search_term),
-                Instrumento.modelo.ilike(search_term),
-                Instrumento.serial_fabrica.ilike(search_term),
-                Instrumento.serial_inventario.ilike(search_term)
+                Instrumento.descripcion_norm.like(patron, escape='\\'),
+                Instrumento.marca_norm.like(patron, escape='\\'),
+                Instrumento.modelo_norm.like(patron, escape='\\'),
+                Instrumento.serial_fabrica_norm.like(patron, escape='\\'),
+                Instrumento.serial_inventario.like(prefix_pattern(search.strip()), escape='\\')
             )
         )
     
     # Ordenar por descripción
-    query = query.order_by(Instrumento.descripcion, Instrumento.marca)
+    orden = (Instrumento.descripcion, Instrumento.marca, Instrumento.id_instr)
+    
+    if cursor is not None:
+        pagina = Paginator.keyset(query, orden, cursor, per_page)
+        return jsonify({
+            'instrumentos': FastDump.dump(instrumentos_schema, pagina.items),
+            **pagina.meta()
+        }), 200
     
+    query = query.order_by(*orden)
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'instrumentos': instrumentos_schema.dump(pagination.items),
+        'instrumentos': FastDump.dump(instrumentos_schema, pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': page
@@ -104,6 +132,7 @@ def get_instrumentos():
 @api_bp.route('/instrumentos/disponibles', methods=['GET'])
 @jwt_required()
 @require_roles('admin', 'representante')
+@conditional_get('instrumento', 'estado_instrumento')
 def get_instrumentos_disponibles():
     """
     Obtener instrumentos disponibles
@@ -131,7 +160,9 @@ def get_instrumentos_disponibles():
     )
     
     if descripcion:
-        query = query.filter(Instrumento.descripcion.ilike(f"%{descripcion}%"))
+        query = query.filter(Instrumento.descripcion_norm.like(
+            prefix_pattern(normalize_text(descripcion)), escape='\\'
+        ))
     
     if id_medida:
         query = query.filter_by(id_medida=id_medida)
@@ -141,7 +172,53 @@ def get_instrumentos_disponibles():
     
     instrumentos = query.all()
     
-    return jsonify(instrumentos_schema.dump(instrumentos)), 200
+    return jsonify(FastDump.dump(instrumentos_schema, instrumentos)), 200
+
+@api_bp.route('/instrumentos/seriales', methods=['POST'])
+@jwt_required()
+@require_roles('admin')
+def generar_seriales_inventario():
+    """
+    Generar un lote de seriales de inventario libres
+    ---
+    tags:
+      - Instrumentos
+    security:
+      - BearerAuth: []
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          properties:
+            cantidad:
+              type: integer
+              description: Número de seriales (1-1000)
+    responses:
+      201:
+        description: Seriales generados y reservados
+      400:
+        description: Cantidad inválida
+    """
+    data = request.get_json(silent=True) or {}
+    cantidad = data.get('cantidad', 1)
+    
+    if not isinstance(cantidad, int) or not 1 <= cantidad <= 1000:
+        return jsonify({'error': 'La cantidad debe estar entre 1 y 1000'}), 400
+    
+    try:
+        seriales = CodeGenerator.generate_seriales_inventario(cantidad)
+        db.session.commit()
+        
+        return jsonify({
+            'seriales': seriales,
+            'total': len(seriales),
+            'horas_reserva': current_app.config['SERIAL_RESERVA_HORAS']
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
 
 @api_bp.route('/instrumentos', methods=['POST'])
 @jwt_required()
@@ -209,21 +286,19 @@ def create_instrumento():
         
         # Verificar que la medida exista (si se proporciona)
         if 'id_medida' in data and data['id_medida']:
-            if not Medida.query.get(data['id_medida']):
+            if not ReferenceData.medida(data['id_medida']):
                 return jsonify({'error': 'Medida no encontrada'}), 404
         
         # Verificar que el estado exista (si se proporciona)
         estado_id = data.get('id_estado_instr')
         if not estado_id:
             # Por defecto, disponible
-            estado_disponible = EstadoInstrumento.query.filter_by(
-                nombre='disponible'
-            ).first()
+            estado_disponible = ReferenceData.estado_id('disponible')
             if estado_disponible:
-                data['id_estado_instr'] = estado_disponible.id_estado_instr
+                data['id_estado_instr'] = estado_disponible
             else:
                 return jsonify({'error': 'Estado "disponible" no configurado'}), 500
-        elif not EstadoInstrumento.query.get(estado_id):
+        elif not ReferenceData.estado(estado_id):
             return jsonify({'error': 'Estado no encontrado'}), 404
         
         # Sanitizar entradas
@@ -253,6 +328,50 @@ def create_instrumento():
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+@api_bp.route('/instrumentos/bulk', methods=['POST'])
+@jwt_required()
+@require_roles('admin')
+def create_instrumentos_bulk():
+    """
+    Crear instrumentos en bloque
+    ---
+    tags:
+      - Instrumentos
+    security:
+      - BearerAuth: []
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          required:
+            - items
+          properties:
+            items:
+              type: array
+              description: Instrumentos con los mismos campos que POST /instrumentos
+              items:
+                type: object
+    responses:
+      201:
+        description: Todos los instrumentos creados
+      207:
+        description: Creación parcial; ver el error de cada elemento
+      400:
+        description: Ningún instrumento creado
+    """
+    items, error = BulkCreate.validar_payload(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        cuerpo, codigo = BulkCreate.respuesta(BulkCreate.instrumentos(items))
+        return jsonify(cuerpo), codigo
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
 @api_bp.route('/instrumentos/<int:id>', methods=['GET'])
 @jwt_required()
 def get_instrumento(id):
@@ -332,7 +451,7 @@ def update_instrumento(id):
         
         # Verificar que la medida exista (si se proporciona)
         if 'id_medida' in data and data['id_medida']:
-            if not Medida.query.get(data['id_medida']):
+            if not ReferenceData.medida(data['id_medida']):
                 return jsonify({'error': 'Medida no encontrada'}), 404
         
         # Sanitizar entradas
@@ -393,24 +512,24 @@ def cambiar_estado_instrumento(id):
         data = request.get_json()
         
         # Verificar que el estado exista
-        nuevo_estado = EstadoInstrumento.query.get(data['id_estado_instr'])
+        nuevo_estado = ReferenceData.estado(data['id_estado_instr'])
         if not nuevo_estado:
             return jsonify({'error': 'Estado no encontrado'}), 404
         
         # Verificar que no sea el mismo estado
-        if instrumento.id_estado_instr == data['id_estado_instr']:
+        if instrumento.id_estado_instr == nuevo_estado['id_estado_instr']:
             return jsonify({'error': 'El instrumento ya tiene ese estado'}), 400
         
         # Cambiar estado
         historial = instrumento.cambiar_estado(
-            data['id_estado_instr'],
+            nuevo_estado['id_estado_instr'],
             data.get('observacion')
         )
         
         db.session.commit()
         
         return jsonify({
-            'message': f'Estado cambiado a {nuevo_estado.nombre}',
+            'message': f"Estado cambiado a {nuevo_estado['nombre']}",
             'instrumento': instrumento_schema.dump(instrumento),
             'historial': historial_estado_schema.dump(historial)
         }), 200
@@ -419,6 +538,78 @@ def cambiar_estado_instrumento(id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+@api_bp.route('/instrumentos/cambiar-estado', methods=['POST'])
+@jwt_required()
+@require_roles('admin')
+def cambiar_estado_instrumentos():
+    """
+    Cambiar el estado de varios instrumentos
+    ---
+    tags:
+      - Instrumentos
+    security:
+      - BearerAuth: []
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          required:
+            - ids
+            - id_estado_instr
+          properties:
+            ids:
+              type: array
+              items:
+                type: integer
+            id_estado_instr:
+              type: integer
+            observacion:
+              type: string
+    responses:
+      200:
+        description: Estados cambiados; se indican los ids omitidos
+      400:
+        description: Error en los datos
+      404:
+        description: Estado no encontrado
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    maximo = current_app.config.get('BULK_MAX_ITEMS', 1000)
+    
+    if (not isinstance(ids, list) or not ids
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+        return jsonify({'error': 'Se requiere una lista "ids" de enteros'}), 400
+    if len(ids) > maximo:
+        return jsonify({'error': f'Máximo {maximo} instrumentos por petición'}), 400
+    
+    id_estado = data.get('id_estado_instr')
+    nuevo_estado = ReferenceData.estado(id_estado) if not isinstance(id_estado, bool) else None
+    if not nuevo_estado:
+        return jsonify({'error': 'Estado no encontrado'}), 404
+    
+    try:
+        observacion = data.get('observacion')
+        if observacion:
+            observacion = Validators.sanitize_input(observacion)
+        
+        cambiados, sin_cambio, no_encontrados = Instrumento.cambiar_estado_en_bloque(
+            list(dict.fromkeys(ids)), nuevo_estado['id_estado_instr'], observacion
+        )
+        db.session.commit()
+        
+        return jsonify({
+            'message': f"{len(cambiados)} instrumentos cambiados a {nuevo_estado['nombre']}",
+            'cambiados': cambiados,
+            'omitidos': sin_cambio,
+            'no_encontrados': no_encontrados
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
 @api_bp.route('/instrumentos/<int:id>/historial-estados', methods=['GET'])
 @jwt_required()
 @require_roles('admin')
@@ -476,7 +667,7 @@ def get_accesorios_instrumento(id):
     instrumento = Instrumento.query.get_or_404(id)
     accesorios = instrumento.accesorios.all()
     
-    return jsonify(accesorios_schema.dump(accesorios)), 200
+    return jsonify(FastDump.dump(accesorios_schema, accesorios)), 200
 
 @api_bp.route('/instrumentos/<int:id>/accesorios', methods=['POST'])
 @jwt_required()
@@ -576,10 +767,10 @@ def get_comodatos_instrumento(id):
     
     query = query.order_by(Comodato.fecha_inicio.desc())
     
-    comodatos = query.all()
+    comodatos = QueryOptions.comodatos(query).all()
     
     from app.schemas import comodatos_schema
-    return jsonify(comodatos_schema.dump(comodatos)), 200
+    return jsonify(FastDump.dump(comodatos_schema, comodatos)), 200
 
 @api_bp.route('/instrumentos/exportar', methods=['GET'])
 @jwt_required()
@@ -603,56 +794,84 @@ def exportar_instrumentos():
       200:
         description: Archivo exportado
     """
-    from datetime import date
-    import pandas as pd
-    from io import BytesIO
-    from flask import send_file
-    
-    instrumentos = Instrumento.query.all()
-    data = []
-    
-    for instrumento in instrumentos:
-        data.append({
-            'ID': instrumento.id_instr,
-            'Descripción': instrumento.descripcion,
-            'Marca': instrumento.marca,
-            'Modelo': instrumento.modelo,
-            'Medida': instrumento.medida.nombre if instrumento.medida else '',
-            'Color': instrumento.color,
-            'Serial Fábrica': instrumento.serial_fabrica,
-            'Serial Inventario': instrumento.serial_inventario,
-            'Estado': instrumento.estado_actual.nombre if instrumento.estado_actual else '',
-            'Fecha Adquisición': instrumento.fecha_adquisicion,
-            'Observaciones': instrumento.observaciones,
-            'Accesorios': len(instrumento.accesorios.all()),
-            'Comodatos Activos': len([c for c in instrumento.comodatos if c.estado == 'activo']),
-            'Comodatos Totales': len(instrumento.comodatos.all())
-        })
-    
-    df = pd.DataFrame(data)
-    
+    query = _query_exportacion()
     formato = request.args.get('formato', 'excel')
     
     if formato == 'csv':
-        output = df.to_csv(index=False, encoding='utf-8-sig')
-        mimetype = 'text/csv'
-        filename = f'instrumentos_{date.today()}.csv'
-        return send_file(
-            BytesIO(output.encode('utf-8-sig')),
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename
+        return CSVExporter.stream(
+            query,
+            (Instrumento.id_instr,),
+            COLUMNAS_EXPORTACION,
+            _fila_exportacion,
+            f'instrumentos_{date.today()}.csv'
         )
-    else:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Instrumentos')
-        output.seek(0)
-        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        filename = f'instrumentos_{date.today()}.xlsx'
-        return send_file(
-            output,
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename
-        )
\ No newline at end of file
+    
+    data = [_fila_exportacion(row) for row in query.all()]
+    df = pd.DataFrame(data, columns=COLUMNAS_EXPORTACION)
+    
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Instrumentos')
+    output.seek(0)
+    mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    filename = f'instrumentos_{date.today()}.xlsx'
+    return send_file(
+        output,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=filename
+    )
+
+COLUMNAS_EXPORTACION = [
+    'ID', 'Descripción', 'Marca', 'Modelo', 'Medida', 'Color',
+    'Serial Fábrica', 'Serial Inventario', 'Estado', 'Fecha Adquisición',
+    'Observaciones', 'Accesorios', 'Comodatos Activos', 'Comodatos Totales'
+]
+
+def _query_exportacion():
+    """
+    Instrumentos con sus contadores en una sola consulta.
+
+    Accesorios y comodatos se cuentan con subconsultas COUNT correlacionadas
+    por id_instr (con índice), así que cada lote del CSV solo cuenta los de
+    sus propias filas; el nombre de la medida y del estado se obtienen por JOIN.
+    """
+    def contar(columna, *condiciones):
+        return select(func.count(columna)).where(*condiciones).scalar_subquery()
+
+    comodato_del_instr = Comodato.id_instr == Instrumento.id_instr
+    
+    return db.session.query(
+        Instrumento,
+        Medida.nombre.label('medida_nombre'),
+        EstadoInstrumento.nombre.label('estado_nombre'),
+        contar(Accesorio.id_acc, Accesorio.id_instr == Instrumento.id_instr).label('accesorios'),
+        contar(
+            Comodato.id_comodato, comodato_del_instr, Comodato.estado == 'activo'
+        ).label('comodatos_activos'),
+        contar(Comodato.id_comodato, comodato_del_instr).label('comodatos_totales')
+    ).outerjoin(
+        Medida, Medida.id_medida == Instrumento.id_medida
+    ).outerjoin(
+        EstadoInstrumento, EstadoInstrumento.id_estado_instr == Instrumento.id_estado_instr
+    )
+
+def _fila_exportacion(row):
+    """Fila de exportación a partir de una fila de _query_exportacion()"""
+    instrumento = row.Instrumento
+    return {
+        'ID': instrumento.id_instr,
+        'Descripción': instrumento.descripcion,
+        'Marca': instrumento.marca,
+        'Modelo': instrumento.modelo,
+        'Medida': row.medida_nombre or '',
+        'Color': instrumento.color,
+        'Serial Fábrica': instrumento.serial_fabrica,
+        'Serial Inventario': instrumento.serial_inventario,
+        'Estado': row.estado_nombre or '',
+        'Fecha Adquisición': instrumento.fecha_adquisicion,
+        'Observaciones': instrumento.observaciones,
+        'Accesorios': row.accesorios,
+        'Comodatos Activos': row.comodatos_activos,
+        'Comodatos Totales': row.comodatos_totales
+    }
\ No newline at end of file
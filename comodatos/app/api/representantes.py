@@ -4,16 +4,24 @@ from app.models import Representante, Usuario, Alumno, Comodato
 from app.schemas import representante_schema, representantes_schema
 from app.auth.utils import require_roles
 from app.api import api_bp
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from flask_jwt_extended import jwt_required
 from app.utils.validators import Validators
+from app.utils.text import normalize_text, prefix_pattern
+from app.utils.query_options import QueryOptions
+from app.utils.pagination import Paginator
+from app.utils.exporters import CSVExporter
+from app.utils.fast_dump import FastDump
+from app.utils.table_versions import conditional_get
 import pandas as pd
 from io import BytesIO
 from flask import send_file
 from datetime import date
+from sqlalchemy import func, select
 
 @api_bp.route('/representantes', methods=['GET'])
 @jwt_required()
 @require_roles('admin')
+@conditional_get('representante')
 def get_representantes():
     """
     Obtener todos los representantes
@@ -31,37 +39,52 @@ def get_representantes():
         in: query
         type: integer
         default: 20
+      - name: cursor
+        in: query
+        type: string
+        description: Paginación por cursor (enviar vacío para la primera página); omite el total
       - name: search
         in: query
         type: string
-        description: Buscar por nombre, apellido o cédula
+        description: Buscar por inicio de nombre, apellido o cédula (sin distinguir acentos)
     responses:
       200:
         description: Lista de representantes
     """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor')
     search = request.args.get('search')
     
     query = Representante.query
     
     if search:
-        search_term = f"%{search}%"
+        # Búsqueda por prefijo sobre columnas normalizadas e indexadas
+        patron = prefix_pattern(normalize_text(search.strip()))
         query = query.filter(
             db.or_(
-                Representante.nombre.ilike(search_term),
-                Representante.apellido.ilike(search_term),
-                Representante.cedula.ilike(search_term)
+                Representante.nombre_norm.like(patron, escape='\\'),
+                Representante.apellido_norm.like(patron, escape='\\'),
+                *[Representante.cedula.like(prefix_pattern(p), escape='\\')
+                  for p in Validators.cedula_prefixes(search)]
             )
         )
     
     # Ordenar por nombre
-    query = query.order_by(Representante.nombre, Representante.apellido)
+    orden = (Representante.nombre, Representante.apellido, Representante.id_repr)
     
+    if cursor is not None:
+        pagina = Paginator.keyset(query, orden, cursor, per_page)
+        return jsonify({
+            'representantes': FastDump.dump(representantes_schema, pagina.items),
+            **pagina.meta()
+        }), 200
+    
+    query = query.order_by(*orden)
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'representantes': representantes_schema.dump(pagination.items),
+        'representantes': FastDump.dump(representantes_schema, pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': page
@@ -89,14 +112,6 @@ def get_representante(id):
         description: Representante no encontrado
     """
     representante = Representante.query.get_or_404(id)
-    
-    # Verificar permisos (representantes solo pueden verse a sí mismos)
-    claims = get_jwt()
-    if claims.get('rol') == 'representante':
-        usuario = Usuario.query.get(get_jwt_identity())
-        if representante.id_repr != usuario.representante.id_repr:
-            return jsonify({'error': 'No autorizado'}), 403
-    
     return jsonify(representante_schema.dump(representante)), 200
 
 @api_bp.route('/representantes/<int:id>', methods=['PUT'])
@@ -137,20 +152,12 @@ def update_representante(id):
         description: Error en los datos
     """
     representante = Representante.query.get_or_404(id)
-    
-    # Verificar permisos
-    claims = get_jwt()
-    if claims.get('rol') == 'representante':
-        usuario = Usuario.query.get(get_jwt_identity())
-        if representante.id_repr != usuario.representante.id_repr:
-            return jsonify({'error': 'No autorizado'}), 403
-    
     try:
         data = request.get_json()
         
         # No permitir cambiar cédula si ya existe otra con la misma
         if 'cedula' in data and data['cedula'] != representante.cedula:
-            if Representante.query.filter_by(cedula=data['cedula']).first():
+            if Representante.query.filter_by(cedula=data['cedula']).execution_options(row_scope=False).first():
                 return jsonify({'error': 'La cédula ya está registrada'}), 400
             
             if not Validators.validate_cedula(data['cedula']):
@@ -199,14 +206,6 @@ def get_alumnos_representante(id):
         description: Lista de alumnos
     """
     representante = Representante.query.get_or_404(id)
-    
-    # Verificar permisos
-    claims = get_jwt()
-    if claims.get('rol') == 'representante':
-        usuario = Usuario.query.get(get_jwt_identity())
-        if representante.id_repr != usuario.representante.id_repr:
-            return jsonify({'error': 'No autorizado'}), 403
-    
     estado = request.args.get('estado')
     
     query = representante.alumnos
@@ -219,7 +218,7 @@ def get_alumnos_representante(id):
     alumnos = query.all()
     
     from app.schemas import alumnos_schema
-    return jsonify(alumnos_schema.dump(alumnos)), 200
+    return jsonify(FastDump.dump(alumnos_schema, alumnos)), 200
 
 @api_bp.route('/representantes/<int:id>/comodatos', methods=['GET'])
 @jwt_required()
@@ -249,14 +248,6 @@ def get_comodatos_representante(id):
         description: Lista de comodatos
     """
     representante = Representante.query.get_or_404(id)
-    
-    # Verificar permisos
-    claims = get_jwt()
-    if claims.get('rol') == 'representante':
-        usuario = Usuario.query.get(get_jwt_identity())
-        if representante.id_repr != usuario.representante.id_repr:
-            return jsonify({'error': 'No autorizado'}), 403
-    
     estado = request.args.get('estado')
     vencidos = request.args.get('vencidos', False, type=bool)
     
@@ -273,10 +264,10 @@ def get_comodatos_representante(id):
     
     query = query.order_by(Comodato.fecha_inicio.desc())
     
-    comodatos = query.all()
+    comodatos = QueryOptions.comodatos(query).all()
     
     from app.schemas import comodatos_schema
-    return jsonify(comodatos_schema.dump(comodatos)), 200
+    return jsonify(FastDump.dump(comodatos_schema, comodatos)), 200
 
 @api_bp.route('/representantes/<int:id>/estadisticas', methods=['GET'])
 @jwt_required()
@@ -299,14 +290,6 @@ def get_estadisticas_representante(id):
         description: Estadísticas del representante
     """
     representante = Representante.query.get_or_404(id)
-    
-    # Verificar permisos
-    claims = get_jwt()
-    if claims.get('rol') == 'representante':
-        usuario = Usuario.query.get(get_jwt_identity())
-        if representante.id_repr != usuario.representante.id_repr:
-            return jsonify({'error': 'No autorizado'}), 403
-    
     # Obtener estadísticas
     alumnos_activos = representante.alumnos.filter_by(estado='activo').count()
     alumnos_totales = representante.alumnos.count()
@@ -358,63 +341,82 @@ def exportar_representantes():
       200:
         description: Archivo exportado
     """
-    from datetime import date
-    import pandas as pd
-    from io import BytesIO
-    from flask import send_file
-    
-    representantes = Representante.query.all()
-    data = []
-    
-    for representante in representantes:
-        alumnos_activos = representante.alumnos.filter_by(estado='activo').count()
-        alumnos_totales = representante.alumnos.count()
-        
-        comodatos_activos = representante.comodatos.filter_by(estado='activo').count()
-        comodatos_vencidos = representante.comodatos.filter(
-            Comodato.estado == 'activo',
-            Comodato.fecha_fin < date.today()
-        ).count()
-        
-        data.append({
-            'ID': representante.id_repr,
-            'Nombre': representante.nombre,
-            'Apellido': representante.apellido,
-            'Cédula': representante.cedula,
-            'Teléfono': representante.telefono,
-            'Dirección': representante.direccion,
-            'Email': representante.usuario.email if representante.usuario else '',
-            'Estado Usuario': 'Activo' if representante.usuario and representante.usuario.is_active else 'Inactivo',
-            'Alumnos Activos': alumnos_activos,
-            'Alumnos Totales': alumnos_totales,
-            'Comodatos Activos': comodatos_activos,
-            'Comodatos Vencidos': comodatos_vencidos
-        })
-    
-    df = pd.DataFrame(data)
-    
+    query = _query_exportacion()
     formato = request.args.get('formato', 'excel')
     
     if formato == 'csv':
-        output = df.to_csv(index=False, encoding='utf-8-sig')
-        mimetype = 'text/csv'
-        filename = f'representantes_{date.today()}.csv'
-        return send_file(
-            BytesIO(output.encode('utf-8-sig')),
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename
+        return CSVExporter.stream(
+            query,
+            (Representante.id_repr,),
+            COLUMNAS_EXPORTACION,
+            _fila_exportacion,
+            f'representantes_{date.today()}.csv'
         )
-    else:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Representantes')
-        output.seek(0)
-        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        filename = f'representantes_{date.today()}.xlsx'
-        return send_file(
-            output,
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename
-        )
\ No newline at end of file
+    
+    data = [_fila_exportacion(row) for row in query.all()]
+    df = pd.DataFrame(data, columns=COLUMNAS_EXPORTACION)
+    
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Representantes')
+    output.seek(0)
+    mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    filename = f'representantes_{date.today()}.xlsx'
+    return send_file(
+        output,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=filename
+    )
+
+COLUMNAS_EXPORTACION = [
+    'ID', 'Nombre', 'Apellido', 'Cédula', 'Teléfono', 'Dirección', 'Email',
+    'Estado Usuario', 'Alumnos Activos', 'Alumnos Totales',
+    'Comodatos Activos', 'Comodatos Vencidos'
+]
+
+def _query_exportacion():
+    """
+    Representantes con sus contadores en una sola consulta.
+
+    Cada contador es una subconsulta COUNT correlacionada por id_repr (con
+    índice), así que cada lote del CSV solo cuenta los alumnos y comodatos
+    de sus propias filas en lugar de agrupar las tablas completas.
+    """
+    def contar(columna, *condiciones):
+        return select(func.count(columna)).where(*condiciones).scalar_subquery()
+
+    alumno_del_repr = Alumno.id_repr == Representante.id_repr
+    comodato_activo = db.and_(Comodato.id_repr == Representante.id_repr, Comodato.estado == 'activo')
+    
+    return db.session.query(
+        Representante,
+        Usuario.email,
+        Usuario.is_active,
+        contar(Alumno.id_alumno, alumno_del_repr, Alumno.estado == 'activo').label('alumnos_activos'),
+        contar(Alumno.id_alumno, alumno_del_repr).label('alumnos_totales'),
+        contar(Comodato.id_comodato, comodato_activo).label('comodatos_activos'),
+        contar(
+            Comodato.id_comodato, comodato_activo, Comodato.fecha_fin < date.today()
+        ).label('comodatos_vencidos')
+    ).outerjoin(
+        Usuario, Usuario.id_usuario == Representante.id_usuario
+    )
+
+def _fila_exportacion(row):
+    """Fila de exportación a partir de una fila de _query_exportacion()"""
+    representante = row.Representante
+    return {
+        'ID': representante.id_repr,
+        'Nombre': representante.nombre,
+        'Apellido': representante.apellido,
+        'Cédula': representante.cedula,
+        'Teléfono': representante.telefono,
+        'Dirección': representante.direccion,
+        'Email': row.email or '',
+        'Estado Usuario': 'Activo' if row.is_active else 'Inactivo',
+        'Alumnos Activos': row.alumnos_activos,
+        'Alumnos Totales': row.alumnos_totales,
+        'Comodatos Activos': row.comodatos_activos,
+        'Comodatos Vencidos': row.comodatos_vencidos
+    }
\ No newline at end of file
@@ -5,6 +5,8 @@ from app.schemas import usuario_schema, usuarios_schema
 from app.auth.utils import require_roles
 from app.api import api_bp
 from flask_jwt_extended import jwt_required
+from app.utils.pagination import Paginator
+from app.utils.fast_dump import FastDump
 
 @api_bp.route('/usuarios', methods=['GET'])
 @jwt_required()
@@ -26,6 +28,10 @@ def get_usuarios():
         in: query
         type: integer
         default: 20
+      - name: cursor
+        in: query
+        type: string
+        description: Paginación por cursor (enviar vacío para la primera página); omite el total
       - name: rol
         in: query
         type: string
@@ -38,6 +44,7 @@ def get_usuarios():
     """
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor')
     rol = request.args.get('rol')
     
     query = Usuario.query
@@ -45,10 +52,20 @@ def get_usuarios():
     if rol:
         query = query.filter_by(rol=rol)
     
+    orden = (Usuario.id_usuario,)
+    
+    if cursor is not None:
+        pagina = Paginator.keyset(query, orden, cursor, per_page)
+        return jsonify({
+            'usuarios': FastDump.dump(usuarios_schema, pagina.items),
+            **pagina.meta()
+        }), 200
+    
+    query = query.order_by(*orden)
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'usuarios': usuarios_schema.dump(pagination.items),
+        'usuarios': FastDump.dump(usuarios_schema, pagination.items),
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': page
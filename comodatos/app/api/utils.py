@@ -1,20 +1,23 @@
-from flask import jsonify, request
+from flask import jsonify, request, current_app
 from app.extensions import db
-from app.models import Medida, EstadoInstrumento, Usuario, Representante, Alumno, Instrumento, Comodato
-from app.schemas import medida_schema, medidas_schema, estado_instrumento_schema, estados_instrumento_schema
+from app.models import Comodato
+from app.schemas import medida_schema, estado_instrumento_schema
 from app.schemas import alumnos_schema, representantes_schema, instrumentos_schema, comodatos_schema
 from app.api import api_bp
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.auth.utils import require_roles
 from datetime import date, timedelta
-from sqlalchemy import func
+from app.utils.estadisticas import EstadisticasDashboard
+from app.utils.cache import dashboard_cache
+from app.utils.search_index import SearchIndex
+from app.utils.reference_data import ReferenceData
+from app.utils.fast_dump import FastDump
 
 @api_bp.route('/medidas', methods=['GET'])
 @jwt_required()
 def get_medidas():
     """Obtener todas las medidas"""
-    medidas = Medida.query.order_by(Medida.nombre).all()
-    return jsonify(medidas_schema.dump(medidas)), 200
+    return jsonify(ReferenceData.medidas()), 200
 
 @api_bp.route('/medidas', methods=['POST'])
 @jwt_required()
@@ -24,7 +27,7 @@ def create_medida():
     try:
         data = request.get_json()
         
-        if Medida.query.filter_by(nombre=data['nombre']).first():
+        if ReferenceData.medida_por_nombre(data['nombre']):
             return jsonify({'error': 'La medida ya existe'}), 400
         
         medida = medida_schema.load(data)
@@ -40,8 +43,7 @@ def create_medida():
 @jwt_required()
 def get_estados_instrumento():
     """Obtener todos los estados de instrumento"""
-    estados = EstadoInstrumento.query.order_by(EstadoInstrumento.nombre).all()
-    return jsonify(estados_instrumento_schema.dump(estados)), 200
+    return jsonify(ReferenceData.estados()), 200
 
 @api_bp.route('/estados-instrumento', methods=['POST'])
 @jwt_required()
@@ -51,7 +53,7 @@ def create_estado_instrumento():
     try:
         data = request.get_json()
         
-        if EstadoInstrumento.query.filter_by(nombre=data['nombre']).first():
+        if ReferenceData.estado_por_nombre(data['nombre']):
             return jsonify({'error': 'El estado ya existe'}), 400
         
         estado = estado_instrumento_schema.load(data)
@@ -67,68 +69,10 @@ def create_estado_instrumento():
 @jwt_required()
 def get_estadisticas_dashboard():
     """Obtener estadísticas para el dashboard"""
-    
-    total_usuarios = Usuario.query.count()
-    total_representantes = Representante.query.count()
-    total_alumnos = Alumno.query.count()
-    total_instrumentos = Instrumento.query.count()
-    
-    # Instrumentos por estado
-    instrumentos_por_estado = db.session.query(
-        EstadoInstrumento.nombre,
-        func.count(Instrumento.id_instr)
-    ).join(Instrumento).group_by(EstadoInstrumento.nombre).all()
-    
-    # Comodatos por estado
-    comodatos_activos = Comodato.query.filter_by(estado='activo').count()
-    comodatos_finalizados = Comodato.query.filter_by(estado='finalizado').count()
-    comodatos_vencidos = Comodato.query.filter(
-        Comodato.estado == 'activo',
-        Comodato.fecha_fin < date.today()
-    ).count()
-    total_comodatos = Comodato.query.count()
-    
-    # Comodatos próximos a vencer (próximos 30 días)
-    fecha_limite = date.today() + timedelta(days=30)
-    comodatos_proximos = Comodato.query.filter(
-        Comodato.estado == 'activo',
-        Comodato.fecha_fin >= date.today(),
-        Comodato.fecha_fin <= fecha_limite
-    ).count()
-    
-    # Alumnos por programa
-    alumnos_por_programa = db.session.query(
-        Alumno.programa,
-        func.count(Alumno.id_alumno)
-    ).group_by(Alumno.programa).all()
-    
-    return jsonify({
-        'estadisticas': {
-            'usuarios': {
-                'total': total_usuarios,
-                'activos': Usuario.query.filter_by(is_active=True).count()
-            },
-            'representantes': {
-                'total': total_representantes
-            },
-            'alumnos': {
-                'total': total_alumnos,
-                'activos': Alumno.query.filter_by(estado='activo').count(),
-                'por_programa': dict(alumnos_por_programa)
-            },
-            'instrumentos': {
-                'total': total_instrumentos,
-                'por_estado': dict(instrumentos_por_estado)
-            },
-            'comodatos': {
-                'total': total_comodatos,
-                'activos': comodatos_activos,
-                'finalizados': comodatos_finalizados,
-                'vencidos': comodatos_vencidos,
-                'proximos_a_vencer': comodatos_proximos
-            }
-        }
-    }), 200
+    estadisticas = dashboard_cache.get_or_set(
+        ('estadisticas',), EstadisticasDashboard.calcular
+    )
+    return jsonify({'estadisticas': estadisticas}), 200
 
 @api_bp.route('/dashboard/alertas', methods=['GET'])
 @jwt_required()
@@ -136,7 +80,16 @@ def get_alertas_dashboard():
     """Obtener alertas para el dashboard"""
     
     limit = request.args.get('limit', 10, type=int)
+    # Un valor por cada limit posible: acotarlo limita las entradas en caché
+    limit = max(1, min(limit, current_app.config.get('DASHBOARD_ALERTAS_MAX', 50)))
     
+    respuesta = dashboard_cache.get_or_set(
+        ('alertas', limit), lambda: _calcular_alertas(limit)
+    )
+    return jsonify(respuesta), 200
+
+def _calcular_alertas(limit):
+    """Alertas de comodatos vencidos y próximos a vencer"""
     alertas = []
     
     # Comodatos vencidos
@@ -182,10 +135,10 @@ def get_alertas_dashboard():
     nivel_prioridad = {'alto': 1, 'medio': 2, 'bajo': 3}
     alertas.sort(key=lambda x: (nivel_prioridad.get(x['nivel'], 4), x['fecha']))
     
-    return jsonify({
+    return {
         'alertas': alertas[:limit],
         'total': len(alertas)
-    }), 200
+    }
 
 @api_bp.route('/utils/buscar-rapido', methods=['GET'])
 @jwt_required()
@@ -203,62 +156,19 @@ def buscar_rapido():
             'total': 0
         }), 200
     
-    # Función para normalizar texto (quitar acentos)
-    import unicodedata
-    def normalize(text):
-        if not text:
-            return text
-        return ''.join(
-            c for c in unicodedata.normalize('NFD', text.lower())
-            if unicodedata.category(c) != 'Mn'
-        )
-    
-    search_term = f"%{query}%"
-    search_term_normalized = f"%{normalize(query)}%"
-    
-    # Buscar alumnos
-    alumnos = Alumno.query.filter(
-        db.or_(
-            Alumno.nombre.ilike(search_term),
-            Alumno.apellido.ilike(search_term),
-            Alumno.cedula.ilike(search_term),
-            db.func.lower(Alumno.nombre).ilike(search_term_normalized),
-            db.func.lower(Alumno.apellido).ilike(search_term_normalized)
-        )
-    ).limit(10).all()
-    
-    # Buscar representantes
-    representantes = Representante.query.filter(
-        db.or_(
-            Representante.nombre.ilike(search_term),
-            Representante.apellido.ilike(search_term),
-            Representante.cedula.ilike(search_term),
-            db.func.lower(Representante.nombre).ilike(search_term_normalized),
-            db.func.lower(Representante.apellido).ilike(search_term_normalized)
-        )
-    ).limit(10).all()
-    
-    # Buscar instrumentos
-    instrumentos = Instrumento.query.filter(
-        db.or_(
-            Instrumento.descripcion.ilike(search_term),
-            Instrumento.marca.ilike(search_term),
-            Instrumento.modelo.ilike(search_term),
-            Instrumento.serial_fabrica.ilike(search_term),
-            Instrumento.serial_inventario.ilike(search_term)
-        )
-    ).limit(10).all()
+    # Búsqueda por prefijo en el índice normalizado (sin acentos)
+    resultados = SearchIndex.buscar(query, limite=10)
     
-    # Buscar comodatos
-    comodatos = Comodato.query.filter(
-        Comodato.codigo_comodato.ilike(search_term)
-    ).limit(10).all()
+    alumnos = resultados['alumno']
+    representantes = resultados['representante']
+    instrumentos = resultados['instrumento']
+    comodatos = resultados['comodato']
     
     return jsonify({
-        'alumnos': alumnos_schema.dump(alumnos),
-        'representantes': representantes_schema.dump(representantes),
-        'instrumentos': instrumentos_schema.dump(instrumentos),
-        'comodatos': comodatos_schema.dump(comodatos),
+        'alumnos': FastDump.dump(alumnos_schema, alumnos),
+        'representantes': FastDump.dump(representantes_schema, representantes),
+        'instrumentos': FastDump.dump(instrumentos_schema, instrumentos),
+        'comodatos': FastDump.dump(comodatos_schema, comodatos),
         'total': len(alumnos) + len(representantes) + len(instrumentos) + len(comodatos)
     }), 200
 
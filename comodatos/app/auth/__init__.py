@@ -1,5 +1,5 @@
 # Este archivo puede estar vacío, solo necesita existir
 from .routes import auth_bp
-from .utils import require_roles, create_tokens
+from .utils import require_roles, create_tokens, get_principal, Principal
 
-__all__ = ['auth_bp', 'require_roles', 'create_tokens']
\ No newline at end of file
+__all__ = ['auth_bp', 'require_roles', 'create_tokens', 'get_principal', 'Principal']
\ No newline at end of file
@@ -1,6 +1,6 @@
 from functools import wraps
-from flask import jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from flask import jsonify, g
+from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
 
 def require_roles(*roles):
     """
@@ -22,16 +22,71 @@ def require_roles(*roles):
         return wrapper
     return decorator
 
+class Principal:
+    """
+    Usuario autenticado de la petición, construido a partir de los claims
+    del JWT para no consultar Usuario/Representante en cada handler.
+    """
+    def __init__(self, id_usuario, rol, email=None, id_repr=None, jti=None):
+        self.id_usuario = id_usuario
+        self.rol = rol
+        self.email = email
+        self.id_repr = id_repr
+        self.jti = jti
+
+    @property
+    def es_admin(self):
+        return self.rol == 'admin'
+
+    @property
+    def es_representante(self):
+        return self.rol == 'representante'
+
+def principal_claims(user):
+    """Claims de autorización que se embeben en el token de acceso"""
+    return {
+        'rol': user.rol,
+        'email': user.email,
+        'id_repr': user.representante.id_repr if user.representante else None
+    }
+
+def get_principal():
+    """
+    Devuelve el Principal de la petición actual (requiere JWT verificado).
+
+    Los tokens emitidos antes de incluir `id_repr` en los claims se
+    resuelven con una consulta, una sola vez por petición.
+    """
+    claims = get_jwt()
+    principal = g.get('principal')
+    if principal is None or principal.jti != claims.get('jti'):
+        id_usuario = get_jwt_identity()
+        id_repr = claims.get('id_repr')
+
+        if 'id_repr' not in claims and claims.get('rol') == 'representante':
+            from app.models import Representante
+            id_repr = Representante.query.with_entities(
+                Representante.id_repr
+            ).filter_by(id_usuario=id_usuario).execution_options(
+                row_scope=False
+            ).scalar()
+
+        principal = g.principal = Principal(
+            id_usuario=id_usuario,
+            rol=claims.get('rol'),
+            email=claims.get('email'),
+            id_repr=id_repr,
+            jti=claims.get('jti')
+        )
+    return principal
+
 def create_tokens(user):
     """Crea tokens de acceso y refresh"""
     from flask_jwt_extended import create_access_token, create_refresh_token
     
     access_token = create_access_token(
         identity=user.id_usuario,
-        additional_claims={
-            'rol': user.rol,
-            'email': user.email
-        }
+        additional_claims=principal_claims(user)
     )
     refresh_token = create_refresh_token(identity=user.id_usuario)
     
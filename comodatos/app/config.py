@@ -27,6 +27,42 @@ class Config:
     
     RATE_LIMIT = os.environ.get('RATE_LIMIT', '100 per day, 20 per hour')
     
+    # Segundos de validez de la caché del dashboard (se invalida también en cada commit)
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 60))
+    # Máximo de alertas por petición (acota también las entradas en caché)
+    DASHBOARD_ALERTAS_MAX = int(os.environ.get('DASHBOARD_ALERTAS_MAX', 50))
+    # Segundos de validez de medidas y estados en memoria (se invalida también en cada commit)
+    REFERENCE_DATA_TTL = int(os.environ.get('REFERENCE_DATA_TTL', 300))
+    
+    # Código del núcleo en los códigos de comodato (NUCLEO/0001/AÑO)
+    NUCLEO_CODIGO = os.environ.get('NUCLEO_CODIGO', 'DN-GC-11-054')
+    # Correlativos que cada worker reserva de una vez; con 1 se asignan dentro
+    # de la transacción del comodato y no quedan huecos
+    CORRELATIVO_BLOQUE = int(os.environ.get('CORRELATIVO_BLOQUE', 1))
+    # Horas que un serial de inventario generado en lote queda reservado
+    SERIAL_RESERVA_HORAS = int(os.environ.get('SERIAL_RESERVA_HORAS', 24))
+    
+    # Importaciones en segundo plano
+    # Tamaño máximo del archivo subido (se guarda en la base de datos con el trabajo)
+    IMPORT_MAX_BYTES = int(os.environ.get('IMPORT_MAX_BYTES', 20 * 1024 * 1024))
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 2))
+    # Segundos sin progreso tras los que un trabajo "procesando" se da por interrumpido
+    IMPORT_JOB_TIMEOUT = int(os.environ.get('IMPORT_JOB_TIMEOUT', 600))
+    
+    # Máximo de elementos por petición en los endpoints /bulk
+    BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 1000))
+    
+    # Compresión de respuestas (gzip, y brotli si está instalado)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    # Bytes mínimos para comprimir una respuesta (las de streaming se comprimen siempre)
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+    COMPRESSION_MIMETYPES = [
+        'application/json', 'text/csv', 'text/html', 'text/plain',
+        'text/css', 'application/javascript'
+    ]
+    
     SWAGGER = {
         'title': 'API Sistema de Comodatos',
         'uiversion': 3,
@@ -0,0 +1,92 @@
+# app/middleware/compression.py
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+class _Compresor:
+    """Interfaz común (comprimir / vaciar / terminar) para gzip y brotli"""
+
+    def __init__(self, codificacion, app):
+        if codificacion == 'br':
+            self._obj = brotli.Compressor(quality=app.config['COMPRESSION_BROTLI_QUALITY'])
+            self.comprimir, self.vaciar, self._fin = (
+                self._obj.process, self._obj.flush, self._obj.finish
+            )
+        else:
+            # wbits 16 + MAX_WBITS: formato gzip
+            self._obj = zlib.compressobj(
+                app.config['COMPRESSION_GZIP_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+            self.comprimir, self._fin = self._obj.compress, self._obj.flush
+            self.vaciar = lambda: self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self):
+        return self._fin()
+
+def _codificacion():
+    """Mejor codificación aceptada por el cliente, o None"""
+    ofrecidas = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(ofrecidas)
+
+def _comprimir_stream(iterable, compresor):
+    try:
+        for trozo in iterable:
+            # Se vacía tras cada trozo para que el cliente reciba los datos
+            # ya generados en lugar de esperar a que se llene el búfer
+            salida = compresor.comprimir(trozo) + compresor.vaciar()
+            if salida:
+                yield salida
+        yield compresor.terminar()
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+
+def setup_compression(app):
+    """Comprime las respuestas con gzip o brotli según Accept-Encoding"""
+
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+
+    @app.after_request
+    def comprimir_respuesta(response):
+        if (request.method == 'HEAD'
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in app.config['COMPRESSION_MIMETYPES']):
+            return response
+
+        # La representación depende de Accept-Encoding aunque no se comprima
+        response.vary.add('Accept-Encoding')
+
+        codificacion = _codificacion()
+        if codificacion is None:
+            return response
+
+        if response.is_streamed or response.direct_passthrough:
+            # Tamaño desconocido: se comprime a medida que se genera
+            response.direct_passthrough = False
+            response.response = _comprimir_stream(
+                response.response, _Compresor(codificacion, app)
+            )
+            response.headers.pop('Content-Length', None)
+        else:
+            datos = response.get_data()
+            if len(datos) < app.config['COMPRESSION_MIN_SIZE']:
+                return response
+            compresor = _Compresor(codificacion, app)
+            comprimidos = compresor.comprimir(datos) + compresor.terminar()
+            if len(comprimidos) >= len(datos):
+                return response
+            response.set_data(comprimidos)
+
+        response.headers['Content-Encoding'] = codificacion
+
+        # Cada codificación es una representación distinta
+        etag, debil = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{codificacion}', debil)
+        return response
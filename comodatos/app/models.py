@@ -1,6 +1,8 @@
 from datetime import datetime
 from app.extensions import db
+from app.utils.text import normalize_text
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, select, update, insert, func
 import re
 
 class Usuario(db.Model):
@@ -47,6 +49,15 @@ class Representante(db.Model):
     telefono = db.Column(db.String(20))
     direccion = db.Column(db.Text)
     
+    # Copias normalizadas (sin acentos, minúsculas) para búsqueda indexada
+    nombre_norm = db.Column(db.String(100), index=True)
+    apellido_norm = db.Column(db.String(100), index=True)
+    
+    # Índice del orden de listado (paginación por cursor)
+    __table_args__ = (
+        db.Index('idx_representante_nombre', 'nombre', 'apellido', 'id_repr'),
+    )
+    
     # Relaciones
     alumnos = db.relationship('Alumno', backref='representante', 
                              lazy='dynamic', cascade='all, delete-orphan')
@@ -83,14 +94,26 @@ class Alumno(db.Model):
                                 'alma_llanera', 'otros'), default='iniciacion')
     estado = db.Column(db.Enum('activo', 'inactivo'), default='activo')
     
+    # Copias normalizadas (sin acentos, minúsculas) para búsqueda indexada
+    nombre_norm = db.Column(db.String(100), index=True)
+    apellido_norm = db.Column(db.String(100), index=True)
+    
+    # Índice del orden de listado (paginación por cursor)
+    __table_args__ = (
+        db.Index('idx_alumno_nombre', 'nombre', 'apellido', 'id_alumno'),
+    )
+    
     # Relaciones
     comodatos = db.relationship('Comodato', backref='alumno', 
                                lazy='dynamic')
     
     @property
     def edad(self):
+        return self.edad_en(datetime.utcnow().date())
+    
+    def edad_en(self, today):
+        """Edad a la fecha `today`"""
         if self.fecha_nacimiento:
-            today = datetime.utcnow().date()
             return today.year - self.fecha_nacimiento.year - (
                 (today.month, today.day) < 
                 (self.fecha_nacimiento.month, self.fecha_nacimiento.day)
@@ -167,6 +190,17 @@ class Instrumento(db.Model):
     fecha_adquisicion = db.Column(db.Date)
     observaciones = db.Column(db.Text)
     
+    # Copias normalizadas (sin acentos, minúsculas) para búsqueda indexada
+    descripcion_norm = db.Column(db.String(100), index=True)
+    marca_norm = db.Column(db.String(100), index=True)
+    modelo_norm = db.Column(db.String(100), index=True)
+    serial_fabrica_norm = db.Column(db.String(100), index=True)
+    
+    # Índice del orden de listado (paginación por cursor)
+    __table_args__ = (
+        db.Index('idx_instrumento_descripcion', 'descripcion', 'marca', 'id_instr'),
+    )
+    
     # Validación del serial de inventario
     @staticmethod
     def validate_serial_inventario(serial):
@@ -193,6 +227,37 @@ class Instrumento(db.Model):
         db.session.add(historial)
         return historial
     
+    @staticmethod
+    def cambiar_estado_en_bloque(ids, nuevo_estado_id, observacion=None):
+        """
+        Cambia el estado de varios instrumentos con un UPDATE y registra el
+        historial con un INSERT executemany (el llamador debe hacer commit).
+        
+        Devuelve (cambiados, sin_cambio, no_encontrados) como listas de ids.
+        """
+        actuales = dict(db.session.execute(
+            select(Instrumento.id_instr, Instrumento.id_estado_instr)
+            .where(Instrumento.id_instr.in_(ids))
+            .with_for_update()
+        ).all())
+        cambiados = [i for i in ids if i in actuales and actuales[i] != nuevo_estado_id]
+        sin_cambio = [i for i in ids if actuales.get(i) == nuevo_estado_id]
+        no_encontrados = [i for i in ids if i not in actuales]
+        
+        if cambiados:
+            db.session.execute(
+                update(Instrumento.__table__)
+                .where(Instrumento.id_instr.in_(cambiados))
+                .values(id_estado_instr=nuevo_estado_id)
+            )
+            ahora = datetime.utcnow()
+            db.session.execute(insert(HistorialEstadoInstr.__table__), [
+                {'id_instr': id_instr, 'id_estado_instr': nuevo_estado_id,
+                 'fecha': ahora, 'observacion': observacion}
+                for id_instr in cambiados
+            ])
+        return cambiados, sin_cambio, no_encontrados
+    
     def to_dict(self):
         return {
             'id_instr': self.id_instr,
@@ -248,7 +313,8 @@ class Comodato(db.Model):
     estado = db.Column(db.Enum('activo', 'finalizado', 'cancelado', 
                               'renovado'), default='activo')
     observaciones = db.Column(db.Text)
-    correlativo = db.Column(db.Integer, unique=True, index=True)
+    # Único por año y núcleo; la unicidad global la garantiza codigo_comodato
+    correlativo = db.Column(db.Integer, index=True)
     codigo_comodato = db.Column(db.String(50), unique=True, index=True)
     
     # Índices compuestos
@@ -256,16 +322,20 @@ class Comodato(db.Model):
         db.Index('idx_comodato_alumno_estado', 'id_alumno', 'estado'),
         db.Index('idx_comodato_instr_estado', 'id_instr', 'estado'),
         db.Index('idx_comodato_fechas', 'fecha_inicio', 'fecha_fin'),
+        db.Index('idx_comodato_inicio_id', 'fecha_inicio', 'id_comodato'),
     )
     
     @property
     def dias_restantes(self):
         """Calcula días restantes para la fecha de fin"""
+        from datetime import date
+        return self.dias_restantes_en(date.today())
+    
+    def dias_restantes_en(self, hoy):
+        """Días restantes para la fecha de fin contados desde `hoy`"""
         if self.estado != 'activo':
             return 0
         
-        from datetime import date
-        hoy = date.today()
         if hoy > self.fecha_fin:
             return 0
         return (self.fecha_fin - hoy).days
@@ -274,7 +344,11 @@ class Comodato(db.Model):
     def esta_vencido(self):
         """Verifica si el comodato está vencido"""
         from datetime import date
-        return self.estado == 'activo' and date.today() > self.fecha_fin
+        return self.esta_vencido_en(date.today())
+    
+    def esta_vencido_en(self, hoy):
+        """Verifica si el comodato está vencido a la fecha `hoy`"""
+        return self.estado == 'activo' and hoy > self.fecha_fin
     
     def finalizar(self, fecha_recepcion=None, observaciones=None):
         """Finaliza el comodato"""
@@ -285,14 +359,72 @@ class Comodato(db.Model):
         
         # Liberar el instrumento
         if self.instrumento:
-            estado_disponible = EstadoInstrumento.query.filter_by(
-                nombre='disponible').first()
+            from app.utils.reference_data import ReferenceData
+            estado_disponible = ReferenceData.estado_id('disponible')
             if estado_disponible:
                 self.instrumento.cambiar_estado(
-                    estado_disponible.id_estado_instr,
+                    estado_disponible,
                     'Instrumento devuelto por finalización de comodato'
                 )
     
+    @staticmethod
+    def finalizar_en_bloque(ids, fecha_recepcion=None, observaciones=None):
+        """
+        Finaliza varios comodatos activos con sentencias UPDATE/INSERT en
+        bloque y libera sus instrumentos (el llamador debe hacer commit).
+        
+        Devuelve {id_comodato: error} de los que no se pudieron finalizar.
+        """
+        from app.utils.reference_data import ReferenceData
+        
+        actuales = {
+            fila.id_comodato: fila for fila in db.session.execute(
+                select(Comodato.id_comodato, Comodato.id_instr, Comodato.estado)
+                .where(Comodato.id_comodato.in_(ids))
+                .with_for_update()
+            )
+        }
+        errores = {}
+        for id_comodato in ids:
+            if id_comodato not in actuales:
+                errores[id_comodato] = 'Comodato no encontrado'
+            elif actuales[id_comodato].estado != 'activo':
+                errores[id_comodato] = f"El comodato está {actuales[id_comodato].estado}"
+        finalizados = [i for i in ids if i not in errores]
+        if not finalizados:
+            return errores
+        
+        valores = {
+            'estado': 'finalizado',
+            'fecha_recepcion': fecha_recepcion or datetime.utcnow().date()
+        }
+        if observaciones:
+            valores['observaciones'] = (
+                func.coalesce(Comodato.observaciones, '') + f"\nFinalizado: {observaciones}"
+            )
+        db.session.execute(
+            update(Comodato.__table__)
+            .where(Comodato.id_comodato.in_(finalizados))
+            .values(**valores)
+        )
+        
+        # Liberar los instrumentos
+        estado_disponible = ReferenceData.estado_id('disponible')
+        instrumentos = sorted({actuales[i].id_instr for i in finalizados})
+        if estado_disponible and instrumentos:
+            db.session.execute(
+                update(Instrumento.__table__)
+                .where(Instrumento.id_instr.in_(instrumentos))
+                .values(id_estado_instr=estado_disponible)
+            )
+            ahora = datetime.utcnow()
+            db.session.execute(insert(HistorialEstadoInstr.__table__), [
+                {'id_instr': id_instr, 'id_estado_instr': estado_disponible, 'fecha': ahora,
+                 'observacion': 'Instrumento devuelto por finalización de comodato'}
+                for id_instr in instrumentos
+            ])
+        return errores
+    
     def to_dict(self):
         return {
             'id_comodato': self.id_comodato,
@@ -338,6 +470,107 @@ class HistorialEstadoInstr(db.Model):
             'estado': self.estado.to_dict() if self.estado else None
         }
 
+class TerminoBusqueda(db.Model):
+    """Término normalizado del índice de búsqueda (ver app/utils/search_index.py)"""
+    __tablename__ = 'termino_busqueda'
+    
+    id_termino = db.Column(db.Integer, primary_key=True)
+    entidad = db.Column(db.String(20), nullable=False)
+    id_entidad = db.Column(db.Integer, nullable=False)
+    termino = db.Column(db.String(100), nullable=False)
+    peso = db.Column(db.SmallInteger, default=1, nullable=False)
+    
+    __table_args__ = (
+        db.Index('idx_termino_busqueda_termino', 'entidad', 'termino', 'id_entidad'),
+        db.Index('idx_termino_busqueda_entidad', 'entidad', 'id_entidad', 'termino'),
+    )
+
+class Importacion(db.Model):
+    """Trabajo de importación en segundo plano (ver app/utils/import_jobs.py)"""
+    __tablename__ = 'importacion'
+    
+    id_importacion = db.Column(db.Integer, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuario.id_usuario'))
+    nombre_archivo = db.Column(db.String(255), nullable=False)
+    formato = db.Column(db.String(10), nullable=False)
+    # Archivo subido, guardado con el trabajo para que cualquier instancia
+    # pueda retomarlo; se borra al terminar. Diferido: to_dict() no lo carga
+    contenido = db.deferred(db.Column(db.LargeBinary(length=2**32 - 1)))
+    estado = db.Column(db.Enum('pendiente', 'procesando', 'completado', 'fallido'),
+                       default='pendiente', nullable=False, index=True)
+    filas_procesadas = db.Column(db.Integer, default=0, nullable=False)
+    filas_fallidas = db.Column(db.Integer, default=0, nullable=False)
+    resumen = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_inicio = db.Column(db.DateTime)
+    fecha_actualizacion = db.Column(db.DateTime)
+    fecha_fin = db.Column(db.DateTime)
+    
+    @property
+    def filas_por_segundo(self):
+        if not self.fecha_inicio:
+            return None
+        segundos = ((self.fecha_fin or datetime.utcnow()) - self.fecha_inicio).total_seconds()
+        return round(self.filas_procesadas / segundos, 1) if segundos > 0 else None
+    
+    def to_dict(self):
+        return {
+            'id_importacion': self.id_importacion,
+            'id_usuario': self.id_usuario,
+            'nombre_archivo': self.nombre_archivo,
+            'formato': self.formato,
+            'estado': self.estado,
+            'filas_procesadas': self.filas_procesadas,
+            'filas_fallidas': self.filas_fallidas,
+            'filas_por_segundo': self.filas_por_segundo,
+            'resumen': self.resumen,
+            'error': self.error,
+            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            'fecha_inicio': self.fecha_inicio.isoformat() if self.fecha_inicio else None,
+            'fecha_fin': self.fecha_fin.isoformat() if self.fecha_fin else None
+        }
+
+class SerialReservado(db.Model):
+    """Serial de inventario entregado por /instrumentos/seriales y aún no vencido"""
+    __tablename__ = 'serial_reservado'
+    
+    serial = db.Column(db.String(16), primary_key=True)
+    fecha_expiracion = db.Column(db.DateTime, nullable=False, index=True)
+
+class SecuenciaCorrelativo(db.Model):
+    """Último correlativo asignado por año y núcleo (ver app/utils/correlativos.py)"""
+    __tablename__ = 'secuencia_correlativo'
+    
+    year = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    nucleo = db.Column(db.String(30), primary_key=True)
+    ultimo = db.Column(db.Integer, nullable=False, default=0)
+
+class VersionTabla(db.Model):
+    """Versión de cada tabla, incrementada en cada commit que la modifica (ver app/utils/table_versions.py)"""
+    __tablename__ = 'version_tabla'
+    
+    tabla = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+# Columnas normalizadas: modelo -> campos con copia <campo>_norm
+COLUMNAS_NORMALIZADAS = {
+    Alumno: ('nombre', 'apellido'),
+    Representante: ('nombre', 'apellido'),
+    Instrumento: ('descripcion', 'marca', 'modelo', 'serial_fabrica'),
+}
+
+def _registrar_normalizacion(modelo, campos):
+    def normalizar(mapper, connection, target):
+        for campo in campos:
+            setattr(target, f'{campo}_norm', normalize_text(getattr(target, campo)))
+    
+    event.listen(modelo, 'before_insert', normalizar)
+    event.listen(modelo, 'before_update', normalizar)
+
+for _modelo, _campos in COLUMNAS_NORMALIZADAS.items():
+    _registrar_normalizacion(_modelo, _campos)
+
 class VerificacionEmail(db.Model):
     __tablename__ = 'verificacion_email'
     
@@ -26,6 +26,7 @@ class RepresentanteSchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         load_instance = True
         include_fk = True
+        exclude = ('nombre_norm', 'apellido_norm')
     
     nombre = fields.String(required=True, validate=validate.Length(min=2, max=100))
     apellido = fields.String(required=True, validate=validate.Length(min=2, max=100))
@@ -43,6 +44,7 @@ class AlumnoSchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         load_instance = True
         include_fk = True
+        exclude = ('nombre_norm', 'apellido_norm')
     
     nombre = fields.String(required=True, validate=validate.Length(min=2, max=100))
     apellido = fields.String(required=True, validate=validate.Length(min=2, max=100))
@@ -55,6 +57,9 @@ class AlumnoSchema(SQLAlchemyAutoSchema):
     
     edad = fields.Method('calculate_age')
     
+    # Campos que dependen de la fecha: método del modelo y reloj (FastDump)
+    campos_por_fecha = {'edad': ('edad_en', 'hoy_utc')}
+    
     def calculate_age(self, obj):
         return obj.edad if hasattr(obj, 'edad') else None
 
@@ -83,6 +88,7 @@ class InstrumentoSchema(SQLAlchemyAutoSchema):
         sqla_session = db.session
         load_instance = True
         include_fk = True
+        exclude = ('descripcion_norm', 'marca_norm', 'modelo_norm', 'serial_fabrica_norm')
     
     descripcion = fields.String(required=True, validate=validate.Length(max=100))
     marca = fields.String(validate=validate.Length(max=100))
@@ -131,6 +137,12 @@ class ComodatoSchema(SQLAlchemyAutoSchema):
     dias_restantes = fields.Method('get_dias_restantes')
     esta_vencido = fields.Method('get_esta_vencido')
     
+    # Campos que dependen de la fecha: método del modelo y reloj (FastDump)
+    campos_por_fecha = {
+        'dias_restantes': ('dias_restantes_en', 'hoy'),
+        'esta_vencido': ('esta_vencido_en', 'hoy'),
+    }
+    
     def get_dias_restantes(self, obj):
         return obj.dias_restantes if hasattr(obj, 'dias_restantes') else None
     
@@ -0,0 +1,249 @@
+from datetime import datetime
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import select, insert
+from app.extensions import db
+from app.models import Alumno, HistorialEstadoInstr, Instrumento, Representante
+from app.schemas import AlumnoSchema, InstrumentoSchema
+from app.utils.reference_data import ReferenceData
+from app.utils.search_index import SearchIndex
+from app.utils.text import normalize_text
+from app.utils.validators import Validators
+
+class BulkCreate:
+    """
+    Alta en bloque de instrumentos y alumnos.
+
+    Cada elemento se valida con el schema del modelo (sin crear instancias)
+    y la unicidad se comprueba para todo el lote con una consulta IN. Los
+    elementos válidos se insertan con executemany en una sola transacción,
+    junto con el historial inicial y el índice de búsqueda; el resultado
+    indica, por cada elemento del payload, el id creado o el error.
+    """
+
+    @staticmethod
+    def _cargar(items, schema, campos_texto, por_defecto=None, forzados=None):
+        """
+        Valida cada item; devuelve ({indice: datos}, {indice: error}).
+
+        `por_defecto` rellena los campos vacíos y `forzados` los sustituye
+        antes de validar.
+        """
+        validos, errores = {}, {}
+        for indice, item in enumerate(items):
+            if not isinstance(item, dict):
+                errores[indice] = 'Elemento inválido'
+                continue
+            item = dict(item)
+            for campo, valor in (por_defecto or {}).items():
+                if not item.get(campo):
+                    item[campo] = valor
+            item.update(forzados or {})
+            try:
+                datos = schema.load(item)
+            except ValidationError as e:
+                errores[indice] = e.messages
+                continue
+            for campo in campos_texto:
+                if datos.get(campo):
+                    datos[campo] = Validators.sanitize_input(datos[campo])
+            validos[indice] = datos
+        return validos, errores
+
+    @staticmethod
+    def _duplicados(validos, errores, campo, existentes, mensaje_existente, mensaje_repetido):
+        """Marca como error los valores ya registrados o repetidos en el lote"""
+        vistos = set()
+        for indice, datos in list(validos.items()):
+            valor = datos[campo]
+            if valor in existentes:
+                errores[indice] = mensaje_existente
+            elif valor in vistos:
+                errores[indice] = mensaje_repetido
+            else:
+                vistos.add(valor)
+                continue
+            del validos[indice]
+
+    @staticmethod
+    def _resultados(total, errores, creados, pk):
+        return [
+            {'indice': indice, 'error': errores[indice]} if indice in errores
+            else {'indice': indice, pk: creados[indice]}
+            for indice in range(total)
+        ]
+
+    @staticmethod
+    def instrumentos(items):
+        """Crea los instrumentos válidos de `items`; devuelve los resultados por elemento"""
+        id_disponible = ReferenceData.estado_id('disponible')
+        if not id_disponible:
+            raise ValueError('Estado "disponible" no configurado')
+
+        # Por defecto, disponible
+        validos, errores = BulkCreate._cargar(
+            items, InstrumentoSchema(load_instance=False),
+            ['descripcion', 'marca', 'modelo', 'color', 'serial_fabrica', 'observaciones'],
+            por_defecto={'id_estado_instr': id_disponible}
+        )
+
+        for indice, datos in list(validos.items()):
+            if datos.get('id_medida') and not ReferenceData.medida(datos['id_medida']):
+                errores[indice] = 'Medida no encontrada'
+            elif not ReferenceData.estado(datos['id_estado_instr']):
+                errores[indice] = 'Estado no encontrado'
+            else:
+                continue
+            del validos[indice]
+
+        existentes = set(db.session.execute(
+            select(Instrumento.serial_inventario).where(
+                Instrumento.serial_inventario.in_({d['serial_inventario'] for d in validos.values()})
+            )
+        ).scalars()) if validos else set()
+        BulkCreate._duplicados(
+            validos, errores, 'serial_inventario', existentes,
+            'El serial de inventario ya está registrado',
+            'Serial de inventario repetido en la petición'
+        )
+
+        creados = {}
+        if validos:
+            filas = [
+                {
+                    **datos,
+                    'descripcion_norm': normalize_text(datos['descripcion']),
+                    'marca_norm': normalize_text(datos.get('marca')),
+                    'modelo_norm': normalize_text(datos.get('modelo')),
+                    'serial_fabrica_norm': normalize_text(datos.get('serial_fabrica')),
+                }
+                for datos in validos.values()
+            ]
+            columnas = set(Instrumento.__table__.columns.keys())
+            db.session.execute(insert(Instrumento.__table__), [
+                {c: fila.get(c) for c in columnas if c != 'id_instr'} for fila in filas
+            ])
+            insertados = {
+                fila.serial_inventario: fila for fila in db.session.execute(
+                    select(
+                        Instrumento.id_instr, Instrumento.descripcion, Instrumento.marca,
+                        Instrumento.modelo, Instrumento.serial_fabrica,
+                        Instrumento.serial_inventario, Instrumento.id_estado_instr
+                    ).where(Instrumento.serial_inventario.in_([f['serial_inventario'] for f in filas]))
+                )
+            }
+            SearchIndex.index_rows(
+                db.session.connection(), 'instrumento',
+                [fila._asdict() for fila in insertados.values()]
+            )
+            ahora = datetime.utcnow()
+            db.session.execute(insert(HistorialEstadoInstr.__table__), [
+                {
+                    'id_instr': fila.id_instr,
+                    'id_estado_instr': fila.id_estado_instr,
+                    'fecha': ahora,
+                    'observacion': 'Instrumento creado en el sistema'
+                }
+                for fila in insertados.values()
+            ])
+            db.session.commit()
+            creados = {
+                indice: insertados[datos['serial_inventario']].id_instr
+                for indice, datos in validos.items()
+            }
+
+        return BulkCreate._resultados(len(items), errores, creados, 'id_instr')
+
+    @staticmethod
+    def alumnos(items, id_repr=None):
+        """
+        Crea los alumnos válidos de `items`; devuelve los resultados por elemento.
+
+        Con `id_repr` (petición de un representante) todos los alumnos se
+        asignan a ese representante.
+        """
+        validos, errores = BulkCreate._cargar(
+            items, AlumnoSchema(load_instance=False), ['nombre', 'apellido', 'cedula'],
+            forzados={'id_repr': id_repr} if id_repr else None
+        )
+
+        for indice, datos in list(validos.items()):
+            if not Validators.validate_cedula(datos['cedula']):
+                errores[indice] = 'Formato de cédula inválido'
+                del validos[indice]
+
+        if validos:
+            representantes = set(db.session.execute(
+                select(Representante.id_repr)
+                .where(Representante.id_repr.in_({d['id_repr'] for d in validos.values()}))
+                .execution_options(row_scope=False)
+            ).scalars())
+            for indice, datos in list(validos.items()):
+                if datos['id_repr'] not in representantes:
+                    errores[indice] = 'Representante no encontrado'
+                    del validos[indice]
+
+        existentes = set(db.session.execute(
+            select(Alumno.cedula)
+            .where(Alumno.cedula.in_({d['cedula'] for d in validos.values()}))
+            .execution_options(row_scope=False)
+        ).scalars()) if validos else set()
+        BulkCreate._duplicados(
+            validos, errores, 'cedula', existentes,
+            'La cédula ya está registrada', 'Cédula repetida en la petición'
+        )
+
+        creados = {}
+        if validos:
+            columnas = set(Alumno.__table__.columns.keys()) - {'id_alumno'}
+            db.session.execute(insert(Alumno.__table__), [
+                {
+                    **{c: datos.get(c) for c in columnas},
+                    'programa': datos.get('programa') or 'iniciacion',
+                    'estado': datos.get('estado') or 'activo',
+                    'nombre_norm': normalize_text(datos['nombre']),
+                    'apellido_norm': normalize_text(datos['apellido']),
+                }
+                for datos in validos.values()
+            ])
+            insertados = {
+                fila.cedula: fila for fila in db.session.execute(
+                    select(Alumno.id_alumno, Alumno.nombre, Alumno.apellido, Alumno.cedula)
+                    .where(Alumno.cedula.in_([d['cedula'] for d in validos.values()]))
+                    .execution_options(row_scope=False)
+                )
+            }
+            SearchIndex.index_rows(
+                db.session.connection(), 'alumno',
+                [fila._asdict() for fila in insertados.values()]
+            )
+            db.session.commit()
+            creados = {
+                indice: insertados[datos['cedula']].id_alumno
+                for indice, datos in validos.items()
+            }
+
+        return BulkCreate._resultados(len(items), errores, creados, 'id_alumno')
+
+    @staticmethod
+    def validar_payload(data):
+        """Lista de elementos del payload, o mensaje de error"""
+        items = (data or {}).get('items') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return None, 'Se requiere una lista "items" no vacía'
+        maximo = current_app.config.get('BULK_MAX_ITEMS', 1000)
+        if len(items) > maximo:
+            return None, f'Máximo {maximo} elementos por petición'
+        return items, None
+
+    @staticmethod
+    def respuesta(resultados):
+        """Cuerpo y código HTTP: 201 todos creados, 207 parcial, 400 ninguno"""
+        fallidos = sum(1 for r in resultados if 'error' in r)
+        creados = len(resultados) - fallidos
+        codigo = 201 if not fallidos else 207 if creados else 400
+        return {
+            'resultados': resultados,
+            'creados': creados,
+            'fallidos': fallidos,
+        }, codigo
@@ -0,0 +1,64 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from app.utils.change_tracker import ChangeTracker
+from app.utils.row_scope import RowScope
+
+class ResultCache:
+    """
+    Caché en memoria del proceso para resultados derivados de la base de datos.
+
+    Se vacía cuando un commit modifica alguna de las `tablas` vigiladas.
+    Cada entrada vence además tras `ttl_config` segundos (por los commits de
+    otros workers, que este proceso no ve) y siempre a medianoche, porque
+    los cálculos de "vencido" dependen de la fecha del día.
+
+    Los valores se comparten entre todos los usuarios, así que se calculan
+    sin el alcance por filas de RowScope.
+    """
+
+    def __init__(self, tablas, ttl_config, ttl_default=60):
+        self.tablas = set(tablas)
+        self.ttl_config = ttl_config
+        self.ttl_default = ttl_default
+        self._datos = {}
+        self._generacion = 0
+        self._lock = threading.Lock()
+        ChangeTracker.on_commit(self._on_commit)
+
+    def _on_commit(self, tablas):
+        if self.tablas & tablas:
+            self.clear()
+
+    def _expiracion(self):
+        ttl = current_app.config.get(self.ttl_config, self.ttl_default)
+        ahora = datetime.now()
+        medianoche = datetime.combine(ahora.date() + timedelta(days=1), datetime.min.time())
+        return time.monotonic() + min(ttl, (medianoche - ahora).total_seconds())
+
+    def get_or_set(self, key, calcular):
+        """Devuelve el valor en caché o lo calcula con calcular()"""
+        with self._lock:
+            entrada = self._datos.get(key)
+            if entrada and entrada[0] > time.monotonic():
+                return entrada[1]
+            generacion = self._generacion
+
+        with RowScope.sin_alcance():
+            valor = calcular()
+        with self._lock:
+            # Si hubo un commit mientras se calculaba, el valor puede estar viejo
+            if generacion == self._generacion:
+                self._datos[key] = (self._expiracion(), valor)
+        return valor
+
+    def clear(self):
+        with self._lock:
+            self._generacion += 1
+            self._datos.clear()
+
+dashboard_cache = ResultCache(
+    ['comodato', 'instrumento', 'alumno', 'usuario', 'representante', 'estado_instrumento'],
+    'DASHBOARD_CACHE_TTL'
+)
@@ -0,0 +1,91 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+class ChangeTracker:
+    """
+    Registra qué tablas se modifican en cada transacción y avisa al hacer commit.
+
+    Cubre tanto los cambios de objetos ORM (after_flush) como las sentencias
+    INSERT/UPDATE/DELETE ejecutadas en bloque con session.execute().
+    Los callbacks registrados con on_commit() reciben el conjunto de nombres
+    de tabla modificados; en un rollback el conjunto se descarta. Los
+    registrados con before_commit() se llaman con (session, tablas) justo
+    antes del commit, dentro de la misma transacción.
+    """
+
+    _callbacks = []
+    _callbacks_previos = []
+
+    @staticmethod
+    def on_commit(callback):
+        """Registra callback(tablas) para cada commit que modifique datos"""
+        ChangeTracker._callbacks.append(callback)
+        return callback
+
+    @staticmethod
+    def before_commit(callback):
+        """Registra callback(session, tablas), ejecutado dentro de la transacción"""
+        ChangeTracker._callbacks_previos.append(callback)
+        return callback
+
+    @staticmethod
+    def _pendientes(session):
+        return session.info.setdefault('tablas_modificadas', set())
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        tablas = ChangeTracker._pendientes(session)
+        # session.dirty incluye objetos con atributos asignados al mismo valor
+        modificados = [
+            obj for obj in session.dirty
+            if session.is_modified(obj, include_collections=False)
+        ]
+        for obj in list(session.new) + modificados + list(session.deleted):
+            table = getattr(obj, '__table__', None)
+            if table is not None:
+                tablas.add(table.name)
+
+    @staticmethod
+    def _do_orm_execute(orm_execute_state):
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update
+                or orm_execute_state.is_delete):
+            return
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            ChangeTracker._pendientes(orm_execute_state.session).add(table.name)
+
+    @staticmethod
+    def _before_commit(session):
+        if not ChangeTracker._callbacks_previos:
+            return
+        # El commit vaciaría la sesión después de este evento: se hace
+        # antes para conocer todas las tablas modificadas
+        session.flush()
+        tablas = session.info.get('tablas_modificadas')
+        if tablas:
+            for callback in ChangeTracker._callbacks_previos:
+                callback(session, set(tablas))
+
+    @staticmethod
+    def _after_commit(session):
+        tablas = session.info.pop('tablas_modificadas', None)
+        if tablas:
+            for callback in ChangeTracker._callbacks:
+                callback(tablas)
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('tablas_modificadas', None)
+
+    @staticmethod
+    def install():
+        """Registra los eventos de sesión (idempotente)"""
+        if event.contains(Session, 'after_commit', ChangeTracker._after_commit):
+            return
+        event.listen(Session, 'after_flush', ChangeTracker._after_flush)
+        event.listen(Session, 'do_orm_execute', ChangeTracker._do_orm_execute)
+        event.listen(Session, 'before_commit', ChangeTracker._before_commit)
+        event.listen(Session, 'after_commit', ChangeTracker._after_commit)
+        event.listen(Session, 'after_rollback', ChangeTracker._after_rollback)
+
+ChangeTracker.install()
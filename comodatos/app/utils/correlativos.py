@@ -0,0 +1,115 @@
+import threading
+from flask import current_app
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import Comodato, SecuenciaCorrelativo
+from app.utils.text import prefix_pattern
+
+class CorrelativoAllocator:
+    """
+    Asignación de correlativos de comodato por año y núcleo.
+
+    Cada par (año, núcleo) tiene una fila en secuencia_correlativo que se
+    incrementa con un UPDATE atómico: la fila queda bloqueada hasta el fin
+    de la transacción, así que dos peticiones simultáneas nunca obtienen el
+    mismo número y no hace falta recorrer la tabla comodato.
+
+    Con CORRELATIVO_BLOQUE = 1 el número se toma dentro de la transacción
+    del comodato (un rollback lo devuelve). Con bloques mayores cada worker
+    reserva N números en una transacción corta y los reparte desde memoria;
+    los que no llegue a usar quedan como huecos.
+    """
+
+    _bloques = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _maximo_existente(connection, year, nucleo):
+        """Mayor correlativo usado antes de existir la secuencia de (año, núcleo)"""
+        return connection.execute(
+            select(func.max(Comodato.correlativo)).where(
+                Comodato.codigo_comodato.like(prefix_pattern(f'{nucleo}/'), escape='\\'),
+                Comodato.codigo_comodato.like(f'%/{year}')
+            )
+        ).scalar() or 0
+
+    @staticmethod
+    def _upsert(connection, tabla, year, nucleo, inicial, cantidad):
+        """
+        INSERT de la secuencia que, si otra transacción ya la creó, incrementa
+        la existente en la misma sentencia (None si el dialecto no lo admite).
+        """
+        valores = dict(year=year, nucleo=nucleo, ultimo=inicial + cantidad)
+        incremento = dict(ultimo=tabla.c.ultimo + cantidad)
+        dialecto = connection.dialect.name
+        if dialecto == 'mysql':
+            from sqlalchemy.dialects.mysql import insert as insert_mysql
+            return insert_mysql(tabla).values(**valores).on_duplicate_key_update(**incremento)
+        if dialecto in ('sqlite', 'postgresql'):
+            from sqlalchemy.dialects import sqlite, postgresql
+            modulo = sqlite if dialecto == 'sqlite' else postgresql
+            return modulo.insert(tabla).values(**valores).on_conflict_do_update(
+                index_elements=['year', 'nucleo'], set_=incremento
+            )
+        return None
+
+    @staticmethod
+    def reservar(connection, year, nucleo, cantidad=1):
+        """
+        Reserva `cantidad` correlativos consecutivos y devuelve el primero.
+
+        La reserva forma parte de la transacción de `connection`.
+        """
+        tabla = SecuenciaCorrelativo.__table__
+        condicion = (tabla.c.year == year) & (tabla.c.nucleo == nucleo)
+
+        # Lectura sin bloqueo: un UPDATE que no encuentra la fila toma en
+        # InnoDB un bloqueo de hueco, y dos primeras reservas simultáneas
+        # que luego insertan acaban en deadlock (1213) en lugar de en una
+        # clave duplicada
+        existe = connection.execute(select(tabla.c.ultimo).where(condicion)).first()
+        if existe is None:
+            # Primer comodato del año/núcleo: crear la secuencia a partir de
+            # los correlativos ya usados, o sumar si otra transacción se adelantó
+            inicial = CorrelativoAllocator._maximo_existente(connection, year, nucleo)
+            upsert = CorrelativoAllocator._upsert(connection, tabla, year, nucleo, inicial, cantidad)
+            if upsert is not None:
+                connection.execute(upsert)
+                ultimo = connection.execute(select(tabla.c.ultimo).where(condicion)).scalar_one()
+                return ultimo - cantidad + 1
+            try:
+                with connection.begin_nested():
+                    connection.execute(
+                        insert(tabla).values(year=year, nucleo=nucleo, ultimo=inicial + cantidad)
+                    )
+                return inicial + 1
+            except IntegrityError:
+                # Otra transacción creó la fila a la vez: incrementarla
+                pass
+
+        resultado = connection.execute(
+            update(tabla).where(condicion).values(ultimo=tabla.c.ultimo + cantidad)
+        )
+        if not resultado.rowcount:
+            raise RuntimeError(f"No se pudo reservar correlativo para {nucleo}/{year}")
+        ultimo = connection.execute(select(tabla.c.ultimo).where(condicion)).scalar_one()
+        return ultimo - cantidad + 1
+
+    @staticmethod
+    def siguiente(year, nucleo):
+        """Devuelve el siguiente correlativo de (año, núcleo)"""
+        bloque = current_app.config.get('CORRELATIVO_BLOQUE', 1)
+        if bloque <= 1:
+            return CorrelativoAllocator.reservar(db.session.connection(), year, nucleo)
+
+        clave = (year, nucleo)
+        with CorrelativoAllocator._lock:
+            actual = CorrelativoAllocator._bloques.get(clave)
+            if actual is None or actual[0] > actual[1]:
+                with db.engine.begin() as connection:
+                    primero = CorrelativoAllocator.reservar(connection, year, nucleo, bloque)
+                actual = CorrelativoAllocator._bloques[clave] = [primero, primero + bloque - 1]
+            numero = actual[0]
+            actual[0] += 1
+        return numero
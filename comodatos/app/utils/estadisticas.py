@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+from sqlalchemy import func, case, cast, Integer
+from app.extensions import db
+from app.models import Usuario, Representante, Alumno, Instrumento, EstadoInstrumento, Comodato
+
+def _contar_si(condicion):
+    """SUM(CASE WHEN condicion THEN 1 ELSE 0 END) como entero"""
+    # En MySQL SUM() devuelve DECIMAL, que se serializaría como string
+    return cast(func.coalesce(func.sum(case((condicion, 1), else_=0)), 0), Integer)
+
+class EstadisticasDashboard:
+    """
+    Contadores del dashboard calculados con agregación condicional.
+
+    Cada tabla se recorre una sola vez: todos sus contadores salen de la
+    misma consulta con SUM(CASE ...), en lugar de un COUNT por contador.
+    """
+
+    @staticmethod
+    def usuarios():
+        total, activos = db.session.query(
+            func.count(Usuario.id_usuario),
+            _contar_si(Usuario.is_active == True)
+        ).one()
+        return {'total': total, 'activos': activos}
+
+    @staticmethod
+    def representantes():
+        total = db.session.query(func.count(Representante.id_repr)).scalar()
+        return {'total': total}
+
+    @staticmethod
+    def alumnos():
+        filas = db.session.query(
+            Alumno.programa,
+            func.count(Alumno.id_alumno),
+            _contar_si(Alumno.estado == 'activo')
+        ).group_by(Alumno.programa).all()
+        return {
+            'total': sum(total for _, total, _ in filas),
+            'activos': sum(activos for _, _, activos in filas),
+            'por_programa': {programa: total for programa, total, _ in filas}
+        }
+
+    @staticmethod
+    def instrumentos():
+        filas = db.session.query(
+            EstadoInstrumento.nombre,
+            func.count(Instrumento.id_instr)
+        ).join(Instrumento).group_by(EstadoInstrumento.nombre).all()
+        return {
+            'total': sum(total for _, total in filas),
+            'por_estado': dict(filas)
+        }
+
+    @staticmethod
+    def comodatos(hoy=None):
+        hoy = hoy or date.today()
+        # Comodatos próximos a vencer (próximos 30 días)
+        fecha_limite = hoy + timedelta(days=30)
+        activo = Comodato.estado == 'activo'
+
+        total, activos, finalizados, vencidos, proximos = db.session.query(
+            func.count(Comodato.id_comodato),
+            _contar_si(activo),
+            _contar_si(Comodato.estado == 'finalizado'),
+            _contar_si(db.and_(activo, Comodato.fecha_fin < hoy)),
+            _contar_si(db.and_(
+                activo,
+                Comodato.fecha_fin >= hoy,
+                Comodato.fecha_fin <= fecha_limite
+            ))
+        ).one()
+
+        return {
+            'total': total,
+            'activos': activos,
+            'finalizados': finalizados,
+            'vencidos': vencidos,
+            'proximos_a_vencer': proximos
+        }
+
+    @staticmethod
+    def calcular(hoy=None):
+        """Todas las estadísticas del dashboard (una consulta por tabla)"""
+        return {
+            'usuarios': EstadisticasDashboard.usuarios(),
+            'representantes': EstadisticasDashboard.representantes(),
+            'alumnos': EstadisticasDashboard.alumnos(),
+            'instrumentos': EstadisticasDashboard.instrumentos(),
+            'comodatos': EstadisticasDashboard.comodatos(hoy)
+        }
@@ -1,104 +1,728 @@
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import SQLAlchemyError
 from app.extensions import db
 from app.models import (
-    Instrumento, Comodato, Alumno, Representante, Usuario,
-    Medida, EstadoInstrumento
+    Alumno, Comodato, HistorialEstadoInstr, Instrumento, Medida, Representante, Usuario
 )
+from app.utils.correlativos import CorrelativoAllocator
 from app.utils.generators import CodeGenerator
+from app.utils.reference_data import ReferenceData
+from app.utils.search_index import SearchIndex
+from app.utils.text import normalize_text
 
 class ExcelImporter:
+    """
+    Importación en bloque de la hoja "Relacion de comodato".
+
+    Las columnas se limpian y validan con operaciones vectorizadas de
+    pandas; medidas y seriales existentes se precargan en memoria con una
+    consulta cada uno, y los instrumentos nuevos se insertan con
+    executemany en lotes de CHUNK_SIZE filas, con un commit por lote. Una
+    fila inválida se reporta en `errores` sin detener el resto. Los
+    comodatos de la hoja se importan después con ComodatoImporter.
+
+    import_streaming() lee el archivo (xlsx o csv) en lotes de BATCH_SIZE
+    filas sin cargarlo entero, así que la memoria no depende de su tamaño.
+    """
+
+    HOJA = 'Relacion de comodato'
+    CHUNK_SIZE = 1000
+    BATCH_SIZE = 5000
+
+    COLUMNAS = {
+        'DESCRIPCION': 'descripcion',
+        'MARCA': 'marca',
+        'MODELO': 'modelo',
+        'MEDIDA': 'medida_nombre',
+        'COLOR': 'color',
+        'NUMERO DE SERIAL': 'serial_fabrica',
+        'NUMERO DE INVENTARIO': 'serial_inventario',
+        'ESTADO': 'estado_nombre',
+        'NUCLEO': 'nucleo',
+        'ASIGNADO': 'asignado_nombre',
+        'COMODATARIO': 'comodatario_nombre',
+        'CEDULA DEL COMODATARIO': 'comodatario_cedula',
+        'FECHA INICIAL DEL COMODATO': 'fecha_inicio',
+        'FECHA FINAL DEL COMODATO': 'fecha_fin',
+        'FECHA DE RECEPCIÓN': 'fecha_recepcion',
+        'OBSERVACION': 'observaciones'
+    }
+
+    COLUMNAS_FECHA = ['fecha_inicio', 'fecha_fin', 'fecha_recepcion']
+
+    # Columnas de texto del instrumento -> longitud máxima en la tabla
+    CAMPOS_INSTRUMENTO = {
+        'descripcion': 100,
+        'marca': 100,
+        'modelo': 100,
+        'color': 50,
+        'serial_fabrica': 100,
+        'observaciones': None,
+    }
+
     @staticmethod
-    def import_from_excel(file_path):
+    def import_from_excel(file_path, chunk_size=None):
         """Importa datos desde el archivo Excel proporcionado"""
         try:
-            # Leer la hoja de comodatos
-            df = pd.read_excel(file_path, sheet_name='Relacion de comodato')
-            
-            # Limpiar y preparar datos
-            df = df.rename(columns={
-                'DESCRIPCION': 'descripcion',
-                'MARCA': 'marca',
-                'MODELO': 'modelo',
-                'MEDIDA': 'medida_nombre',
-                'COLOR': 'color',
-                'NUMERO DE SERIAL': 'serial_fabrica',
-                'NUMERO DE INVENTARIO': 'serial_inventario',
-                'ESTADO': 'estado_nombre',
-                'NUCLEO': 'nucleo',
-                'ASIGNADO': 'asignado_nombre',
-                'COMODATARIO': 'comodatario_nombre',
-                'CEDULA DEL COMODATARIO': 'comodatario_cedula',
-                'FECHA INICIAL DEL COMODATO': 'fecha_inicio',
-                'FECHA FINAL DEL COMODATO': 'fecha_fin',
-                'FECHA DE RECEPCIÓN': 'fecha_recepcion',
-                'OBSERVACION': 'observaciones'
-            })
-            
-            # Convertir fechas
-            date_columns = ['fecha_inicio', 'fecha_fin', 'fecha_recepcion']
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], errors='coerce').dt.date
-            
-            # Procesar cada registro
-            results = {
-                'instrumentos_importados': 0,
-                'comodatos_importados': 0,
-                'errores': []
-            }
-            
-            for idx, row in df.iterrows():
+            df = pd.read_excel(file_path, sheet_name=ExcelImporter.HOJA)
+        except Exception as e:
+            raise Exception(f"Error en importación: {str(e)}")
+        return ExcelImporter.import_dataframe(df, chunk_size)
+
+    @staticmethod
+    def import_streaming(archivo, batch_size=None, chunk_size=None, progreso=None, formato=None):
+        """
+        Importa el archivo por lotes de `batch_size` filas.
+
+        `archivo` es una ruta o un objeto de archivo; `formato` ('xlsx' o
+        'csv') se deduce de la extensión si no se indica. Tras cada lote se
+        llama a progreso(results) con los totales acumulados.
+        """
+        contexto = ExcelImporter.nuevo_contexto()
+        results = ExcelImporter.nuevo_resultado()
+        fila = 0
+        try:
+            for lote in ExcelImporter.leer_lotes(archivo, batch_size, formato):
+                ExcelImporter.procesar_lote(
+                    lote, contexto, results, fila_inicial=fila, chunk_size=chunk_size
+                )
+                fila += len(lote)
+                if progreso:
+                    progreso(results)
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Error en importación: {str(e)}")
+        return results
+
+    @staticmethod
+    def formato_archivo(archivo):
+        nombre = str(getattr(archivo, 'filename', None) or getattr(archivo, 'name', archivo))
+        return 'csv' if nombre.lower().endswith('.csv') else 'xlsx'
+
+    @staticmethod
+    def leer_lotes(archivo, batch_size=None, formato=None):
+        """Genera DataFrames de hasta `batch_size` filas del archivo"""
+        batch_size = batch_size or ExcelImporter.BATCH_SIZE
+        formato = formato or ExcelImporter.formato_archivo(archivo)
+
+        if formato == 'csv':
+            yield from pd.read_csv(
+                archivo, chunksize=batch_size, dtype=str, encoding='utf-8-sig'
+            )
+            return
+
+        from openpyxl import load_workbook
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            if ExcelImporter.HOJA not in libro.sheetnames:
+                raise ValueError(f"No se encontró la hoja '{ExcelImporter.HOJA}'")
+            filas = libro[ExcelImporter.HOJA].iter_rows(values_only=True)
+            encabezado = next(filas, None)
+            if encabezado is None:
+                return
+            columnas = [str(c).strip() if c is not None else '' for c in encabezado]
+
+            lote = []
+            for fila in filas:
+                fila = fila[:len(columnas)]
+                lote.append(fila + (None,) * (len(columnas) - len(fila)))
+                if len(lote) == batch_size:
+                    yield pd.DataFrame.from_records(lote, columns=columnas)
+                    lote = []
+            if lote:
+                yield pd.DataFrame.from_records(lote, columns=columnas)
+        finally:
+            libro.close()
+
+    @staticmethod
+    def import_dataframe(df, chunk_size=None):
+        """Importa un DataFrame con las columnas de la hoja original"""
+        contexto = ExcelImporter.nuevo_contexto()
+        results = ExcelImporter.nuevo_resultado()
+        try:
+            ExcelImporter.procesar_lote(df, contexto, results, chunk_size=chunk_size)
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Error en importación: {str(e)}")
+        return results
+
+    @staticmethod
+    def nuevo_resultado():
+        return {
+            'filas_procesadas': 0,
+            'instrumentos_importados': 0,
+            'instrumentos_existentes': 0,
+            'representantes_creados': 0,
+            'alumnos_creados': 0,
+            'comodatos_importados': 0,
+            'comodatos_existentes': 0,
+            'errores': []
+        }
+
+    @staticmethod
+    def nuevo_contexto():
+        """Precarga medidas, seriales y cédulas existentes (una consulta cada uno)"""
+        return {
+            'medidas': dict(db.session.execute(select(Medida.nombre, Medida.id_medida)).all()),
+            'seriales': dict(db.session.execute(
+                select(Instrumento.serial_inventario, Instrumento.id_instr)
+            ).all()),
+            'id_disponible': ReferenceData.estado_id('disponible'),
+            **ComodatoImporter.nuevo_contexto(),
+        }
+
+    @staticmethod
+    def preparar(df, fila_inicial=0):
+        """
+        Renombra, limpia y valida el lote. Devuelve (df, errores).
+
+        `fila_inicial` es el número de fila del archivo que corresponde a la
+        primera fila del lote. El df devuelto solo contiene filas válidas.
+        """
+        df = df.rename(columns=ExcelImporter.COLUMNAS)
+        df.index = pd.RangeIndex(fila_inicial + 1, fila_inicial + 1 + len(df))
+
+        for col in ExcelImporter.COLUMNAS.values():
+            if col not in df.columns:
+                df[col] = None
+
+        texto = [c for c in ExcelImporter.COLUMNAS.values() if c not in ExcelImporter.COLUMNAS_FECHA]
+        for col in texto:
+            limpio = df[col].astype('string').str.strip()
+            df[col] = limpio.mask(limpio == '')
+
+        for col, longitud in ExcelImporter.CAMPOS_INSTRUMENTO.items():
+            if longitud:
+                df[col] = df[col].str.slice(0, longitud)
+        df['medida_nombre'] = df['medida_nombre'].str.slice(0, 50)
+
+        # Los números leídos como float llegan como "1234.0"
+        df['serial_inventario'] = df['serial_inventario'].str.replace(r'\.0$', '', regex=True)
+
+        for col in ExcelImporter.COLUMNAS_FECHA:
+            df[col] = pd.to_datetime(df[col], errors='coerce').dt.date
+
+        # Filas completamente vacías (habituales al final de la hoja)
+        df = df[df[list(ExcelImporter.COLUMNAS.values())].notna().any(axis=1)]
+
+        motivos = pd.Series(pd.NA, index=df.index, dtype='string')
+        motivos = motivos.mask(
+            df['descripcion'].isna(), 'Descripción requerida'
+        )
+        motivos = motivos.mask(
+            motivos.isna() & ~df['serial_inventario'].fillna('').str.fullmatch(r'\d{16}'),
+            'El serial de inventario debe tener 16 dígitos'
+        )
+        # Un instrumento puede repetirse en filas con comodatos distintos
+        # (historial); sin datos de comodato la repetición es un error
+        con_comodato = df[['comodatario_nombre', 'comodatario_cedula', 'fecha_inicio']].notna().any(axis=1)
+        motivos = motivos.mask(
+            motivos.isna() & ~con_comodato & df['serial_inventario'].duplicated(keep='first'),
+            'Serial de inventario duplicado en el archivo'
+        )
+
+        invalidas = motivos.notna()
+        errores = [
+            {'fila': int(fila), 'error': motivos[fila], 'datos': ExcelImporter._datos_fila(df.loc[fila])}
+            for fila in df.index[invalidas]
+        ]
+        return df[~invalidas], errores
+
+    @staticmethod
+    def _datos_fila(row):
+        """Fila como dict serializable a JSON"""
+        datos = {}
+        for clave, valor in row.items():
+            if valor is None or (not isinstance(valor, (list, dict)) and pd.isna(valor)):
+                valor = None
+            elif isinstance(valor, (date, datetime)):
+                valor = valor.isoformat()
+            elif hasattr(valor, 'item'):
+                # Escalares de numpy
+                valor = valor.item()
+            elif not isinstance(valor, (str, int, float, bool)):
+                valor = str(valor)
+            datos[clave] = valor
+        return datos
+
+    @staticmethod
+    def _registrar_medidas(nombres, contexto):
+        """Crea las medidas que falten y actualiza contexto['medidas']"""
+        nuevas = sorted(set(nombres) - contexto['medidas'].keys())
+        if not nuevas:
+            return
+        db.session.execute(insert(Medida.__table__), [
+            {'nombre': nombre, 'descripcion': f"Medida: {nombre}"} for nombre in nuevas
+        ])
+        contexto['medidas'].update(db.session.execute(
+            select(Medida.nombre, Medida.id_medida).where(Medida.nombre.in_(nuevas))
+        ).all())
+        db.session.commit()
+
+    @staticmethod
+    def _filas_instrumento(df, contexto):
+        """Dicts de inserción para las filas del lote"""
+        filas = pd.DataFrame({
+            campo: df[campo] for campo in ExcelImporter.CAMPOS_INSTRUMENTO
+        })
+        filas['serial_inventario'] = df['serial_inventario']
+        filas['id_medida'] = df['medida_nombre'].map(contexto['medidas'])
+        filas['id_estado_instr'] = contexto['id_disponible']
+        filas['descripcion_norm'] = df['descripcion'].map(normalize_text)
+        for campo in ('marca', 'modelo', 'serial_fabrica'):
+            filas[f'{campo}_norm'] = df[campo].map(normalize_text, na_action='ignore')
+        filas = filas.astype(object).where(filas.notna(), None)
+        return filas.to_dict('records')
+
+    @staticmethod
+    def _insertar_instrumentos(filas):
+        """INSERT executemany + índice de búsqueda; devuelve {serial: id_instr}"""
+        db.session.execute(insert(Instrumento.__table__), filas)
+        insertados = db.session.execute(
+            select(
+                Instrumento.id_instr, Instrumento.descripcion, Instrumento.marca,
+                Instrumento.modelo, Instrumento.serial_fabrica, Instrumento.serial_inventario
+            ).where(Instrumento.serial_inventario.in_([f['serial_inventario'] for f in filas]))
+        ).all()
+        SearchIndex.index_rows(
+            db.session.connection(), 'instrumento', [fila._asdict() for fila in insertados]
+        )
+        return {fila.serial_inventario: fila.id_instr for fila in insertados}
+
+    @staticmethod
+    def _guardar(filas, numeros, guardar, results):
+        """
+        Ejecuta guardar(filas) y confirma; si falla, reintenta fila a fila
+        para reportar solo las filas con error. `guardar` devuelve una
+        función que se llama tras el commit para actualizar el contexto.
+        """
+        try:
+            confirmar = guardar(filas)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            if len(filas) == 1:
+                raise
+            for fila, numero in zip(filas, numeros):
                 try:
-                    # Crear o obtener medida
-                    medida = Medida.query.filter_by(
-                        nombre=row['medida_nombre']
-                    ).first()
-                    
-                    if not medida:
-                        medida = Medida(
-                            nombre=row['medida_nombre'],
-                            descripcion=f"Medida: {row['medida_nombre']}"
-                        )
-                        db.session.add(medida)
-                        db.session.flush()
-                    
-                    # Crear instrumento
-                    instrumento = Instrumento.query.filter_by(
-                        serial_inventario=str(row['serial_inventario'])
-                    ).first()
-                    
-                    if not instrumento:
-                        instrumento = Instrumento(
-                            descripcion=row['descripcion'],
-                            marca=row['marca'],
-                            modelo=row['modelo'],
-                            id_medida=medida.id_medida,
-                            color=row['color'],
-                            serial_fabrica=row['serial_fabrica'],
-                            serial_inventario=str(row['serial_inventario']),
-                            id_estado_instr=1,  # Disponible por defecto
-                            observaciones=row.get('observaciones')
-                        )
-                        db.session.add(instrumento)
-                        results['instrumentos_importados'] += 1
-                    
-                    # Procesar comodato si hay datos
-                    if pd.notna(row.get('fecha_inicio')):
-                        # Aquí se podría crear el comodato completo
-                        # Necesitaríamos crear/alumno, representante y usuario primero
-                        pass
-                        
-                except Exception as e:
+                    ExcelImporter._guardar([fila], [numero], guardar, results)
+                except SQLAlchemyError as e:
                     results['errores'].append({
-                        'fila': idx + 1,
-                        'error': str(e),
-                        'datos': row.to_dict()
+                        'fila': numero,
+                        'error': str(e.orig if getattr(e, 'orig', None) else e),
+                        'datos': ExcelImporter._datos_fila(fila)
                     })
-            
-            db.session.commit()
-            return results
-            
-        except Exception as e:
-            db.session.rollback()
-            raise Exception(f"Error en importación: {str(e)}")
\ No newline at end of file
+            return
+        confirmar()
+
+    @staticmethod
+    def _en_chunks(filas, numeros, chunk_size, guardar, results):
+        for inicio in range(0, len(filas), chunk_size):
+            ExcelImporter._guardar(
+                filas[inicio:inicio + chunk_size],
+                numeros[inicio:inicio + chunk_size],
+                guardar, results
+            )
+
+    @staticmethod
+    def procesar_lote(df, contexto, results, fila_inicial=0, chunk_size=None):
+        """
+        Importa un lote de filas crudas de la hoja.
+
+        Puede llamarse varias veces con el mismo `contexto` y `results`
+        (lectura por lotes); `fila_inicial` numera las filas del lote.
+        """
+        chunk_size = chunk_size or ExcelImporter.CHUNK_SIZE
+        df, errores = ExcelImporter.preparar(df, fila_inicial)
+        results['filas_procesadas'] += len(df) + len(errores)
+        results['errores'].extend(errores)
+
+        # Los seriales ya registrados no se vuelven a crear; los repetidos
+        # en el lote se crean una vez, con los datos de su primera fila
+        unicos = df.drop_duplicates('serial_inventario')
+        existentes = unicos['serial_inventario'].isin(contexto['seriales'].keys())
+        results['instrumentos_existentes'] += int(existentes.sum())
+        nuevos = unicos[~existentes]
+
+        if not nuevos.empty:
+            ExcelImporter._registrar_medidas(nuevos['medida_nombre'].dropna(), contexto)
+
+            def guardar_instrumentos(filas):
+                ids = ExcelImporter._insertar_instrumentos(filas)
+
+                def confirmar():
+                    contexto['seriales'].update(ids)
+                    results['instrumentos_importados'] += len(ids)
+                return confirmar
+
+            ExcelImporter._en_chunks(
+                ExcelImporter._filas_instrumento(nuevos, contexto),
+                [int(n) for n in nuevos.index],
+                chunk_size, guardar_instrumentos, results
+            )
+
+        ComodatoImporter.procesar(df, contexto, results, chunk_size)
+        return results
+
+class ComodatoImporter:
+    """
+    Comodatos de la hoja: crea representantes, alumnos y contratos.
+
+    Las filas con datos de comodato (COMODATARIO, CEDULA DEL COMODATARIO,
+    ASIGNADO y fechas) se validan de forma vectorizada; los representantes
+    se precargan por cédula y los alumnos de los representantes implicados
+    se cargan una vez por importación. Cada lote de CHUNK_SIZE filas se
+    guarda en una transacción con INSERT executemany: los correlativos de
+    cada año se reservan de una vez en la secuencia.
+
+    Un instrumento puede aparecer en varias filas (su historial de
+    comodatos): las filas que ya tienen comodato (mismo instrumento y fecha
+    inicial) no se duplican, y un segundo comodato activo del mismo
+    instrumento, en la base de datos o en el propio archivo, se reporta
+    como error.
+
+    Los representantes nuevos se crean con un usuario inactivo y sin
+    contraseña utilizable; los alumnos, con cédula escolar
+    "<cédula del representante>-<n>".
+    """
+
+    DOMINIO_EMAIL = 'importado.comodatos'
+
+    @staticmethod
+    def nuevo_contexto():
+        return {
+            'representantes': dict(db.session.execute(
+                select(Representante.cedula, Representante.id_repr)
+                .execution_options(row_scope=False)
+            ).all()),
+            'alumnos': {},
+            'cedulas_alumno': set(),
+            'alumnos_cargados': set(),
+            'comodatos': {},
+            'id_asignado': ReferenceData.estado_id('asignado'),
+        }
+
+    @staticmethod
+    def normalizar_cedula(cedulas):
+        """Mayúsculas, sin espacios, puntos ni guiones; 'V' si solo hay dígitos"""
+        # Los números leídos como float llegan como "1234.0": se quita antes
+        # que los separadores para no convertirlo en "12340"
+        cedulas = cedulas.str.strip().str.replace(r'\.0$', '', regex=True)
+        cedulas = cedulas.str.upper().str.replace(r'[\s.\-]', '', regex=True)
+        return cedulas.mask(cedulas.str.fullmatch(r'\d+').fillna(False), 'V' + cedulas)
+
+    @staticmethod
+    def separar_nombre(nombre_completo):
+        """'Juan Carlos Pérez García' -> ('Juan Carlos', 'Pérez García')"""
+        palabras = nombre_completo.split()
+        corte = max(1, len(palabras) // 2)
+        return ' '.join(palabras[:corte])[:100], ' '.join(palabras[corte:])[:100]
+
+    @staticmethod
+    def _clave_alumno(id_repr, nombre, apellido):
+        return (id_repr, normalize_text(nombre), normalize_text(apellido))
+
+    @staticmethod
+    def preparar(df, contexto):
+        """
+        Filas del lote con datos de comodato, validadas. Devuelve (df, errores).
+
+        Las filas cuyo instrumento no existe (su inserción falló) se
+        reportan como error; el df devuelto trae id_instr y la cédula
+        normalizada.
+        """
+        con_comodato = df[
+            df[['comodatario_nombre', 'comodatario_cedula', 'fecha_inicio']].notna().any(axis=1)
+        ].copy()
+        con_comodato['id_instr'] = con_comodato['serial_inventario'].map(contexto['seriales'])
+        sin_instrumento = con_comodato['id_instr'].isna()
+        errores = [
+            {'fila': int(fila), 'error': 'Comodato omitido: el instrumento no se importó',
+             'datos': ExcelImporter._datos_fila(con_comodato.loc[fila])}
+            for fila in con_comodato.index[sin_instrumento]
+        ]
+        con_comodato = con_comodato[~sin_instrumento]
+        con_comodato['id_instr'] = con_comodato['id_instr'].astype(int)
+        con_comodato['comodatario_cedula'] = ComodatoImporter.normalizar_cedula(
+            con_comodato['comodatario_cedula']
+        )
+
+        motivos = pd.Series(pd.NA, index=con_comodato.index, dtype='string')
+        reglas = [
+            (con_comodato['comodatario_nombre'].isna(), 'Comodatario requerido'),
+            (~con_comodato['comodatario_cedula'].fillna('').str.fullmatch(r'[VEJPG]\d{5,9}'),
+             'Cédula del comodatario inválida'),
+            (con_comodato['asignado_nombre'].isna(), 'Alumno asignado requerido'),
+            (con_comodato['fecha_inicio'].isna(), 'Fecha inicial del comodato requerida'),
+            (con_comodato['fecha_fin'].isna(), 'Fecha final del comodato requerida'),
+            (pd.to_datetime(con_comodato['fecha_fin']) < pd.to_datetime(con_comodato['fecha_inicio']),
+             'La fecha final debe ser posterior a la inicial'),
+        ]
+        for condicion, motivo in reglas:
+            motivos = motivos.mask(motivos.isna() & condicion.fillna(False).astype(bool), motivo)
+
+        invalidas = motivos.notna()
+        errores.extend(
+            {'fila': int(fila), 'error': motivos[fila],
+             'datos': ExcelImporter._datos_fila(con_comodato.loc[fila])}
+            for fila in con_comodato.index[invalidas]
+        )
+        return con_comodato[~invalidas], errores
+
+    @staticmethod
+    def _cargar_comodatos(ids_instr, contexto):
+        """
+        Carga una vez los comodatos registrados de los instrumentos indicados
+        en contexto['comodatos'] = {id_instr: [(fecha_inicio, estado), ...]}
+        """
+        pendientes = set(ids_instr) - contexto['comodatos'].keys()
+        if not pendientes:
+            return
+        for id_instr in pendientes:
+            contexto['comodatos'][id_instr] = []
+        for id_instr, fecha_inicio, estado in db.session.execute(
+            select(Comodato.id_instr, Comodato.fecha_inicio, Comodato.estado)
+            .where(Comodato.id_instr.in_(pendientes))
+            .execution_options(row_scope=False)
+        ):
+            contexto['comodatos'][id_instr].append((fecha_inicio, estado))
+
+    @staticmethod
+    def _cargar_alumnos(ids_repr, contexto):
+        """Carga una vez los alumnos de los representantes indicados"""
+        pendientes = set(ids_repr) - contexto['alumnos_cargados']
+        if not pendientes:
+            return
+        for id_alumno, id_repr, nombre, apellido, cedula in db.session.execute(
+            select(Alumno.id_alumno, Alumno.id_repr, Alumno.nombre, Alumno.apellido, Alumno.cedula)
+            .where(Alumno.id_repr.in_(pendientes))
+            .execution_options(row_scope=False)
+        ):
+            contexto['alumnos'][ComodatoImporter._clave_alumno(id_repr, nombre, apellido)] = id_alumno
+            contexto['cedulas_alumno'].add(cedula)
+        contexto['alumnos_cargados'].update(pendientes)
+
+    @staticmethod
+    def _insertar_representantes(filas, contexto):
+        """Crea usuario y representante para las cédulas nuevas; {cedula: id_repr}"""
+        nuevos = {}
+        for fila in filas:
+            if fila['cedula'] not in contexto['representantes']:
+                nuevos.setdefault(fila['cedula'], fila['comodatario_nombre'])
+        if not nuevos:
+            return {}
+
+        emails = {
+            cedula: f"{cedula.lower()}@{ComodatoImporter.DOMINIO_EMAIL}" for cedula in nuevos
+        }
+        db.session.execute(insert(Usuario.__table__), [
+            {'email': email, 'password_hash': '!', 'rol': 'representante', 'is_active': False}
+            for email in emails.values()
+        ])
+        usuarios = dict(db.session.execute(
+            select(Usuario.email, Usuario.id_usuario).where(Usuario.email.in_(emails.values()))
+        ).all())
+
+        registros = []
+        for cedula, nombre_completo in nuevos.items():
+            nombre, apellido = ComodatoImporter.separar_nombre(nombre_completo)
+            registros.append({
+                'id_usuario': usuarios[emails[cedula]],
+                'nombre': nombre,
+                'apellido': apellido,
+                'cedula': cedula,
+                'nombre_norm': normalize_text(nombre),
+                'apellido_norm': normalize_text(apellido),
+            })
+        db.session.execute(insert(Representante.__table__), registros)
+        insertados = db.session.execute(
+            select(Representante.id_repr, Representante.nombre, Representante.apellido,
+                   Representante.cedula)
+            .where(Representante.cedula.in_(nuevos))
+            .execution_options(row_scope=False)
+        ).all()
+        SearchIndex.index_rows(
+            db.session.connection(), 'representante', [fila._asdict() for fila in insertados]
+        )
+        return {fila.cedula: fila.id_repr for fila in insertados}
+
+    @staticmethod
+    def _insertar_alumnos(filas, representantes, contexto):
+        """Crea los alumnos que no existan; {clave: id_alumno} y cédulas usadas"""
+        cedula_repr = {id_repr: cedula for cedula, id_repr in representantes.items()}
+        usadas = set()
+        nuevos = {}
+        for fila in filas:
+            id_repr = representantes[fila['cedula']]
+            nombre, apellido = ComodatoImporter.separar_nombre(fila['asignado_nombre'])
+            clave = ComodatoImporter._clave_alumno(id_repr, nombre, apellido)
+            if clave in contexto['alumnos'] or clave in nuevos:
+                continue
+            numero = 1
+            while f"{cedula_repr[id_repr]}-{numero}" in contexto['cedulas_alumno'] | usadas:
+                numero += 1
+            cedula = f"{cedula_repr[id_repr]}-{numero}"
+            usadas.add(cedula)
+            nuevos[clave] = {
+                'id_repr': id_repr,
+                'nombre': nombre,
+                'apellido': apellido,
+                'cedula': cedula,
+                'estado': 'activo',
+                'nombre_norm': normalize_text(nombre),
+                'apellido_norm': normalize_text(apellido),
+            }
+        if not nuevos:
+            return {}, usadas
+
+        db.session.execute(insert(Alumno.__table__), list(nuevos.values()))
+        insertados = db.session.execute(
+            select(Alumno.id_alumno, Alumno.id_repr, Alumno.nombre, Alumno.apellido, Alumno.cedula)
+            .where(Alumno.cedula.in_(usadas))
+            .execution_options(row_scope=False)
+        ).all()
+        SearchIndex.index_rows(
+            db.session.connection(), 'alumno', [fila._asdict() for fila in insertados]
+        )
+        return {
+            ComodatoImporter._clave_alumno(fila.id_repr, fila.nombre, fila.apellido): fila.id_alumno
+            for fila in insertados
+        }, usadas
+
+    @staticmethod
+    def _insertar_comodatos(filas, representantes, alumnos, contexto):
+        """Reserva correlativos por año, inserta los comodatos y asigna instrumentos"""
+        nucleo = current_app.config['NUCLEO_CODIGO']
+        connection = db.session.connection()
+        registros = []
+        filas = sorted(filas, key=lambda fila: (fila['fecha_inicio'], fila['numero']))
+        for year in sorted({fila['fecha_inicio'].year for fila in filas}):
+            filas_year = [fila for fila in filas if fila['fecha_inicio'].year == year]
+            primero = CorrelativoAllocator.reservar(connection, year, nucleo, len(filas_year))
+            for correlativo, fila in enumerate(filas_year, start=primero):
+                id_repr = representantes[fila['cedula']]
+                nombre, apellido = ComodatoImporter.separar_nombre(fila['asignado_nombre'])
+                registros.append({
+                    'id_alumno': alumnos[ComodatoImporter._clave_alumno(id_repr, nombre, apellido)],
+                    'id_instr': fila['id_instr'],
+                    'id_repr': id_repr,
+                    'fecha_inicio': fila['fecha_inicio'],
+                    'fecha_fin': fila['fecha_fin'],
+                    'fecha_recepcion': fila['fecha_recepcion'],
+                    'estado': 'finalizado' if fila['fecha_recepcion'] else 'activo',
+                    'observaciones': fila['observaciones'],
+                    'correlativo': correlativo,
+                    'codigo_comodato': CodeGenerator.generate_codigo_comodato(
+                        correlativo, nucleo_codigo=nucleo, year=year
+                    ),
+                    'alumno': f"{nombre} {apellido}",
+                })
+
+        db.session.execute(insert(Comodato.__table__), [
+            {k: v for k, v in registro.items() if k != 'alumno'} for registro in registros
+        ])
+        insertados = db.session.execute(
+            select(Comodato.id_comodato, Comodato.codigo_comodato)
+            .where(Comodato.codigo_comodato.in_([r['codigo_comodato'] for r in registros]))
+            .execution_options(row_scope=False)
+        ).all()
+        SearchIndex.index_rows(
+            db.session.connection(), 'comodato', [fila._asdict() for fila in insertados]
+        )
+
+        activos = [r for r in registros if r['estado'] == 'activo']
+        if activos:
+            db.session.execute(
+                update(Instrumento.__table__)
+                .where(Instrumento.id_instr.in_([r['id_instr'] for r in activos]))
+                .values(id_estado_instr=contexto['id_asignado'])
+            )
+            ahora = datetime.utcnow()
+            db.session.execute(insert(HistorialEstadoInstr.__table__), [
+                {
+                    'id_instr': r['id_instr'],
+                    'id_estado_instr': contexto['id_asignado'],
+                    'fecha': ahora,
+                    'observacion': f"Asignado a alumno {r['alumno']} via comodato {r['codigo_comodato']}",
+                }
+                for r in activos
+            ])
+        return len(insertados)
+
+    @staticmethod
+    def procesar(df, contexto, results, chunk_size):
+        """Importa los comodatos de un lote ya preparado por ExcelImporter"""
+        df, errores = ComodatoImporter.preparar(df, contexto)
+        results['errores'].extend(errores)
+        if df.empty:
+            return
+
+        # Las filas se agrupan por instrumento: el mismo instrumento y fecha
+        # inicial es el mismo contrato, y un instrumento solo puede tener un
+        # comodato activo entre los registrados (contexto, que incluye los
+        # lotes anteriores) y los aceptados en este lote
+        ComodatoImporter._cargar_comodatos([int(i) for i in df['id_instr'].unique()], contexto)
+        aceptados = {}
+        filas, numeros = [], []
+        for numero, fila in zip(df.index, df.itertuples(index=False)):
+            id_instr = int(fila.id_instr)
+            activo = pd.isna(fila.fecha_recepcion)
+            anteriores = contexto['comodatos'][id_instr] + aceptados.get(id_instr, [])
+            if any(fecha == fila.fecha_inicio for fecha, _ in anteriores):
+                results['comodatos_existentes'] += 1
+                continue
+            if activo and any(estado == 'activo' for _, estado in anteriores):
+                results['errores'].append({
+                    'fila': int(numero),
+                    'error': 'El instrumento ya tiene un comodato activo',
+                    'datos': ExcelImporter._datos_fila(df.loc[numero])
+                })
+                continue
+            aceptados.setdefault(id_instr, []).append(
+                (fila.fecha_inicio, 'activo' if activo else 'finalizado')
+            )
+            filas.append({
+                'numero': int(numero),
+                'id_instr': id_instr,
+                'cedula': fila.comodatario_cedula,
+                'comodatario_nombre': fila.comodatario_nombre,
+                'asignado_nombre': fila.asignado_nombre,
+                'fecha_inicio': fila.fecha_inicio,
+                'fecha_fin': fila.fecha_fin,
+                'fecha_recepcion': None if pd.isna(fila.fecha_recepcion) else fila.fecha_recepcion,
+                'observaciones': None if pd.isna(fila.observaciones) else fila.observaciones,
+            })
+            numeros.append(int(numero))
+
+        def guardar_comodatos(filas):
+            nuevos_repr = ComodatoImporter._insertar_representantes(filas, contexto)
+            representantes = {**contexto['representantes'], **nuevos_repr}
+            ComodatoImporter._cargar_alumnos(
+                {representantes[fila['cedula']] for fila in filas}, contexto
+            )
+            nuevos_alumnos, cedulas = ComodatoImporter._insertar_alumnos(
+                filas, representantes, contexto
+            )
+            alumnos = {**contexto['alumnos'], **nuevos_alumnos}
+            importados = ComodatoImporter._insertar_comodatos(
+                filas, representantes, alumnos, contexto
+            )
+
+            def confirmar():
+                contexto['representantes'].update(nuevos_repr)
+                contexto['alumnos_cargados'].update(nuevos_repr.values())
+                contexto['alumnos'].update(nuevos_alumnos)
+                contexto['cedulas_alumno'].update(cedulas)
+                results['representantes_creados'] += len(nuevos_repr)
+                results['alumnos_creados'] += len(nuevos_alumnos)
+                results['comodatos_importados'] += importados
+                for fila in filas:
+                    contexto['comodatos'][fila['id_instr']].append(
+                        (fila['fecha_inicio'], 'finalizado' if fila['fecha_recepcion'] else 'activo')
+                    )
+            return confirmar
+
+        ExcelImporter._en_chunks(filas, numeros, chunk_size, guardar_comodatos, results)
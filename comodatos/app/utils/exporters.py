@@ -0,0 +1,45 @@
+import csv
+from io import StringIO
+from flask import Response, stream_with_context
+from app.utils.pagination import Paginator
+
+class CSVExporter:
+    """Exportación CSV en streaming: las filas se escriben a medida que se leen"""
+
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def stream(query, orden, columnas, fila, filename, batch_size=None):
+        """
+        Devuelve una respuesta CSV que se genera por lotes.
+
+        `orden` debe terminar en la clave primaria (ver Paginator.iter_batches)
+        y `fila` convierte cada resultado en un dict con las `columnas`.
+        """
+        batch_size = batch_size or CSVExporter.BATCH_SIZE
+
+        def generate():
+            buffer = StringIO()
+            writer = csv.writer(buffer)
+
+            # BOM para que Excel reconozca UTF-8 (equivalente a utf-8-sig)
+            buffer.write('\ufeff')
+            writer.writerow(columnas)
+
+            for rows in Paginator.iter_batches(query, orden, batch_size):
+                for row in rows:
+                    data = fila(row)
+                    writer.writerow([data.get(c) for c in columnas])
+
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate(0)
+
+            if buffer.tell():
+                yield buffer.getvalue().encode('utf-8')
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
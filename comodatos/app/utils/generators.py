@@ -1,8 +1,11 @@
 import secrets
 import string
-from datetime import datetime
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, delete, update
 from app.extensions import db
-from app.models import Comodato, EstadoInstrumento, Instrumento
+from app.models import Comodato, Instrumento, SerialReservado
+from app.utils.correlativos import CorrelativoAllocator
 
 class CodeGenerator:
     @staticmethod
@@ -15,22 +18,53 @@ class CodeGenerator:
     @staticmethod
     def generate_serial_inventario():
         """Genera un serial de inventario único de 16 dígitos"""
-        import random
-        while True:
-            serial = ''.join([str(random.randint(0, 9)) for _ in range(16)])
-            # Verificar que no exista
-            if not Instrumento.query.filter_by(serial_inventario=serial).first():
-                return serial
+        return CodeGenerator.generate_seriales_inventario(1, reservar=False)[0]
     
     @staticmethod
-    def get_next_correlativo(year=None):
+    def generate_seriales_inventario(cantidad, reservar=True):
+        """
+        Genera `cantidad` seriales de inventario libres.
+        
+        Los candidatos se comprueban todos juntos con una consulta IN contra
+        instrumentos y reservas vigentes; solo se repite la ronda para los
+        que choquen. Con `reservar` los seriales quedan apartados durante
+        SERIAL_RESERVA_HORAS (el llamador debe hacer commit).
+        """
+        ahora = datetime.utcnow()
+        seriales = []
+        while len(seriales) < cantidad:
+            candidatos = {
+                f'{secrets.randbelow(10 ** 16):016d}'
+                for _ in range(cantidad - len(seriales))
+            }.difference(seriales)
+            ocupados = set(db.session.execute(
+                select(Instrumento.serial_inventario).where(
+                    Instrumento.serial_inventario.in_(candidatos)
+                ).union_all(
+                    select(SerialReservado.serial).where(
+                        SerialReservado.serial.in_(candidatos),
+                        SerialReservado.fecha_expiracion > ahora
+                    )
+                )
+            ).scalars())
+            seriales.extend(sorted(candidatos - ocupados))
+        
+        if reservar:
+            expiracion = ahora + timedelta(hours=current_app.config['SERIAL_RESERVA_HORAS'])
+            db.session.execute(
+                delete(SerialReservado).where(SerialReservado.fecha_expiracion <= ahora)
+            )
+            db.session.execute(insert(SerialReservado), [
+                {'serial': serial, 'fecha_expiracion': expiracion} for serial in seriales
+            ])
+        return seriales
+    
+    @staticmethod
+    def get_next_correlativo(year=None, nucleo_codigo=None):
         """Obtiene el siguiente número correlativo para comodatos"""
         year = year or datetime.now().year
-        last_comodato = Comodato.query.filter(
-            db.extract('year', Comodato.fecha_inicio) == year
-        ).order_by(Comodato.correlativo.desc()).first()
-        
-        return last_comodato.correlativo + 1 if last_comodato else 1
+        nucleo = nucleo_codigo or current_app.config['NUCLEO_CODIGO']
+        return CorrelativoAllocator.siguiente(year, nucleo)
     
     @staticmethod
     def generate_token(length=32):
@@ -43,14 +77,16 @@ class ComodatoManager:
     def create_comodato(data):
         """Crea un nuevo comodato con validaciones"""
         from app.models import Instrumento, Alumno, Representante
+        from app.utils.reference_data import ReferenceData
         
         # Validar instrumento disponible
         instrumento = Instrumento.query.get(data['id_instr'])
         if not instrumento:
             raise ValueError("Instrumento no encontrado")
         
-        if instrumento.estado_actual.nombre != 'disponible':
-            raise ValueError(f"Instrumento no disponible. Estado: {instrumento.estado_actual.nombre}")
+        if instrumento.id_estado_instr != ReferenceData.estado_id('disponible'):
+            estado = ReferenceData.estado(instrumento.id_estado_instr)
+            raise ValueError(f"Instrumento no disponible. Estado: {estado['nombre'] if estado else None}")
         
         # Validar alumno activo
         alumno = Alumno.query.get(data['id_alumno'])
@@ -63,14 +99,14 @@ class ComodatoManager:
             raise ValueError("Representante no encontrado")
         
         # Generar correlativo y código
-        correlativo = CodeGenerator.get_next_correlativo(
-            data['fecha_inicio'].year if 'fecha_inicio' in data else None
-        )
+        year = data['fecha_inicio'].year if 'fecha_inicio' in data else None
+        nucleo = current_app.config['NUCLEO_CODIGO']
+        correlativo = CodeGenerator.get_next_correlativo(year, nucleo)
         
         codigo_comodato = CodeGenerator.generate_codigo_comodato(
             correlativo,
-            nucleo_codigo="DN-GC-11-054",  # Ejemplo: Núcleo EL JUNKO
-            year=data['fecha_inicio'].year if 'fecha_inicio' in data else None
+            nucleo_codigo=nucleo,
+            year=year
         )
         
         # Crear comodato
@@ -81,10 +117,84 @@ class ComodatoManager:
         )
         
         # Cambiar estado del instrumento
-        estado_asignado = EstadoInstrumento.query.filter_by(nombre='asignado').first()
         instrumento.cambiar_estado(
-            estado_asignado.id_estado_instr,
-            f"Asignado a alumno {alumno.nombre_completo} via comodato {codigo_comodato}"
+            ReferenceData.estado_id('asignado'),
+            f"Asignado a alumno {alumno.nombre} {alumno.apellido} via comodato {codigo_comodato}"
+        )
+        
+        return comodato
+    
+    @staticmethod
+    def renovar_comodatos(ids, fecha_inicio, fecha_fin, observaciones=None):
+        """
+        Renueva varios comodatos activos (el llamador debe hacer commit).
+        
+        Los contratos anteriores pasan a "renovado" con un UPDATE y los
+        sucesores (mismo alumno, instrumento y representante) se insertan
+        con executemany; sus correlativos se reservan de una vez en la
+        secuencia del año de `fecha_inicio`. El instrumento sigue asignado.
+        
+        Devuelve ({id_anterior: (id_nuevo, codigo)}, {id_anterior: error}).
+        """
+        from app.utils.search_index import SearchIndex
+        
+        actuales = {
+            fila.id_comodato: fila for fila in db.session.execute(
+                select(
+                    Comodato.id_comodato, Comodato.id_alumno, Comodato.id_instr,
+                    Comodato.id_repr, Comodato.estado, Comodato.codigo_comodato
+                ).where(Comodato.id_comodato.in_(ids)).with_for_update()
+            )
+        }
+        errores = {}
+        for id_comodato in ids:
+            if id_comodato not in actuales:
+                errores[id_comodato] = 'Comodato no encontrado'
+            elif actuales[id_comodato].estado != 'activo':
+                errores[id_comodato] = f"El comodato está {actuales[id_comodato].estado}"
+        renovables = [i for i in ids if i not in errores]
+        if not renovables:
+            return {}, errores
+        
+        year = fecha_inicio.year
+        nucleo = current_app.config['NUCLEO_CODIGO']
+        primero = CorrelativoAllocator.reservar(
+            db.session.connection(), year, nucleo, len(renovables)
+        )
+        nuevos = {}
+        for correlativo, id_anterior in enumerate(renovables, start=primero):
+            anterior = actuales[id_anterior]
+            nuevos[id_anterior] = {
+                'id_alumno': anterior.id_alumno,
+                'id_instr': anterior.id_instr,
+                'id_repr': anterior.id_repr,
+                'fecha_inicio': fecha_inicio,
+                'fecha_fin': fecha_fin,
+                'estado': 'activo',
+                'observaciones': observaciones or f"Renovación de {anterior.codigo_comodato}",
+                'correlativo': correlativo,
+                'codigo_comodato': CodeGenerator.generate_codigo_comodato(
+                    correlativo, nucleo_codigo=nucleo, year=year
+                ),
+            }
+        
+        db.session.execute(
+            update(Comodato.__table__)
+            .where(Comodato.id_comodato.in_(renovables))
+            .values(estado='renovado')
         )
+        db.session.execute(insert(Comodato.__table__), list(nuevos.values()))
+        insertados = dict(db.session.execute(
+            select(Comodato.codigo_comodato, Comodato.id_comodato)
+            .where(Comodato.codigo_comodato.in_([n['codigo_comodato'] for n in nuevos.values()]))
+        ).all())
+        SearchIndex.index_rows(db.session.connection(), 'comodato', [
+            {'id_comodato': id_comodato, 'codigo_comodato': codigo}
+            for codigo, id_comodato in insertados.items()
+        ])
         
-        return comodato
\ No newline at end of file
+        renovados = {
+            id_anterior: (insertados[nuevo['codigo_comodato']], nuevo['codigo_comodato'])
+            for id_anterior, nuevo in nuevos.items()
+        }
+        return renovados, errores
@@ -0,0 +1,157 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+from flask import current_app
+from sqlalchemy import update, select, or_, and_
+from werkzeug.utils import secure_filename
+from app.extensions import db
+from app.models import Importacion
+from app.utils.excel_importer import ExcelImporter
+
+class ImportJobs:
+    """
+    Importaciones en segundo plano.
+
+    El archivo subido se guarda junto con el trabajo en la tabla
+    importacion (no en el disco local, que en Render es efímero y no se
+    comparte entre instancias); un pool de hilos del proceso lo
+    ejecuta con ExcelImporter.import_streaming y actualiza el progreso tras
+    cada lote. Como el estado vive en la base de datos, un trabajo
+    pendiente o interrumpido (sin progreso durante IMPORT_JOB_TIMEOUT) se
+    retoma cuando el pool arranca en un worker, con la siguiente subida o
+    consulta de importaciones; el paso a "procesando" es un UPDATE
+    condicional, así que solo un worker lo toma.
+    """
+
+    FORMATOS = ('xlsx', 'csv')
+    MAX_ERRORES_RESUMEN = 100
+
+    _executor = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _pool(app):
+        with ImportJobs._lock:
+            if ImportJobs._executor is None:
+                ImportJobs._executor = ThreadPoolExecutor(
+                    max_workers=app.config.get('IMPORT_WORKERS', 2),
+                    thread_name_prefix='importacion'
+                )
+                ImportJobs._executor.submit(ImportJobs._recuperar, app)
+            return ImportJobs._executor
+
+    @staticmethod
+    def iniciar():
+        """Arranca el pool de este proceso (y con él la recuperación)"""
+        ImportJobs._pool(current_app._get_current_object())
+
+    @staticmethod
+    def leer_archivo(archivo):
+        """Contenido del archivo subido, o None si supera IMPORT_MAX_BYTES"""
+        maximo = current_app.config.get('IMPORT_MAX_BYTES', 20 * 1024 * 1024)
+        contenido = archivo.stream.read(maximo + 1)
+        return contenido if len(contenido) <= maximo else None
+
+    @staticmethod
+    def crear(archivo, contenido, id_usuario=None):
+        """Registra el trabajo con el contenido del archivo subido y lo encola"""
+        formato = ExcelImporter.formato_archivo(archivo)
+        importacion = Importacion(
+            id_usuario=id_usuario,
+            nombre_archivo=secure_filename(archivo.filename or '') or f'importacion.{formato}',
+            formato=formato,
+            contenido=contenido,
+            estado='pendiente'
+        )
+        db.session.add(importacion)
+        db.session.commit()
+
+        ImportJobs.encolar(importacion.id_importacion)
+        return importacion
+
+    @staticmethod
+    def encolar(id_importacion):
+        app = current_app._get_current_object()
+        ImportJobs._pool(app).submit(ImportJobs._ejecutar, app, id_importacion)
+
+    @staticmethod
+    def _reclamar(id_importacion):
+        """Pasa el trabajo a "procesando" si nadie lo está ejecutando"""
+        ahora = datetime.utcnow()
+        limite = ahora - timedelta(seconds=current_app.config.get('IMPORT_JOB_TIMEOUT', 600))
+        resultado = db.session.execute(
+            update(Importacion).where(
+                Importacion.id_importacion == id_importacion,
+                or_(
+                    Importacion.estado == 'pendiente',
+                    and_(Importacion.estado == 'procesando',
+                         Importacion.fecha_actualizacion < limite)
+                )
+            ).values(estado='procesando', fecha_inicio=ahora, fecha_actualizacion=ahora)
+        )
+        db.session.commit()
+        return resultado.rowcount == 1
+
+    @staticmethod
+    def _recuperar(app):
+        """Encola los trabajos pendientes o interrumpidos"""
+        with app.app_context():
+            limite = datetime.utcnow() - timedelta(seconds=app.config.get('IMPORT_JOB_TIMEOUT', 600))
+            ids = db.session.execute(
+                select(Importacion.id_importacion).where(or_(
+                    Importacion.estado == 'pendiente',
+                    and_(Importacion.estado == 'procesando',
+                         Importacion.fecha_actualizacion < limite)
+                ))
+            ).scalars().all()
+            db.session.remove()
+        for id_importacion in ids:
+            ImportJobs._executor.submit(ImportJobs._ejecutar, app, id_importacion)
+
+    @staticmethod
+    def resumen(results):
+        return {
+            **{k: v for k, v in results.items() if k != 'errores'},
+            'errores': results['errores'][:ImportJobs.MAX_ERRORES_RESUMEN],
+            'total_errores': len(results['errores'])
+        }
+
+    @staticmethod
+    def _ejecutar(app, id_importacion):
+        with app.app_context():
+            try:
+                if not ImportJobs._reclamar(id_importacion):
+                    return
+                importacion = db.session.get(Importacion, id_importacion)
+                contenido = importacion.contenido
+
+                def progreso(results):
+                    importacion.filas_procesadas = results['filas_procesadas']
+                    importacion.filas_fallidas = len(results['errores'])
+                    importacion.fecha_actualizacion = datetime.utcnow()
+                    db.session.commit()
+
+                try:
+                    if contenido is None:
+                        raise ValueError('El archivo de la importación no está disponible')
+                    results = ExcelImporter.import_streaming(
+                        BytesIO(contenido), formato=importacion.formato, progreso=progreso
+                    )
+                    importacion.estado = 'completado'
+                    importacion.filas_procesadas = results['filas_procesadas']
+                    importacion.filas_fallidas = len(results['errores'])
+                    importacion.resumen = ImportJobs.resumen(results)
+                except Exception as e:
+                    db.session.rollback()
+                    importacion.estado = 'fallido'
+                    importacion.error = str(e)
+
+                importacion.contenido = None
+                importacion.fecha_fin = importacion.fecha_actualizacion = datetime.utcnow()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f'Importación {id_importacion}: {e}')
+            finally:
+                db.session.remove()
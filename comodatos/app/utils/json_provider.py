@@ -0,0 +1,47 @@
+import decimal
+import orjson
+from flask.json.provider import JSONProvider
+
+class OrjsonProvider(JSONProvider):
+    """
+    Proveedor JSON de Flask basado en orjson.
+
+    orjson serializa date/datetime de forma nativa (ISO 8601), así como
+    UUID y dataclasses, y devuelve bytes que se escriben directamente en la
+    respuesta sin pasar por str. Mantiene las claves ordenadas como el
+    proveedor por defecto; Decimal y los objetos con __html__ se convierten
+    igual que en él. La salida es compacta salvo que compact sea False.
+    """
+
+    sort_keys = True
+    compact = None
+    mimetype = 'application/json'
+
+    @staticmethod
+    def _default(obj):
+        if isinstance(obj, decimal.Decimal):
+            return str(obj)
+        if hasattr(obj, '__html__'):
+            return str(obj.__html__())
+        raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+    def _opciones(self):
+        opciones = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opciones |= orjson.OPT_SORT_KEYS
+        if self.compact is False:
+            opciones |= orjson.OPT_INDENT_2
+        return opciones
+
+    def dumps_bytes(self, obj, **kwargs):
+        return orjson.dumps(obj, default=kwargs.get('default', self._default), option=self._opciones())
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
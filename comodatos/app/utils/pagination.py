@@ -0,0 +1,193 @@
+import base64
+import json
+from datetime import date, datetime
+from flask import abort
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+class KeysetPage:
+    """Página obtenida por cursor (sin COUNT)"""
+    def __init__(self, items, next_cursor, prev_cursor, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.per_page = per_page
+
+    def meta(self):
+        return {
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'per_page': self.per_page
+        }
+
+class Paginator:
+    """
+    Paginación por cursor (keyset) sobre las mismas columnas del ORDER BY.
+
+    En lugar de OFFSET/LIMIT + COUNT(*), cada página filtra a partir de los
+    valores de la última fila vista, así que la página 500 cuesta lo mismo
+    que la primera. El ORDER BY debe terminar en la clave primaria para que
+    el orden sea total.
+    """
+
+    @staticmethod
+    def _parse_orden(orden):
+        """Convierte expresiones ORDER BY en pares (columna, descendente)"""
+        parsed = []
+        for expr in orden:
+            if isinstance(expr, UnaryExpression) and expr.modifier in (operators.desc_op, operators.asc_op):
+                parsed.append((expr.element, expr.modifier is operators.desc_op))
+            else:
+                parsed.append((expr, False))
+        return parsed
+
+    @staticmethod
+    def encode_cursor(values, direction):
+        payload = [
+            v.isoformat() if isinstance(v, (date, datetime)) else v
+            for v in values
+        ]
+        raw = json.dumps({'d': direction, 'v': payload}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor, columnas):
+        """Decodifica un cursor; lanza ValueError si no es válido"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            data = json.loads(raw)
+            direction, payload = data['d'], data['v']
+
+            if direction not in ('next', 'prev') or not isinstance(payload, list) \
+                    or len(payload) != len(columnas):
+                raise ValueError('Cursor inválido')
+
+            values = []
+            for (columna, _), value in zip(columnas, payload):
+                if value is not None:
+                    python_type = columna.type.python_type
+                    if python_type is datetime:
+                        value = datetime.fromisoformat(value)
+                    elif python_type is date:
+                        value = date.fromisoformat(value)
+                values.append(value)
+        except (ValueError, TypeError, KeyError):
+            # Incluye valores de fecha que no son texto ISO
+            raise ValueError('Cursor inválido')
+        return direction, values
+
+    @staticmethod
+    def _valores(row, columnas):
+        """Valores del ORDER BY de una fila (entidad o Row con la entidad primero)"""
+        if not any(hasattr(row, c.key) for c, _ in columnas):
+            row = row[0]
+        return [getattr(row, c.key) for c, _ in columnas]
+
+    @staticmethod
+    def _despues_de(columnas, values):
+        """
+        Condición "fila posterior a values" según el orden dado.
+
+        Expande (a, b, c) > (va, vb, vc) como OR de prefijos iguales, lo que
+        admite direcciones mixtas. Los NULL siguen la convención de
+        MySQL/SQLite: primero en ASC y último en DESC.
+        """
+        condiciones = []
+        iguales = []
+        for (columna, desc), value in zip(columnas, values):
+            if value is None:
+                # Los NULL van primero en ASC: cualquier no-NULL es posterior
+                posterior = None if desc else columna.isnot(None)
+                igual = columna.is_(None)
+            else:
+                if desc:
+                    posterior = or_(columna < value, columna.is_(None))
+                else:
+                    posterior = columna > value
+                igual = columna == value
+
+            if posterior is not None:
+                condiciones.append(and_(*iguales, posterior))
+            iguales.append(igual)
+        return or_(*condiciones)
+
+    @staticmethod
+    def iter_batches(query, orden, batch_size=500):
+        """
+        Recorre toda la consulta en lotes de `batch_size` filas por keyset.
+
+        Cada lote es una consulta independiente, así que entre lotes la
+        conexión queda libre y la memoria no depende del tamaño de la tabla.
+        """
+        columnas = Paginator._parse_orden(orden)
+        query = query.order_by(None).order_by(*[
+            c.desc() if desc else c.asc() for c, desc in columnas
+        ])
+        values = None
+
+        while True:
+            lote = query
+            if values is not None:
+                lote = lote.filter(Paginator._despues_de(columnas, values))
+
+            rows = lote.limit(batch_size).all()
+            if rows:
+                yield rows
+            if len(rows) < batch_size:
+                return
+
+            values = Paginator._valores(rows[-1], columnas)
+
+    @staticmethod
+    def keyset(query, orden, cursor=None, per_page=20):
+        """
+        Devuelve una KeysetPage de la consulta ordenada por `orden`.
+
+        `cursor` vacío o None devuelve la primera página.
+        """
+        columnas = Paginator._parse_orden(orden)
+        direction = 'next'
+
+        if cursor:
+            try:
+                direction, values = Paginator.decode_cursor(cursor, columnas)
+            except ValueError as e:
+                abort(400, description=str(e))
+
+        if direction == 'prev':
+            # Recorrer hacia atrás invirtiendo el orden y luego reordenar
+            columnas_query = [(c, not desc) for c, desc in columnas]
+        else:
+            columnas_query = columnas
+
+        if cursor:
+            query = query.filter(Paginator._despues_de(columnas_query, values))
+
+        query = query.order_by(None).order_by(*[
+            c.desc() if desc else c.asc() for c, desc in columnas_query
+        ])
+
+        rows = query.limit(per_page + 1).all()
+        hay_mas = len(rows) > per_page
+        rows = rows[:per_page]
+
+        if direction == 'prev':
+            rows.reverse()
+
+        def cursor_de(row, d):
+            return Paginator.encode_cursor(Paginator._valores(row, columnas), d)
+
+        next_cursor = prev_cursor = None
+        if rows:
+            if direction == 'next':
+                if hay_mas:
+                    next_cursor = cursor_de(rows[-1], 'next')
+                if cursor:
+                    prev_cursor = cursor_de(rows[0], 'prev')
+            else:
+                next_cursor = cursor_de(rows[-1], 'next')
+                if hay_mas:
+                    prev_cursor = cursor_de(rows[0], 'prev')
+
+        return KeysetPage(rows, next_cursor, prev_cursor, per_page)
@@ -0,0 +1,34 @@
+from sqlalchemy.orm import joinedload, raiseload
+from app.models import Comodato, Instrumento
+
+class QueryOptions:
+    """
+    Perfiles de carga para las consultas de comodatos.
+
+    Cada listado de comodatos pasa por aquí para que el número de consultas
+    de una página sea fijo, sin importar cuántas filas tenga.
+    """
+
+    @staticmethod
+    def comodato_options(perfil='lista'):
+        """Devuelve las opciones de carga del perfil indicado"""
+        if perfil == 'lista':
+            # Los esquemas de listado solo serializan columnas: cualquier
+            # carga perezosa de relaciones sería un N+1, así que se prohíbe
+            return (raiseload('*', sql_only=True),)
+
+        if perfil == 'completo':
+            # Relaciones muchos-a-uno: un solo JOIN por fila, sin consultas extra
+            return (
+                joinedload(Comodato.alumno),
+                joinedload(Comodato.representante),
+                joinedload(Comodato.instrumento).joinedload(Instrumento.estado_actual),
+                joinedload(Comodato.instrumento).joinedload(Instrumento.medida),
+            )
+
+        raise ValueError(f"Perfil de carga desconocido: {perfil}")
+
+    @staticmethod
+    def comodatos(query, perfil='lista'):
+        """Aplica el perfil de carga a una consulta de comodatos"""
+        return query.options(*QueryOptions.comodato_options(perfil))
@@ -0,0 +1,104 @@
+from app.models import Medida, EstadoInstrumento
+from app.schemas import (
+    medida_schema, medidas_schema, estado_instrumento_schema, estados_instrumento_schema
+)
+from app.utils.cache import ResultCache
+
+_cache = ResultCache(['medida', 'estado_instrumento'], 'REFERENCE_DATA_TTL', ttl_default=300)
+
+class ReferenceData:
+    """
+    Registro en memoria de las tablas de referencia (medida, estado_instrumento).
+
+    Se carga una vez por worker con dos consultas y se invalida en cuanto un
+    commit modifica alguna de las dos tablas. Una búsqueda sin resultado
+    consulta solo esa clave, porque el valor puede haberse creado en otro
+    worker después de la carga; si existe, el registro se recarga en la
+    siguiente lectura, y si no, se deja como está. Los valores son dicts ya
+    serializados con los esquemas; no deben modificarse.
+    """
+
+    # indice -> (columna de búsqueda, schema para serializar la fila)
+    _INDICES = {
+        'medidas_por_id': (Medida.id_medida, medida_schema),
+        'medidas_por_nombre': (Medida.nombre, medida_schema),
+        'estados_por_id': (EstadoInstrumento.id_estado_instr, estado_instrumento_schema),
+        'estados_por_nombre': (EstadoInstrumento.nombre, estado_instrumento_schema),
+    }
+
+    @staticmethod
+    def _cargar():
+        medidas = medidas_schema.dump(Medida.query.order_by(Medida.nombre).all())
+        estados = estados_instrumento_schema.dump(
+            EstadoInstrumento.query.order_by(EstadoInstrumento.nombre).all()
+        )
+        return {
+            'medidas': medidas,
+            'medidas_por_id': {m['id_medida']: m for m in medidas},
+            'medidas_por_nombre': {m['nombre']: m for m in medidas},
+            'estados': estados,
+            'estados_por_id': {e['id_estado_instr']: e for e in estados},
+            'estados_por_nombre': {e['nombre']: e for e in estados},
+        }
+
+    @staticmethod
+    def _datos():
+        return _cache.get_or_set('referencia', ReferenceData._cargar)
+
+    @staticmethod
+    def _buscar(indice, clave):
+        """Valor de `indice` para `clave`; si no está, lo busca en la base de datos"""
+        valor = ReferenceData._datos()[indice].get(clave)
+        if valor is not None:
+            return valor
+        columna, schema = ReferenceData._INDICES[indice]
+        fila = columna.class_.query.filter(columna == clave).first()
+        if fila is None:
+            return None
+        # Creado después de la carga: el registro completo se recarga en la siguiente lectura
+        _cache.clear()
+        return schema.dump(fila)
+
+    @staticmethod
+    def _id(valor):
+        """Id entero, o None si no lo es ('3' se acepta como 3)"""
+        try:
+            return int(valor)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def medidas():
+        return ReferenceData._datos()['medidas']
+
+    @staticmethod
+    def medida(id_medida):
+        id_medida = ReferenceData._id(id_medida)
+        if id_medida is None:
+            return None
+        return ReferenceData._buscar('medidas_por_id', id_medida)
+
+    @staticmethod
+    def medida_por_nombre(nombre):
+        return ReferenceData._buscar('medidas_por_nombre', nombre)
+
+    @staticmethod
+    def estados():
+        return ReferenceData._datos()['estados']
+
+    @staticmethod
+    def estado(id_estado_instr):
+        id_estado_instr = ReferenceData._id(id_estado_instr)
+        if id_estado_instr is None:
+            return None
+        return ReferenceData._buscar('estados_por_id', id_estado_instr)
+
+    @staticmethod
+    def estado_por_nombre(nombre):
+        return ReferenceData._buscar('estados_por_nombre', nombre)
+
+    @staticmethod
+    def estado_id(nombre):
+        """id_estado_instr del estado con ese nombre, o None"""
+        estado = ReferenceData.estado_por_nombre(nombre)
+        return estado['id_estado_instr'] if estado else None
@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+from flask import g, has_request_context
+from flask_jwt_extended import get_jwt
+from sqlalchemy import event, false
+from sqlalchemy.orm import Session, with_loader_criteria
+from app.models import Alumno, Comodato, Representante
+
+class RowScope:
+    """
+    Alcance por filas para usuarios con rol representante.
+
+    En cada SELECT/UPDATE/DELETE del ORM hecho durante una petición de un
+    representante se añade with_loader_criteria sobre Alumno, Comodato y
+    Representante, así que las filas de otros representantes no se cargan
+    nunca (tampoco por relaciones perezosas): un detalle ajeno da 404.
+
+    Las consultas que deben ver todas las filas (unicidad de cédulas,
+    resultados cacheados para todo el proceso) se ejecutan dentro de
+    RowScope.sin_alcance() o con la opción de ejecución row_scope=False.
+    """
+
+    OPCION = 'row_scope'
+    MODELOS = (Alumno, Comodato, Representante)
+
+    @staticmethod
+    def condicion(modelo, id_repr):
+        """Filas de `modelo` visibles para el representante `id_repr`"""
+        if id_repr is None:
+            # Representante sin ficha: no ve ninguna fila
+            return false()
+        return modelo.id_repr == id_repr
+
+    @staticmethod
+    def criterios(id_repr):
+        """Opciones de carga que limitan las consultas a un representante"""
+        return tuple(
+            with_loader_criteria(modelo, RowScope.condicion(modelo, id_repr), include_aliases=True)
+            for modelo in RowScope.MODELOS
+        )
+
+    @staticmethod
+    def principal_actual():
+        """Principal de la petición si hay que aplicar alcance, o None"""
+        if not has_request_context() or g.get('_row_scope_off'):
+            return None
+        try:
+            claims = get_jwt()
+        except RuntimeError:
+            # Petición sin JWT verificado (login, registro, ...)
+            return None
+        if claims.get('rol') != 'representante':
+            return None
+
+        from app.auth.utils import get_principal
+        return get_principal()
+
+    @staticmethod
+    def _do_orm_execute(orm_execute_state):
+        if not (orm_execute_state.is_select or orm_execute_state.is_update
+                or orm_execute_state.is_delete):
+            return
+        # Las cargas de columnas y relaciones heredan el criterio de la consulta original
+        if orm_execute_state.is_column_load or orm_execute_state.is_relationship_load:
+            return
+        if orm_execute_state.execution_options.get(RowScope.OPCION, True) is False:
+            return
+
+        principal = RowScope.principal_actual()
+        if principal is None:
+            return
+        orm_execute_state.statement = orm_execute_state.statement.options(
+            *RowScope.criterios(principal.id_repr)
+        )
+
+    @staticmethod
+    @contextmanager
+    def sin_alcance():
+        """Desactiva el alcance por filas dentro del bloque"""
+        if not has_request_context():
+            yield
+            return
+        anterior = g.get('_row_scope_off', False)
+        g._row_scope_off = True
+        try:
+            yield
+        finally:
+            g._row_scope_off = anterior
+
+    @staticmethod
+    def install():
+        """Registra el evento de sesión (idempotente)"""
+        if event.contains(Session, 'do_orm_execute', RowScope._do_orm_execute):
+            return
+        event.listen(Session, 'do_orm_execute', RowScope._do_orm_execute)
+
+RowScope.install()
@@ -0,0 +1,214 @@
+from sqlalchemy import event, func, case, exists, insert, delete, inspect
+from sqlalchemy.orm import aliased
+from app.extensions import db
+from app.models import Alumno, Representante, Instrumento, Comodato, TerminoBusqueda
+from app.utils.row_scope import RowScope
+from app.utils.text import tokenize
+
+class SearchIndex:
+    """
+    Índice de búsqueda mantenido en la tabla termino_busqueda.
+
+    Cada entidad se descompone en términos normalizados (sin acentos, en
+    minúsculas) con un peso por campo. La búsqueda por prefijo es un
+    rango sobre el índice (termino, entidad) y el ranking suma los pesos
+    del término encontrado. El índice se mantiene con eventos del
+    mapper; las inserciones en bloque deben llamar a index_rows().
+    """
+
+    # entidad -> (modelo, clave primaria, {campo: peso})
+    ENTIDADES = {
+        'alumno': (Alumno, 'id_alumno', {'nombre': 3, 'apellido': 3, 'cedula': 4}),
+        'representante': (Representante, 'id_repr', {'nombre': 3, 'apellido': 3, 'cedula': 4}),
+        'instrumento': (Instrumento, 'id_instr', {
+            'descripcion': 3, 'marca': 2, 'modelo': 2,
+            'serial_fabrica': 4, 'serial_inventario': 4
+        }),
+        'comodato': (Comodato, 'id_comodato', {'codigo_comodato': 4}),
+    }
+
+    LONGITUD_TERMINO = 100
+
+    @staticmethod
+    def terminos(entidad, valores):
+        """
+        Términos (termino, peso) de una fila dada como dict campo -> valor.
+
+        Además de cada palabra se indexa el valor completo normalizado y sin
+        separadores, para que "V123", "DN-GC" o un serial completo también
+        encuentren coincidencia por prefijo.
+        """
+        _, _, campos = SearchIndex.ENTIDADES[entidad]
+        pesos = {}
+        for campo, peso in campos.items():
+            valor = valores.get(campo)
+            if not valor:
+                continue
+            palabras = tokenize(valor)
+            compacto = ''.join(palabras)
+            for termino in palabras + [compacto]:
+                termino = termino[:SearchIndex.LONGITUD_TERMINO]
+                if termino and pesos.get(termino, 0) < peso:
+                    pesos[termino] = peso
+        return pesos.items()
+
+    @staticmethod
+    def index_rows(connection, entidad, filas):
+        """
+        (Re)indexa filas de una entidad sobre la conexión dada.
+
+        `filas` son dicts con la clave primaria y los campos indexados.
+        """
+        _, pk, _ = SearchIndex.ENTIDADES[entidad]
+        ids = [fila[pk] for fila in filas]
+        if not ids:
+            return
+
+        connection.execute(
+            delete(TerminoBusqueda.__table__).where(
+                TerminoBusqueda.entidad == entidad,
+                TerminoBusqueda.id_entidad.in_(ids)
+            )
+        )
+
+        registros = [
+            {'entidad': entidad, 'id_entidad': fila[pk], 'termino': termino, 'peso': peso}
+            for fila in filas
+            for termino, peso in SearchIndex.terminos(entidad, fila)
+        ]
+        if registros:
+            connection.execute(insert(TerminoBusqueda.__table__), registros)
+
+    @staticmethod
+    def remove_rows(connection, entidad, ids):
+        connection.execute(
+            delete(TerminoBusqueda.__table__).where(
+                TerminoBusqueda.entidad == entidad,
+                TerminoBusqueda.id_entidad.in_(ids)
+            )
+        )
+
+    @staticmethod
+    def reindex_all(batch_size=1000):
+        """Reconstruye todo el índice (backfill)"""
+        for entidad, (modelo, pk, campos) in SearchIndex.ENTIDADES.items():
+            db.session.execute(
+                delete(TerminoBusqueda.__table__).where(TerminoBusqueda.entidad == entidad)
+            )
+            columnas = [getattr(modelo, pk)] + [getattr(modelo, c) for c in campos]
+            ultimo = 0
+            while True:
+                filas = db.session.query(*columnas).filter(
+                    getattr(modelo, pk) > ultimo
+                ).order_by(getattr(modelo, pk)).limit(batch_size).all()
+                if not filas:
+                    break
+                SearchIndex.index_rows(
+                    db.session.connection(), entidad, [fila._asdict() for fila in filas]
+                )
+                ultimo = filas[-1][0]
+        db.session.commit()
+
+    @staticmethod
+    def _prefijo(columna, palabra):
+        """
+        columna empieza por `palabra`, como rango BETWEEN.
+
+        Los términos solo contienen [a-z0-9], así que todo término con ese
+        prefijo está entre la palabra y la palabra rellenada con 'z'. A
+        diferencia de LIKE, el rango usa el índice en SQLite y en MySQL sea
+        cual sea la collation.
+        """
+        return columna.between(
+            palabra, palabra + 'z' * (SearchIndex.LONGITUD_TERMINO - len(palabra))
+        )
+
+    @staticmethod
+    def buscar(texto, limite=10, candidatos=200):
+        """
+        Busca `texto` en todas las entidades.
+
+        La palabra más larga de la consulta recorre por entidad un rango del
+        índice; el resto de palabras se comprueba con EXISTS antes de cortar
+        en `candidatos` términos, así que el corte solo descarta entidades
+        que cumplen toda la consulta. Los candidatos se toman en el orden del
+        índice (termino, id_entidad): el término exacto y los más cortos
+        quedan primero. Devuelve {entidad: [objetos ordenados por relevancia]}.
+
+        Para un representante, el alcance por filas (RowScope) se aplica
+        también a los candidatos, antes del corte: las filas de otros
+        representantes no ocupan puestos del resultado.
+        """
+        palabras = sorted(set(tokenize(texto)), key=len, reverse=True)[:5]
+        palabras = [p[:SearchIndex.LONGITUD_TERMINO] for p in palabras]
+        resultado = {entidad: [] for entidad in SearchIndex.ENTIDADES}
+        if not palabras:
+            return resultado
+
+        principal, resto = palabras[0], palabras[1:]
+        alcance = RowScope.principal_actual()
+
+        for entidad, (modelo, pk, _) in SearchIndex.ENTIDADES.items():
+            candidato = db.session.query(
+                TerminoBusqueda.id_entidad,
+                TerminoBusqueda.termino,
+                TerminoBusqueda.peso
+            ).filter(
+                TerminoBusqueda.entidad == entidad,
+                SearchIndex._prefijo(TerminoBusqueda.termino, principal)
+            )
+            for palabra in resto:
+                otro = aliased(TerminoBusqueda)
+                candidato = candidato.filter(
+                    exists().where(
+                        otro.entidad == entidad,
+                        otro.id_entidad == TerminoBusqueda.id_entidad,
+                        SearchIndex._prefijo(otro.termino, palabra)
+                    )
+                )
+            if alcance is not None and modelo in RowScope.MODELOS:
+                candidato = candidato.filter(
+                    exists().where(
+                        getattr(modelo, pk) == TerminoBusqueda.id_entidad,
+                        RowScope.condicion(modelo, alcance.id_repr)
+                    )
+                )
+            candidato = candidato.order_by(
+                TerminoBusqueda.termino, TerminoBusqueda.id_entidad
+            ).limit(candidatos).subquery()
+
+            # Puntuación: peso del término, con bonificación si es exacto
+            puntaje = func.sum(
+                candidato.c.peso + case((candidato.c.termino == principal, 2), else_=0)
+            ).label('puntaje')
+
+            ranking = db.session.query(candidato.c.id_entidad, puntaje).group_by(
+                candidato.c.id_entidad
+            ).order_by(puntaje.desc(), candidato.c.id_entidad).limit(limite).subquery()
+
+            resultado[entidad] = modelo.query.join(
+                ranking, getattr(modelo, pk) == ranking.c.id_entidad
+            ).order_by(ranking.c.puntaje.desc(), getattr(modelo, pk)).all()
+
+        return resultado
+
+def _registrar_eventos(entidad, modelo, pk, campos):
+    def valores(target):
+        return {pk: getattr(target, pk), **{c: getattr(target, c) for c in campos}}
+
+    @event.listens_for(modelo, 'after_insert')
+    def after_insert(mapper, connection, target):
+        SearchIndex.index_rows(connection, entidad, [valores(target)])
+
+    @event.listens_for(modelo, 'after_update')
+    def after_update(mapper, connection, target):
+        estado = inspect(target)
+        if any(estado.attrs[c].history.has_changes() for c in campos):
+            SearchIndex.index_rows(connection, entidad, [valores(target)])
+
+    @event.listens_for(modelo, 'after_delete')
+    def after_delete(mapper, connection, target):
+        SearchIndex.remove_rows(connection, entidad, [getattr(target, pk)])
+
+for _entidad, (_modelo, _pk, _campos) in SearchIndex.ENTIDADES.items():
+    _registrar_eventos(_entidad, _modelo, _pk, _campos)
@@ -0,0 +1,127 @@
+import hashlib
+from datetime import date
+from functools import wraps
+from flask import request, make_response
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import VersionTabla
+from app.utils.change_tracker import ChangeTracker
+
+class TableVersions:
+    """
+    Versión por tabla para respuestas condicionales (ETag / 304).
+
+    Antes de cada commit que modifica tablas, ChangeTracker incrementa su
+    fila en version_tabla dentro de la misma transacción, así que todos los
+    workers ven la nueva versión en cuanto los datos son visibles. Leer las
+    versiones de un listado es una consulta por clave primaria, mucho más
+    barata que ejecutar la consulta y serializar el resultado.
+
+    Solo se versionan las tablas de las que depende algún @conditional_get:
+    cada incremento bloquea la fila de la tabla hasta el commit, y no tiene
+    sentido que las escrituras en otras tablas esperen por ella.
+    """
+
+    # Tablas usadas por @conditional_get (se registran al decorar las vistas)
+    TABLAS = set()
+
+    # Sufijos que la compresión añade al ETag (app/middleware/compression.py)
+    SUFIJOS_CODIFICACION = ('', '-gzip', '-br')
+
+    @staticmethod
+    def versiones(tablas):
+        """{tabla: versión} de las tablas indicadas (0 si nunca se modificó)"""
+        encontradas = dict(db.session.execute(
+            select(VersionTabla.tabla, VersionTabla.version)
+            .where(VersionTabla.tabla.in_(tablas))
+        ).all())
+        return {tabla: encontradas.get(tabla, 0) for tabla in tablas}
+
+    @staticmethod
+    def incrementar(session, tablas):
+        """Incrementa la versión de `tablas` en la transacción de `session`"""
+        # Orden fijo para que dos transacciones no se bloqueen mutuamente
+        nombres = sorted(set(tablas) & TableVersions.TABLAS)
+        if not nombres:
+            return
+        tabla = VersionTabla.__table__
+        connection = session.connection()
+
+        resultado = connection.execute(
+            update(tabla).where(tabla.c.tabla.in_(nombres)).values(version=tabla.c.version + 1)
+        )
+        if resultado.rowcount == len(nombres):
+            return
+
+        existentes = set(connection.execute(
+            select(tabla.c.tabla).where(tabla.c.tabla.in_(nombres))
+        ).scalars())
+        for nombre in nombres:
+            if nombre in existentes:
+                continue
+            try:
+                with connection.begin_nested():
+                    connection.execute(insert(tabla).values(tabla=nombre, version=1))
+            except IntegrityError:
+                # Otra transacción creó la fila a la vez
+                connection.execute(
+                    update(tabla).where(tabla.c.tabla == nombre).values(version=tabla.c.version + 1)
+                )
+
+    @staticmethod
+    def etag(tablas):
+        """
+        ETag de la petición actual: versiones de `tablas`, ruta, parámetros,
+        rol e id_repr del usuario y fecha del día (los campos como
+        dias_restantes cambian a medianoche).
+        """
+        from app.auth.utils import get_principal
+
+        principal = get_principal()
+        partes = (
+            request.path,
+            sorted(request.args.items(multi=True)),
+            sorted(TableVersions.versiones(tablas).items()),
+            principal.rol,
+            principal.id_repr,
+            date.today().isoformat(),
+        )
+        return hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def coincide(etag):
+        """True si If-None-Match incluye el ETag (en cualquier codificación)"""
+        if_none_match = request.if_none_match
+        return bool(if_none_match) and any(
+            if_none_match.contains_weak(f'{etag}{sufijo}')
+            for sufijo in TableVersions.SUFIJOS_CODIFICACION
+        )
+
+def conditional_get(*tablas):
+    """
+    Responde 304 sin ejecutar la vista si el ETag del cliente sigue vigente.
+
+    `tablas` son las tablas de las que depende la respuesta. Debe aplicarse
+    debajo de @jwt_required().
+    """
+    TableVersions.TABLAS.update(tablas)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag = TableVersions.etag(tablas)
+            if TableVersions.coincide(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # Respuesta por usuario: el cliente debe revalidar siempre
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+ChangeTracker.before_commit(TableVersions.incrementar)
@@ -0,0 +1,22 @@
+import re
+import unicodedata
+
+def normalize_text(text):
+    """Minúsculas y sin diacríticos ("José" -> "jose")"""
+    if not text:
+        return text
+    return ''.join(
+        c for c in unicodedata.normalize('NFD', str(text).lower())
+        if unicodedata.category(c) != 'Mn'
+    )
+
+def tokenize(text):
+    """Divide un texto normalizado en palabras alfanuméricas"""
+    if not text:
+        return []
+    return re.findall(r'[a-z0-9]+', normalize_text(text))
+
+def prefix_pattern(text):
+    """Patrón LIKE 'texto%' con los comodines escapados (usar escape='\\')"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'{escaped}%'
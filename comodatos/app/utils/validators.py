@@ -20,6 +20,14 @@ class Validators:
             return False
         return True
     
+    @staticmethod
+    def cedula_prefixes(texto):
+        """Prefijos de cédula a buscar: tal cual, o con cada letra si solo son dígitos"""
+        texto = texto.strip().upper()
+        if texto.isdigit():
+            return [f'{letra}{texto}' for letra in 'VEJPG']
+        return [texto]
+    
     @staticmethod
     def validate_serial_inventario(serial):
         """Valida serial de inventario de 16 dígitos"""
@@ -44,7 +52,7 @@ class Validators:
     @staticmethod
     def sanitize_input(text):
         """Limpia entrada de texto para prevenir XSS"""
-        import bleach
         if not text:
             return text
+        import bleach
         return bleach.clean(text, tags=[], strip=True)
\ No newline at end of file
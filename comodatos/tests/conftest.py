@@ -0,0 +1,70 @@
+import os
+import pytest
+from sqlalchemy import event
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """
+    Aplicación de pruebas sobre una base de datos nueva.
+
+    Por defecto es un archivo SQLite temporal (admite varias conexiones, a
+    diferencia de :memory:); TEST_DATABASE_URL permite usar MySQL.
+    """
+    # setup_logging escribe en ./logs: fuera del repositorio
+    monkeypatch.chdir(tmp_path)
+    if not os.environ.get('TEST_DATABASE_URL'):
+        monkeypatch.setenv('TEST_DATABASE_URL', f"sqlite:///{tmp_path / 'comodatos.db'}")
+
+    from app import create_app
+    from app.config import TestingConfig
+    from app.extensions import db, limiter
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', os.environ['TEST_DATABASE_URL'])
+
+    app = create_app('testing')
+    limiter.enabled = False
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def datos_base(app):
+    """Medidas, estados y un usuario admin"""
+    from app.extensions import db
+    from app.models import Medida, EstadoInstrumento, Usuario
+
+    for nombre in ['4/4', '3/4', '1/2']:
+        db.session.add(Medida(nombre=nombre, descripcion=f'Medida {nombre}'))
+    for nombre in ['disponible', 'asignado', 'no_operativo', 'mantenimiento', 'baja']:
+        db.session.add(EstadoInstrumento(nombre=nombre, descripcion=nombre))
+    admin = Usuario(email='admin@comodatos.test', rol='admin', is_active=True)
+    admin.set_password('Admin123!')
+    db.session.add(admin)
+    db.session.commit()
+    return {'admin': admin}
+
+@pytest.fixture
+def auth_headers(datos_base):
+    from app.auth.utils import create_tokens
+    token = create_tokens(datos_base['admin'])['access_token']
+    return {'Authorization': f'Bearer {token}'}
+
+@pytest.fixture
+def contar_consultas(app):
+    """Lista que acumula las sentencias SQL ejecutadas durante la prueba"""
+    from app.extensions import db
+
+    sentencias = []
+
+    def registrar(conn, cursor, statement, *args):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    yield sentencias
+    event.remove(db.engine, 'before_cursor_execute', registrar)
@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+from itertools import count
+from app.extensions import db
+from app.models import Alumno, Comodato, Instrumento, Representante, Usuario
+
+_secuencia = count(1)
+
+def crear_representante():
+    n = next(_secuencia)
+    usuario = Usuario(email=f'repr{n}@comodatos.test', rol='representante', is_active=True)
+    usuario.set_password('Repr123!')
+    representante = Representante(
+        usuario=usuario, nombre=f'Luis{n}', apellido='Pérez', cedula=f'V{3000000 + n}'
+    )
+    db.session.add_all([usuario, representante])
+    db.session.flush()
+    return representante
+
+def crear_alumno(representante=None):
+    n = next(_secuencia)
+    representante = representante or crear_representante()
+    alumno = Alumno(
+        id_repr=representante.id_repr, nombre=f'Ana{n}', apellido='Pérez',
+        cedula=f'V{4000000 + n}', fecha_nacimiento=date(2012, 1, 1),
+        programa='orquestal', estado='activo'
+    )
+    db.session.add(alumno)
+    db.session.flush()
+    return alumno
+
+def crear_instrumento():
+    n = next(_secuencia)
+    instrumento = Instrumento(
+        descripcion='VIOLIN', marca='Stentor', modelo='Student I', id_medida=1,
+        serial_inventario=f'{10**15 + n}', id_estado_instr=1
+    )
+    db.session.add(instrumento)
+    db.session.flush()
+    return instrumento
+
+def crear_comodato(alumno=None, instrumento=None, correlativo=None, codigo=None,
+                   estado='activo', inicio=None):
+    n = next(_secuencia)
+    alumno = alumno or crear_alumno()
+    instrumento = instrumento or crear_instrumento()
+    inicio = inicio or date.today()
+    comodato = Comodato(
+        id_alumno=alumno.id_alumno, id_instr=instrumento.id_instr, id_repr=alumno.id_repr,
+        fecha_inicio=inicio, fecha_fin=inicio + timedelta(days=180), estado=estado,
+        correlativo=correlativo or n, codigo_comodato=codigo or f'TEST/{n:04d}/{inicio.year}'
+    )
+    db.session.add(comodato)
+    db.session.commit()
+    return comodato
@@ -0,0 +1,116 @@
+from itertools import count
+import pytest
+from app.extensions import db
+from app.models import Alumno, HistorialEstadoInstr, Instrumento, TerminoBusqueda
+from tests.factories import crear_alumno, crear_instrumento, crear_representante
+
+_secuencia = count(1)
+
+def instrumento():
+    return {'descripcion': 'Viola', 'marca': 'Yamaha', 'serial_inventario': f'{2 * 10**15 + next(_secuencia)}'}
+
+def alumno(id_repr):
+    return {'nombre': 'Eva', 'apellido': 'Rojas', 'cedula': f'V{5000000 + next(_secuencia)}', 'id_repr': id_repr}
+
+@pytest.fixture
+def id_repr(datos_base):
+    representante = crear_representante()
+    db.session.commit()
+    return representante.id_repr
+
+def test_instrumentos_todos_creados(client, auth_headers, datos_base):
+    items = [instrumento(), instrumento()]
+
+    response = client.post('/api/instrumentos/bulk', headers=auth_headers, json={'items': items})
+
+    assert response.status_code == 201
+    cuerpo = response.get_json()
+    assert (cuerpo['creados'], cuerpo['fallidos']) == (2, 0)
+    ids = [r['id_instr'] for r in cuerpo['resultados']]
+    seriales = [db.session.get(Instrumento, i).serial_inventario for i in ids]
+    assert seriales == [item['serial_inventario'] for item in items]
+    assert HistorialEstadoInstr.query.filter(HistorialEstadoInstr.id_instr.in_(ids)).count() == 2
+    assert TerminoBusqueda.query.filter_by(entidad='instrumento').filter(
+        TerminoBusqueda.id_entidad.in_(ids)
+    ).count() > 0
+
+def test_instrumentos_creacion_parcial(client, auth_headers, datos_base):
+    existente = crear_instrumento().serial_inventario
+    db.session.commit()
+    repetido = instrumento()
+    items = [
+        instrumento(),
+        {**instrumento(), 'serial_inventario': existente},
+        repetido,
+        repetido,
+        {**instrumento(), 'id_medida': 999},
+        {'descripcion': 'Sin serial'},
+        'no es un objeto',
+    ]
+
+    response = client.post('/api/instrumentos/bulk', headers=auth_headers, json={'items': items})
+
+    assert response.status_code == 207
+    resultados = response.get_json()['resultados']
+    assert 'id_instr' in resultados[0] and 'id_instr' in resultados[2]
+    assert resultados[1]['error'] == 'El serial de inventario ya está registrado'
+    assert resultados[3]['error'] == 'Serial de inventario repetido en la petición'
+    assert resultados[4]['error'] == 'Medida no encontrada'
+    assert 'serial_inventario' in resultados[5]['error']
+    assert resultados[6]['error'] == 'Elemento inválido'
+
+def test_instrumentos_ninguno_creado(client, auth_headers, datos_base):
+    response = client.post('/api/instrumentos/bulk', headers=auth_headers, json={
+        'items': [{**instrumento(), 'id_medida': 999}]
+    })
+
+    assert response.status_code == 400
+    assert response.get_json()['creados'] == 0
+    assert client.post('/api/instrumentos/bulk', headers=auth_headers, json={'items': []}).status_code == 400
+
+def test_alumnos_creacion_parcial(client, auth_headers, id_repr):
+    existente = crear_alumno().cedula
+    db.session.commit()
+    items = [
+        alumno(id_repr),
+        {**alumno(id_repr), 'cedula': existente},
+        {**alumno(id_repr), 'cedula': 'no valida'},
+        alumno(999999),
+    ]
+
+    response = client.post('/api/alumnos/bulk', headers=auth_headers, json={'items': items})
+
+    assert response.status_code == 207
+    resultados = response.get_json()['resultados']
+    assert db.session.get(Alumno, resultados[0]['id_alumno']).cedula == items[0]['cedula']
+    assert resultados[1]['error'] == 'La cédula ya está registrada'
+    assert resultados[2]['error'] == 'Formato de cédula inválido'
+    assert resultados[3]['error'] == 'Representante no encontrado'
+
+def test_alumnos_todos_creados(client, auth_headers, id_repr):
+    response = client.post('/api/alumnos/bulk', headers=auth_headers, json={
+        'items': [alumno(id_repr), alumno(id_repr)]
+    })
+
+    assert response.status_code == 201
+    assert response.get_json()['creados'] == 2
+
+def consultas(client, auth_headers, contar_consultas, url, items):
+    db.session.remove()
+    contar_consultas.clear()
+    response = client.post(url, headers=auth_headers, json={'items': items})
+    assert response.status_code == 201
+    return len(contar_consultas)
+
+@pytest.mark.parametrize('url,fabrica', [
+    ('/api/instrumentos/bulk', lambda id_repr: instrumento()),
+    ('/api/alumnos/bulk', alumno),
+])
+def test_consultas_no_crecen_con_el_lote(client, auth_headers, contar_consultas, id_repr, url, fabrica):
+    """El número de consultas de un alta en bloque no depende del número de elementos"""
+    consultas(client, auth_headers, contar_consultas, url, [fabrica(id_repr)])
+
+    pocas = consultas(client, auth_headers, contar_consultas, url, [fabrica(id_repr) for _ in range(2)])
+    muchas = consultas(client, auth_headers, contar_consultas, url, [fabrica(id_repr) for _ in range(30)])
+
+    assert muchas == pocas
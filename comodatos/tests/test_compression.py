@@ -0,0 +1,56 @@
+import gzip
+import pytest
+from tests.factories import crear_instrumento
+
+@pytest.fixture
+def instrumentos(datos_base):
+    for _ in range(50):
+        crear_instrumento()
+
+def test_comprime_json_grande_con_gzip(client, auth_headers, instrumentos):
+    response = client.get(
+        '/api/instrumentos?per_page=50', headers={**auth_headers, 'Accept-Encoding': 'gzip'}
+    )
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['ETag'].endswith('-gzip"')
+    assert len(gzip.decompress(response.data)) > len(response.data)
+
+def test_sin_accept_encoding_no_comprime(client, auth_headers, instrumentos):
+    response = client.get('/api/instrumentos?per_page=50', headers=auth_headers)
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['instrumentos']
+
+def test_no_comprime_respuestas_pequenas(client, auth_headers, datos_base):
+    response = client.get('/api/medidas', headers={**auth_headers, 'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+
+def test_comprime_csv_en_streaming(client, auth_headers, instrumentos):
+    response = client.get(
+        '/api/instrumentos/exportar?formato=csv',
+        headers={**auth_headers, 'Accept-Encoding': 'gzip'}
+    )
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(response.data).decode('utf-8-sig').count('\n') == 51
+    response.close()
+
+def test_el_streaming_envia_cada_trozo_sin_esperar_al_final(app):
+    import zlib
+    from app.middleware.compression import _Compresor, _comprimir_stream
+
+    trozos = [f'fila {i}\n'.encode() * 20 for i in range(5)]
+    descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    recibido = b''
+
+    stream = _comprimir_stream(iter(trozos), _Compresor('gzip', app))
+    for i, salida in zip(range(len(trozos)), stream):
+        recibido += descompresor.decompress(salida)
+        assert recibido == b''.join(trozos[:i + 1])
+
+    recibido += b''.join(descompresor.decompress(salida) for salida in stream)
+    assert recibido == b''.join(trozos) and descompresor.eof
@@ -0,0 +1,63 @@
+import threading
+from app.extensions import db
+from app.models import SecuenciaCorrelativo
+from app.utils.correlativos import CorrelativoAllocator
+
+HILOS = 8
+POR_HILO = 5
+
+def test_reservas_concurrentes_de_una_secuencia_nueva_no_se_solapan(app):
+    """
+    Varias transacciones reservan a la vez el primer bloque de un año/núcleo
+    sin secuencia: ninguna falla y los rangos no se repiten.
+    """
+    primeros, errores = [], []
+    barrera = threading.Barrier(HILOS)
+
+    def reservar():
+        with app.app_context():
+            try:
+                barrera.wait()
+                for _ in range(POR_HILO):
+                    with db.engine.begin() as connection:
+                        primeros.append(CorrelativoAllocator.reservar(connection, 2030, 'TEST', 2))
+            except Exception as e:
+                errores.append(e)
+
+    hilos = [threading.Thread(target=reservar) for _ in range(HILOS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    numeros = sorted(n for primero in primeros for n in (primero, primero + 1))
+    assert numeros == list(range(1, HILOS * POR_HILO * 2 + 1))
+    assert db.session.get(SecuenciaCorrelativo, (2030, 'TEST')).ultimo == HILOS * POR_HILO * 2
+
+def test_la_secuencia_nueva_continua_los_correlativos_existentes(app, datos_base):
+    from tests.factories import crear_comodato
+
+    crear_comodato(correlativo=7, codigo='TEST/0007/2031')
+    with db.engine.begin() as connection:
+        assert CorrelativoAllocator.reservar(connection, 2031, 'TEST', 3) == 8
+    with db.engine.begin() as connection:
+        assert CorrelativoAllocator.reservar(connection, 2031, 'TEST') == 11
+
+def test_bloques_de_dos_procesos_no_repiten_numeros(app, monkeypatch):
+    """
+    Con CORRELATIVO_BLOQUE > 1 cada proceso guarda su bloque en _bloques;
+    se simulan dos procesos alternando su propio diccionario.
+    """
+    app.config['CORRELATIVO_BLOQUE'] = 4
+    procesos = [{}, {}]
+    numeros = []
+
+    for proceso, cantidad in [(0, 2), (1, 3), (0, 5), (1, 2), (0, 1), (1, 6)]:
+        monkeypatch.setattr(CorrelativoAllocator, '_bloques', procesos[proceso])
+        for _ in range(cantidad):
+            numeros.append(CorrelativoAllocator.siguiente(2032, 'TEST'))
+
+    # Cinco bloques de 4: cada proceso agota el suyo antes de reservar otro
+    assert sorted(numeros) == list(range(1, 20))
+    assert db.session.get(SecuenciaCorrelativo, (2032, 'TEST')).ultimo == 20
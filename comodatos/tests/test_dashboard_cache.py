@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+import pytest
+from app.extensions import db
+from app.utils.cache import dashboard_cache
+from tests.factories import crear_comodato
+
+@pytest.fixture(autouse=True)
+def cache_vacia():
+    # La caché es del proceso: no debe arrastrar valores de otras pruebas
+    dashboard_cache.clear()
+    yield
+    dashboard_cache.clear()
+
+def alertas(client, auth_headers, limit=10):
+    response = client.get(f'/api/dashboard/alertas?limit={limit}', headers=auth_headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_un_commit_relevante_invalida_las_alertas(client, auth_headers, datos_base, contar_consultas):
+    crear_comodato(inicio=date.today() - timedelta(days=200))
+    assert alertas(client, auth_headers)['total'] == 1
+
+    contar_consultas.clear()
+    assert alertas(client, auth_headers)['total'] == 1
+    assert contar_consultas == []
+
+    crear_comodato(inicio=date.today() - timedelta(days=300))
+    assert alertas(client, auth_headers)['total'] == 2
+
+def test_limit_acotado(client, app, auth_headers, datos_base):
+    app.config['DASHBOARD_ALERTAS_MAX'] = 3
+    for dias in range(200, 205):
+        crear_comodato(inicio=date.today() - timedelta(days=dias))
+
+    assert len(alertas(client, auth_headers, limit=1000)['alertas']) == 3
+    assert len(alertas(client, auth_headers, limit=-5)['alertas']) == 1
+    for limit in range(100):
+        alertas(client, auth_headers, limit=limit)
+
+    assert len(dashboard_cache._datos) <= 3
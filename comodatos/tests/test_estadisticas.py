@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+from sqlalchemy.dialects import mysql
+from app.models import Comodato
+from app.utils.estadisticas import EstadisticasDashboard, _contar_si
+from tests.factories import crear_comodato
+
+def test_estadisticas_en_una_consulta_por_tabla(app, datos_base, contar_consultas):
+    hace_un_ano = date.today() - timedelta(days=365)
+    crear_comodato()
+    crear_comodato(inicio=hace_un_ano)
+    crear_comodato(estado='finalizado')
+    contar_consultas.clear()
+
+    estadisticas = EstadisticasDashboard.calcular()
+
+    assert len(contar_consultas) == 5
+    assert estadisticas['comodatos'] == {
+        'total': 3, 'activos': 2, 'finalizados': 1, 'vencidos': 1, 'proximos_a_vencer': 0
+    }
+    assert estadisticas['usuarios'] == {'total': 4, 'activos': 4}
+    assert estadisticas['alumnos']['activos'] == 3
+
+def test_los_contadores_son_enteros_en_mysql():
+    """SUM() devuelve DECIMAL en MySQL, que se serializaría como string"""
+    sql = str(_contar_si(Comodato.estado == 'activo').compile(dialect=mysql.dialect()))
+
+    assert sql.startswith('CAST(') and sql.endswith('AS SIGNED INTEGER)')
+
+def test_benchmark_coincide_con_la_implementacion_anterior(app, datos_base):
+    crear_comodato()
+    crear_comodato(inicio=date.today() - timedelta(days=365))
+
+    result = app.test_cli_runner().invoke(args=['benchmark-estadisticas', '--repeticiones', '2'])
+
+    assert result.exit_code == 0, result.output
+    assert 'EstadisticasDashboard' in result.output
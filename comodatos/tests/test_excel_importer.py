@@ -0,0 +1,70 @@
+from datetime import date
+import pandas as pd
+from app.extensions import db
+from app.models import Alumno, Comodato, Instrumento, Representante
+from app.utils.excel_importer import ComodatoImporter, ExcelImporter
+from app.utils.reference_data import ReferenceData
+
+S1, S2, S3 = '5000000000000001', '5000000000000002', '5000000000000003'
+
+def hoja(*filas):
+    return pd.DataFrame(filas, columns=list(ExcelImporter.COLUMNAS))
+
+def fila(serial, comodatario=None, cedula=None, asignado=None, inicio=None, fin=None):
+    return {
+        'DESCRIPCION': 'VIOLIN', 'NUMERO DE INVENTARIO': serial, 'COMODATARIO': comodatario,
+        'CEDULA DEL COMODATARIO': cedula, 'ASIGNADO': asignado,
+        'FECHA INICIAL DEL COMODATO': inicio, 'FECHA FINAL DEL COMODATO': fin,
+    }
+
+def test_importa_la_hoja_con_comodatos(app, datos_base):
+    nucleo = app.config['NUCLEO_CODIGO']
+    df = hoja(
+        fila('123'),
+        fila(S1),
+        fila(S1),
+        fila(S2, 'María González', '12.345.678', 'Pedro González', '2031-01-10', '2031-07-10'),
+        fila(S2, 'María González', '12.345.678', 'Pedro González', '2031-02-01', '2031-08-01'),
+        fila(S3, 'María González', 'V-12345678', 'Pedro González', '2031-03-01', '2031-09-01'),
+    )
+
+    results = ExcelImporter.import_dataframe(df)
+
+    assert {(e['fila'], e['error']) for e in results['errores']} == {
+        (1, 'El serial de inventario debe tener 16 dígitos'),
+        (3, 'Serial de inventario duplicado en el archivo'),
+        (5, 'El instrumento ya tiene un comodato activo'),
+    }
+    assert results['instrumentos_importados'] == 3
+    assert results['representantes_creados'] == 1
+    assert results['alumnos_creados'] == 1
+    assert results['comodatos_importados'] == 2
+
+    representante = Representante.query.one()
+    assert representante.cedula == 'V12345678'
+    assert not representante.usuario.is_active
+    alumno = Alumno.query.one()
+    assert (alumno.nombre, alumno.cedula) == ('Pedro', 'V12345678-1')
+
+    comodatos = Comodato.query.order_by(Comodato.correlativo).all()
+    assert [(c.correlativo, c.codigo_comodato, c.fecha_inicio) for c in comodatos] == [
+        (1, f'{nucleo}/0001/2031', date(2031, 1, 10)),
+        (2, f'{nucleo}/0002/2031', date(2031, 3, 1)),
+    ]
+    assert {c.id_alumno for c in comodatos} == {alumno.id_alumno}
+    id_asignado = ReferenceData.estado_id('asignado')
+    for serial in (S2, S3):
+        assert Instrumento.query.filter_by(serial_inventario=serial).one().id_estado_instr == id_asignado
+
+def test_comodato_de_instrumento_no_importado_se_reporta(app, datos_base):
+    df, _ = ExcelImporter.preparar(hoja(
+        fila(S1, 'María González', 'V12345678', 'Pedro González', '2031-01-10', '2031-07-10'),
+    ))
+    contexto = ExcelImporter.nuevo_contexto()
+
+    validas, errores = ComodatoImporter.preparar(df, contexto)
+
+    assert validas.empty
+    assert [(e['fila'], e['error']) for e in errores] == [
+        (1, 'Comodato omitido: el instrumento no se importó')
+    ]
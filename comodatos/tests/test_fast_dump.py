@@ -0,0 +1,34 @@
+import pytest
+from app.extensions import db
+from app.models import Alumno, Comodato, EstadoInstrumento, Instrumento, Medida, Representante
+from app.schemas import (
+    alumnos_schema, comodatos_schema, estados_instrumento_schema, instrumentos_schema,
+    medidas_schema, representantes_schema
+)
+from app.utils.fast_dump import FastDump
+from tests.factories import crear_comodato
+
+LISTADOS = [
+    (alumnos_schema, Alumno),
+    (comodatos_schema, Comodato),
+    (instrumentos_schema, Instrumento),
+    (representantes_schema, Representante),
+    (medidas_schema, Medida),
+    (estados_instrumento_schema, EstadoInstrumento),
+]
+
+@pytest.fixture
+def comodatos(datos_base):
+    crear_comodato()
+    crear_comodato(estado='finalizado')
+    # Columnas con None y un atributo expirado (sin entrada en __dict__)
+    instrumento = Instrumento.query.first()
+    instrumento.marca = None
+    db.session.commit()
+    db.session.expire(Instrumento.query.first(), ['modelo'])
+
+@pytest.mark.parametrize('schema,modelo', LISTADOS)
+def test_fast_dump_igual_a_schema_dump(comodatos, schema, modelo):
+    objetos = modelo.query.all()
+
+    assert FastDump.dump(schema, objetos) == schema.dump(objetos)
@@ -0,0 +1,54 @@
+import io
+from app.extensions import db
+from app.models import Importacion, Instrumento
+from app.utils.import_jobs import ImportJobs
+
+CSV = (
+    'DESCRIPCION,NUMERO DE INVENTARIO\n'
+    'VIOLIN,1000000000000001\n'
+    'VIOLA,1000000000000002\n'
+)
+
+def subir(client, auth_headers, contenido, nombre='inventario.csv'):
+    return client.post(
+        '/api/importaciones', headers=auth_headers,
+        data={'archivo': (io.BytesIO(contenido), nombre)},
+        content_type='multipart/form-data'
+    )
+
+def test_el_archivo_se_guarda_con_el_trabajo(app, client, auth_headers, monkeypatch):
+    """Cualquier instancia puede ejecutar el trabajo: no depende del disco local"""
+    monkeypatch.setattr(ImportJobs, 'encolar', lambda id_importacion: None)
+
+    response = subir(client, auth_headers, CSV.encode())
+    assert response.status_code == 202
+    id_importacion = response.get_json()['id_importacion']
+
+    ImportJobs._ejecutar(app, id_importacion)
+
+    importacion = db.session.get(Importacion, id_importacion)
+    assert importacion.estado == 'completado'
+    assert importacion.resumen['instrumentos_importados'] == 2
+    assert importacion.contenido is None
+    assert Instrumento.query.count() == 2
+
+def test_trabajo_sin_archivo_queda_fallido(app, datos_base):
+    importacion = Importacion(nombre_archivo='perdido.xlsx', formato='xlsx', estado='pendiente')
+    db.session.add(importacion)
+    db.session.commit()
+    id_importacion = importacion.id_importacion
+    db.session.remove()
+
+    ImportJobs._ejecutar(app, id_importacion)
+
+    importacion = db.session.get(Importacion, id_importacion)
+    assert importacion.estado == 'fallido'
+    assert 'no está disponible' in importacion.error
+
+def test_rechaza_archivos_mayores_que_el_maximo(app, client, auth_headers):
+    app.config['IMPORT_MAX_BYTES'] = len(CSV) - 1
+
+    response = subir(client, auth_headers, CSV.encode())
+
+    assert response.status_code == 413
+    assert Importacion.query.count() == 0
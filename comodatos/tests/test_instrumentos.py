@@ -0,0 +1,25 @@
+import pytest
+from app.extensions import db
+from tests.factories import crear_instrumento
+
+@pytest.fixture
+def instrumento(datos_base):
+    instrumento = crear_instrumento()
+    instrumento.modelo = 'Estudiante Ñ'
+    instrumento.serial_fabrica = 'AB-1234'
+    db.session.commit()
+    return instrumento
+
+@pytest.mark.parametrize('texto,encontrado', [
+    ('violin', True),
+    ('stent', True),
+    ('ESTUDIANTE n', True),
+    ('ab-12', True),
+    ('1234', False),
+    ('tudiante', False),
+])
+def test_search_por_prefijo(client, auth_headers, instrumento, texto, encontrado):
+    response = client.get('/api/instrumentos', query_string={'search': texto}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert (len(response.get_json()['instrumentos']) == 1) is encontrado
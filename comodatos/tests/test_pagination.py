@@ -0,0 +1,72 @@
+import base64
+import json
+from datetime import date, timedelta
+import pytest
+from app.extensions import db
+from tests.factories import crear_comodato, crear_instrumento
+
+def recorrer(client, auth_headers, url, clave, campo, per_page=3):
+    """Ids de todas las páginas siguiendo next_cursor y luego prev_cursor"""
+    paginas, cursor = [], ''
+    while cursor is not None:
+        cuerpo = client.get(f'{url}?per_page={per_page}&cursor={cursor}', headers=auth_headers).get_json()
+        paginas.append([fila[campo] for fila in cuerpo[clave]])
+        cursor = cuerpo['next_cursor']
+
+    hacia_atras, cursor = [], cuerpo['prev_cursor']
+    while cursor is not None:
+        cuerpo = client.get(f'{url}?per_page={per_page}&cursor={cursor}', headers=auth_headers).get_json()
+        hacia_atras.insert(0, [fila[campo] for fila in cuerpo[clave]])
+        cursor = cuerpo['prev_cursor']
+    return paginas, hacia_atras
+
+def test_cursor_con_claves_repetidas_y_null(client, auth_headers, datos_base):
+    """Mismo orden que la paginación por página, con descripciones repetidas y marcas NULL"""
+    for descripcion, marca in [('VIOLIN', None), ('VIOLIN', 'Yamaha'), ('CELLO', None),
+                               ('VIOLIN', None), ('CELLO', 'Stentor'), ('VIOLA', 'Yamaha'),
+                               ('VIOLIN', 'Yamaha'), ('CELLO', None)]:
+        instrumento = crear_instrumento()
+        instrumento.descripcion, instrumento.marca = descripcion, marca
+    db.session.commit()
+
+    esperado = [
+        fila['id_instr'] for fila in
+        client.get('/api/instrumentos?per_page=100', headers=auth_headers).get_json()['instrumentos']
+    ]
+    paginas, hacia_atras = recorrer(client, auth_headers, '/api/instrumentos', 'instrumentos', 'id_instr')
+
+    assert [i for pagina in paginas for i in pagina] == esperado
+    assert len(esperado) == 8 and all(len(p) == 3 for p in paginas[:-1])
+    assert hacia_atras == paginas[:-1]
+
+def test_cursor_descendente_con_fechas_repetidas(client, auth_headers, datos_base):
+    hoy = date.today()
+    for dias in (0, 10, 10, 10, 20, 0, 10):
+        crear_comodato(inicio=hoy - timedelta(days=dias))
+
+    esperado = [
+        fila['id_comodato'] for fila in
+        client.get('/api/comodatos?per_page=100', headers=auth_headers).get_json()['comodatos']
+    ]
+    paginas, hacia_atras = recorrer(client, auth_headers, '/api/comodatos', 'comodatos', 'id_comodato')
+
+    assert [i for pagina in paginas for i in pagina] == esperado
+    assert hacia_atras == paginas[:-1]
+
+def cursor(datos):
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode().rstrip('=')
+
+@pytest.mark.parametrize('valor', [
+    'no-es-base64!',
+    cursor([1, 2]),
+    cursor({'d': 'next'}),
+    cursor({'d': 'arriba', 'v': ['2024-01-01', 1]}),
+    cursor({'d': 'next', 'v': 5}),
+    cursor({'d': 'next', 'v': ['2024-01-01']}),
+    cursor({'d': 'next', 'v': [20240101, 1]}),
+    cursor({'d': 'next', 'v': ['ayer', 1]}),
+])
+def test_cursor_invalido_responde_400(client, auth_headers, datos_base, valor):
+    response = client.get(f'/api/comodatos?cursor={valor}', headers=auth_headers)
+
+    assert response.status_code == 400
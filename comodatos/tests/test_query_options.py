@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+import pytest
+from app.extensions import db
+from app.models import Alumno, Instrumento, Representante
+from tests.factories import crear_alumno, crear_comodato, crear_instrumento
+
+# (url, entidad común a todos los comodatos del listado)
+ENDPOINTS = [
+    ('/api/comodatos?per_page=100', None),
+    ('/api/comodatos/reportes/vencidos', None),
+    ('/api/comodatos/reportes/exportar', None),
+    ('/api/comodatos/reportes/exportar?formato=csv', None),
+    ('/api/alumnos/{id_alumno}/comodatos', 'alumno'),
+    ('/api/representantes/{id_repr}/comodatos', None),
+    ('/api/instrumentos/{id_instr}/comodatos', 'instrumento'),
+]
+
+def crear_comodatos(ids, comun, cantidad):
+    """
+    Comodatos vencidos del representante de `ids`. Salvo la entidad
+    `comun`, cada uno tiene su propio alumno e instrumento, para que una
+    carga perezosa de relaciones no quede oculta por el identity map.
+    """
+    representante = db.session.get(Representante, ids['id_repr'])
+    inicio = date.today() - timedelta(days=400)
+    for _ in range(cantidad):
+        crear_comodato(
+            alumno=db.session.get(Alumno, ids['id_alumno']) if comun == 'alumno'
+            else crear_alumno(representante),
+            instrumento=db.session.get(Instrumento, ids['id_instr']) if comun == 'instrumento'
+            else crear_instrumento(),
+            inicio=inicio
+        )
+        inicio += timedelta(days=1)
+
+def consultas(client, auth_headers, contar_consultas, url):
+    db.session.remove()
+    contar_consultas.clear()
+    response = client.get(url, headers=auth_headers)
+    response.close()
+    assert response.status_code == 200
+    return len(contar_consultas)
+
+@pytest.mark.parametrize('endpoint,comun', ENDPOINTS)
+def test_listados_de_comodatos_sin_n_mas_1(client, auth_headers, contar_consultas, endpoint, comun):
+    """El número de consultas de un listado no crece con el número de filas"""
+    alumno, instrumento = crear_alumno(), crear_instrumento()
+    ids = dict(id_alumno=alumno.id_alumno, id_repr=alumno.id_repr, id_instr=instrumento.id_instr)
+    url = endpoint.format(**ids)
+
+    crear_comodatos(ids, comun, 2)
+    pocas = consultas(client, auth_headers, contar_consultas, url)
+
+    crear_comodatos(ids, comun, 30)
+    muchas = consultas(client, auth_headers, contar_consultas, url)
+
+    assert muchas == pocas
+
+@pytest.mark.parametrize('url', [
+    '/api/representantes/exportar',
+    '/api/representantes/exportar?formato=csv',
+])
+def test_exportacion_de_representantes_sin_n_mas_1(client, auth_headers, contar_consultas, url):
+    """Los contadores de la exportación no añaden consultas por representante"""
+    def crear_representantes(cantidad):
+        for _ in range(cantidad):
+            alumno = crear_alumno()
+            crear_comodato(alumno=alumno, inicio=date.today() - timedelta(days=400))
+
+    crear_representantes(2)
+    pocas = consultas(client, auth_headers, contar_consultas, url)
+
+    crear_representantes(30)
+    muchas = consultas(client, auth_headers, contar_consultas, url)
+
+    assert muchas == pocas
@@ -0,0 +1,30 @@
+from app.extensions import db
+from app.models import Medida
+from app.utils.reference_data import ReferenceData
+
+def test_busca_en_la_base_de_datos_si_no_esta_en_el_registro(app, datos_base):
+    assert ReferenceData.medida_por_nombre('4/4')
+
+    # Creada por otro worker: este proceso no ve el commit
+    with db.engine.begin() as connection:
+        connection.execute(Medida.__table__.insert().values(nombre='7/8', descripcion='Medida 7/8'))
+    nueva = db.session.execute(db.select(Medida.id_medida).filter_by(nombre='7/8')).scalar_one()
+
+    assert ReferenceData.medida(nueva)['nombre'] == '7/8'
+
+def test_acepta_ids_como_texto(app, datos_base):
+    assert ReferenceData.estado('1')['id_estado_instr'] == 1
+    assert ReferenceData.medida('x') is None
+    assert ReferenceData.estado(None) is None
+
+def test_clave_inexistente_no_recarga_el_registro(app, datos_base, contar_consultas):
+    ReferenceData.medidas()
+    contar_consultas.clear()
+
+    assert ReferenceData.medida_por_nombre('no existe') is None
+    assert ReferenceData.estado(999) is None
+    assert len(contar_consultas) == 2
+
+    contar_consultas.clear()
+    assert ReferenceData.medida_por_nombre('4/4')
+    assert contar_consultas == []
@@ -0,0 +1,80 @@
+import pytest
+from app.extensions import db
+from app.auth.utils import create_tokens
+from tests.factories import crear_alumno, crear_comodato, crear_representante
+
+def cabeceras(usuario):
+    return {'Authorization': f"Bearer {create_tokens(usuario)['access_token']}"}
+
+@pytest.fixture
+def representantes(datos_base):
+    """Dos representantes, cada uno con un alumno y un comodato"""
+    datos = {}
+    for clave in ('propio', 'ajeno'):
+        representante = crear_representante()
+        alumno = crear_alumno(representante)
+        comodato = crear_comodato(alumno=alumno)
+        datos[clave] = {
+            'headers': cabeceras(representante.usuario),
+            'id_repr': representante.id_repr,
+            'cedula': representante.cedula,
+            'id_alumno': alumno.id_alumno,
+            'cedula_alumno': alumno.cedula,
+            'id_comodato': comodato.id_comodato,
+        }
+    # Cada petición real empieza con la sesión vacía: un objeto que siga en
+    # el identity map se devolvería sin pasar por los criterios de RowScope
+    db.session.remove()
+    return datos
+
+DETALLES = [
+    '/api/alumnos/{id_alumno}',
+    '/api/comodatos/{id_comodato}',
+    '/api/representantes/{id_repr}',
+]
+
+@pytest.mark.parametrize('url', DETALLES)
+def test_detalle_ajeno_da_404(client, representantes, url):
+    propio, ajeno = representantes['propio'], representantes['ajeno']
+
+    assert client.get(url.format(**propio), headers=propio['headers']).status_code == 200
+    assert client.get(url.format(**ajeno), headers=propio['headers']).status_code == 404
+
+@pytest.mark.parametrize('url', DETALLES)
+def test_admin_no_tiene_alcance(client, auth_headers, representantes, url):
+    for datos in representantes.values():
+        assert client.get(url.format(**datos), headers=auth_headers).status_code == 200
+
+@pytest.mark.parametrize('url,clave,campo', [
+    ('/api/alumnos', 'alumnos', 'id_alumno'),
+    ('/api/comodatos', 'comodatos', 'id_comodato'),
+])
+def test_listados_solo_con_filas_propias(client, auth_headers, representantes, url, clave, campo):
+    propio, ajeno = representantes['propio'], representantes['ajeno']
+
+    filas = client.get(url, headers=propio['headers']).get_json()[clave]
+    assert [fila[campo] for fila in filas] == [propio[campo]]
+
+    filas = client.get(url, headers=auth_headers).get_json()[clave]
+    assert {fila[campo] for fila in filas} == {propio[campo], ajeno[campo]}
+
+def test_unicidad_de_cedula_de_alumno_ve_filas_ajenas(client, representantes):
+    propio, ajeno = representantes['propio'], representantes['ajeno']
+
+    response = client.post('/api/alumnos', headers=propio['headers'], json={
+        'nombre': 'Eva', 'apellido': 'Rojas', 'cedula': ajeno['cedula_alumno']
+    })
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'La cédula ya está registrada'
+
+def test_unicidad_de_cedula_de_representante_ve_filas_ajenas(client, representantes):
+    propio, ajeno = representantes['propio'], representantes['ajeno']
+
+    response = client.put(
+        f"/api/representantes/{propio['id_repr']}", headers=propio['headers'],
+        json={'cedula': ajeno['cedula']}
+    )
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'La cédula ya está registrada'
@@ -0,0 +1,34 @@
+from app.auth.utils import create_tokens
+from app.extensions import db
+from tests.factories import crear_alumno, crear_representante
+
+def cabeceras(usuario):
+    return {'Authorization': f"Bearer {create_tokens(usuario)['access_token']}"}
+
+def test_cada_representante_encuentra_sus_propias_filas(client, datos_base):
+    """Las filas de otros representantes no ocupan los puestos del resultado"""
+    otro = crear_representante()
+    for _ in range(15):
+        alumno = crear_alumno(otro)
+        alumno.apellido = 'Zamora'
+    propio = crear_representante()
+    mio = crear_alumno(propio)
+    mio.apellido = 'Zamora'
+    db.session.commit()
+    ids_otro = {a.id_alumno for a in otro.alumnos}
+
+    response = client.get('/api/utils/buscar-rapido?q=zamora', headers=cabeceras(propio.usuario))
+    assert [a['id_alumno'] for a in response.get_json()['alumnos']] == [mio.id_alumno]
+
+    response = client.get('/api/utils/buscar-rapido?q=zamora', headers=cabeceras(otro.usuario))
+    encontrados = {a['id_alumno'] for a in response.get_json()['alumnos']}
+    assert len(encontrados) == 10 and encontrados <= ids_otro
+
+def test_admin_busca_en_todas_las_filas(client, auth_headers):
+    for _ in range(3):
+        crear_representante()
+    db.session.commit()
+
+    response = client.get('/api/utils/buscar-rapido?q=perez', headers=auth_headers)
+
+    assert len(response.get_json()['representantes']) == 3
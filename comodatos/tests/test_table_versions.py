@@ -0,0 +1,60 @@
+from app.auth.utils import create_tokens
+from app.extensions import db
+from app.models import Alumno, Medida
+from app.utils.table_versions import TableVersions
+from tests.factories import crear_alumno, crear_representante
+
+def cabeceras(usuario):
+    return {'Authorization': f"Bearer {create_tokens(usuario)['access_token']}"}
+
+def etag(client, headers, url='/api/alumnos'):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return response.get_etag()[0]
+
+def test_etag_vigente_responde_304(client, auth_headers, datos_base):
+    crear_alumno()
+    db.session.commit()
+    actual = etag(client, auth_headers)
+
+    response = client.get('/api/alumnos', headers={**auth_headers, 'If-None-Match': f'"{actual}"'})
+
+    assert response.status_code == 304
+    assert response.get_etag()[0] == actual
+    assert response.data == b''
+
+def test_una_escritura_cambia_el_etag(client, auth_headers, datos_base):
+    alumno = crear_alumno()
+    db.session.commit()
+    anterior = etag(client, auth_headers)
+
+    alumno.estado = 'inactivo'
+    db.session.commit()
+
+    assert etag(client, auth_headers) != anterior
+    response = client.get('/api/alumnos', headers={**auth_headers, 'If-None-Match': f'"{anterior}"'})
+    assert response.status_code == 200
+
+def test_etag_distinto_por_rol_e_id_repr(client, auth_headers, datos_base):
+    representantes = [crear_representante(), crear_representante()]
+    db.session.commit()
+
+    etags = {etag(client, cabeceras(r.usuario)) for r in representantes}
+    etags.add(etag(client, auth_headers))
+
+    assert len(etags) == 3
+
+def test_solo_se_versionan_tablas_modificadas_y_consultadas(app, datos_base):
+    alumno = crear_alumno()
+    db.session.commit()
+    antes = TableVersions.versiones(['alumno', 'medida'])
+
+    # Asignar el mismo valor no modifica la fila
+    alumno.nombre = alumno.nombre
+    db.session.commit()
+    # Ningún @conditional_get depende de medida
+    db.session.add(Medida(nombre='7/8'))
+    db.session.commit()
+
+    assert TableVersions.versiones(['alumno', 'medida']) == antes
+    assert antes['medida'] == 0